@@ -1,5 +1,14 @@
 import bpy
 import os
+import sys
+import json
+import time
+import cProfile
+import pstats
+import importlib
+import importlib.machinery
+import types
+import collections
 
 bl_info = {
     "name": "Multires Projecting Toolset",
@@ -13,6 +22,110 @@ bl_info = {
     "category": "3D View",
 }
 
+
+class StartupProfiler:
+    """Records how long the add-on spends importing, building and registering, per category."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last_mark = self.started
+        self.timings = {}
+
+    def mark(self):
+        self.last_mark = time.perf_counter()
+
+    def lap(self, section, stage):
+        """Record the time since the previous mark under section/stage."""
+        now = time.perf_counter()
+        self.add(section, stage, now - self.last_mark)
+        self.last_mark = now
+
+    def add(self, section, stage, seconds):
+        stages = self.timings.setdefault(section, {})
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+    def report(self):
+        return {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "blender": bpy.app.version_string,
+            "addon_version": ".".join(map(str, bl_info["version"])),
+            "timings_ms": {section: {stage: round(seconds * 1000, 3) for stage, seconds in stages.items()} for section, stages in self.timings.items()},
+        }
+
+    def write_json(self, filepath):
+        """Append the report as one JSON line, so successive startups can be compared."""
+        with open(filepath, 'a') as f:
+            f.write(json.dumps(self.report()) + "\n")
+
+    def write_text(self, text_name="mp_startup_profile.json"):
+        text = bpy.data.texts.get(text_name) or bpy.data.texts.new(text_name)
+        text.from_string(json.dumps(self.report(), indent=2))
+        return text
+
+_startup = StartupProfiler()
+
+
+class OperatorProfiler:
+    """Wall time, call count and optional cProfile captures per operator id.
+
+    Disabled by default; the operators only check `enabled` before calling through.
+    """
+
+    def __init__(self, history_size=500, capture_rows=25):
+        self.enabled = False
+        self.use_cprofile = False
+        self.capture_rows = capture_rows
+        self.stats = {}
+        self.history = collections.deque(maxlen=history_size)
+
+    def run(self, op_id, function, *args):
+        profile = cProfile.Profile() if self.use_cprofile else None
+        start = time.perf_counter()
+        try:
+            if profile is None:
+                return function(*args)
+            return profile.runcall(function, *args)
+        finally:
+            self.record(op_id, time.perf_counter() - start, profile)
+
+    def record(self, op_id, seconds, profile=None):
+        stat = self.stats.get(op_id)
+        if stat is None:
+            stat = self.stats[op_id] = {"calls": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        stat["calls"] += 1
+        stat["total"] += seconds
+        stat["last"] = seconds
+        stat["max"] = max(stat["max"], seconds)
+        entry = {"op": op_id, "time": time.time(), "ms": round(seconds * 1000, 3)}
+        if profile is not None:
+            entry["profile"] = self.capture(profile)
+        self.history.append(entry)
+
+    def capture(self, profile):
+        """Return the top functions of a cProfile run by cumulative time."""
+        stats = pstats.Stats(profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.capture_rows]
+        return [
+            {"function": f"{filename}:{line}({name})", "calls": calls, "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+            for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def slowest(self, count=10):
+        return sorted(self.stats.items(), key=lambda item: item[1]["total"], reverse=True)[:count]
+
+    def clear(self):
+        self.stats.clear()
+        self.history.clear()
+
+    def write_jsonl(self, filepath):
+        with open(filepath, 'w') as f:
+            for entry in self.history:
+                f.write(json.dumps(entry) + "\n")
+        return len(self.history)
+
+_op_profiler = OperatorProfiler()
+
+
 categories = {
     "mp_vcol_bake": {"prop_name": "mp_vcol_bake_expanded", "operators": []},
     "mp_Combo_op": {"prop_name": "mp_Combo_op_expanded", "operators": []},
@@ -29,8 +142,14 @@ class ScriptOperator(bpy.types.Operator):
 
     def execute(self, context):
         script_path = get_script_path(self.filepath)
-        with open(script_path, 'r') as f:
-            exec(f.read())
+        # Standalone scripts act at top level, so they still run on every click,
+        # but the compiled code object is reused until the file changes on disk.
+        script_globals = {"__name__": "__main__", "__package__": script_package_for(script_path), "__file__": __file__, "self": self, "context": context}
+        code = load_script_code(script_path)["code"]
+        if _op_profiler.enabled:
+            _op_profiler.run(self.bl_idname, exec, code, script_globals)
+        else:
+            exec(code, script_globals)
         return {'FINISHED'}
 
 def create_operator_1(name, label, icon, script_name=None, def_name=None):
@@ -57,6 +176,11 @@ def create_operator_big(def_name, label, icon, script_name):
     })
     return operator_class
 
+def scene_toggle(operator_class, prop_name, default=False):
+    """Draw the operator's button pressed while the scene custom property prop_name is on."""
+    operator_class.toggle_prop = (prop_name, default)
+    return operator_class
+
 def create_operator_2(def_name, label, icon):
     return create_operator_big(def_name, label, icon, "Combo_op___script.py")
 
@@ -79,29 +203,223 @@ def create_operator_7(def_name, label):
 
 def create_execute_method(def_name, script_name):
     def execute(self, context):
-        script_path = get_script_path(self.filepath)
-        with open(script_path, 'r') as f:
-            script_code = f.read()
-        script_globals = {}
-        exec(compile(script_code, script_path, 'exec'), script_globals)
-        eval(f"{def_name}()", script_globals)
+        override_path = get_script_override_path(script_name)
+        if override_path:
+            function = resolve_script_attr(load_script_namespace(override_path), def_name)
+        else:
+            function = bind_script_function(script_name, def_name)
+        if _op_profiler.enabled:
+            _op_profiler.run(self.bl_idname, function)
+        else:
+            function()
         return {'FINISHED'}
     return execute
 
+
+_script_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'py')
+
+def ensure_script_package(name, paths):
+    """A package whose submodules are the op scripts in paths, searched in that order.
+
+    The op scripts import their siblings relatively, so they always run in a package.
+    A package whose paths changed starts over without its imported submodules.
+    """
+    package = sys.modules.get(name)
+    if package is not None and list(package.__path__) == list(paths):
+        return package
+    for module_name in [m for m in sys.modules if m.startswith(name + ".")]:
+        del sys.modules[module_name]
+    package = types.ModuleType(name)
+    package.__path__ = list(paths)
+    package.__package__ = name
+    package.__spec__ = importlib.machinery.ModuleSpec(name, None, is_package=True)
+    package.__spec__.submodule_search_locations = package.__path__
+    sys.modules[name] = package
+    return package
+
+# The py/ folder is a subpackage; when this file runs from a text block, a package of
+# the py/ folder stands in for it.
+_script_package = f"{__package__}.py" if __package__ else ensure_script_package("mp_scripts", [_script_dir]).__name__
+# Scripts next to the .blend run in this package, which searches their folder before py/,
+# so overridden siblings are imported instead of the add-on's own
+_override_package = f"{_script_package}_blend_override"
+
+def script_package_for(script_path):
+    """Package an op script runs in: the py/ package, or the override package for a script next to the .blend."""
+    script_dir = os.path.dirname(os.path.realpath(script_path))
+    if script_dir == os.path.realpath(_script_dir):
+        return _script_package
+    return ensure_script_package(_override_package, [script_dir, _script_dir]).__name__
+
+# (script_name, def_name) -> function, bound on first click and kept resident
+_bound_functions = {}
+
+def import_script_module(script_name):
+    """Import an op script from the py/ subpackage."""
+    module_name = os.path.splitext(script_name)[0]
+    start = time.perf_counter()
+    script_globals = vars(importlib.import_module(f"{_script_package}.{module_name}"))
+    _startup.add("py", f"import {module_name}", time.perf_counter() - start)
+    return script_globals
+
+def resolve_script_attr(script_globals, def_name):
+    """Resolve a dotted "Class.method" name against a script namespace."""
+    head, *attrs = def_name.split('.')
+    function = script_globals[head]
+    for attr in attrs:
+        function = getattr(function, attr)
+    return function
+
+def bind_script_function(script_name, def_name):
+    key = (script_name, def_name)
+    function = _bound_functions.get(key)
+    if function is None:
+        function = resolve_script_attr(import_script_module(script_name), def_name)
+        _bound_functions[key] = function
+    return function
+
+
+# resolved script path -> {"stamp": (mtime_ns, size), "code": code object, "namespace": dict or None}
+_script_cache = {}
+
+def load_script_code(script_path):
+    """Return the cache entry of a script, recompiling it only when it was edited on disk."""
+    script_path = os.path.realpath(script_path)
+    stat = os.stat(script_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    entry = _script_cache.get(script_path)
+    if entry is None or entry["stamp"] != stamp:
+        with open(script_path, 'r') as f:
+            code = compile(f.read(), script_path, 'exec')
+        entry = {"stamp": stamp, "code": code, "namespace": None}
+        _script_cache[script_path] = entry
+    return entry
+
+def load_script_namespace(script_path):
+    """Return the module namespace of an op script, executed once per on-disk version."""
+    entry = load_script_code(script_path)
+    if entry["namespace"] is None:
+        script_globals = {"__name__": os.path.splitext(os.path.basename(script_path))[0], "__package__": script_package_for(script_path), "__file__": script_path}
+        exec(entry["code"], script_globals)
+        entry["namespace"] = script_globals
+    return entry["namespace"]
+
+def clear_script_cache():
+    count = len(_script_cache)
+    _script_cache.clear()
+    _bound_functions.clear()
+    for name, module in list(sys.modules.items()):
+        if name.startswith(_script_package + "."):
+            importlib.reload(module)
+            count += 1
+        elif name.startswith(_override_package + "."):
+            # Imported again from the override folder on the next click
+            del sys.modules[name]
+            count += 1
+    return count
+
+class MP_OT_ReloadScripts(bpy.types.Operator):
+    """Drop all cached toolset scripts so the next click reads them from disk again"""
+    bl_idname = "mp.reload_scripts"
+    bl_label = "Reload Toolset Scripts"
+
+    def execute(self, context):
+        count = clear_script_cache()
+        self.report({'INFO'}, f"Reloaded toolset scripts ({count} cached)")
+        return {'FINISHED'}
+
+class MP_OT_PerformanceExport(bpy.types.Operator):
+    """Export the recorded operator timings as JSON lines"""
+    bl_idname = "mp.performance_export"
+    bl_label = "Export Operator Timings"
+
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+    filter_glob: bpy.props.StringProperty(default="*.jsonl", options={'HIDDEN'})
+
+    def invoke(self, context, event):
+        if not self.filepath:
+            self.filepath = "mp_operator_profile.jsonl"
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        count = _op_profiler.write_jsonl(bpy.path.ensure_ext(self.filepath, ".jsonl"))
+        self.report({'INFO'}, f"{count} operator calls exported")
+        return {'FINISHED'}
+
+class MP_OT_PerformanceClear(bpy.types.Operator):
+    """Clear the recorded operator timings"""
+    bl_idname = "mp.performance_clear"
+    bl_label = "Clear Operator Timings"
+
+    def execute(self, context):
+        _op_profiler.clear()
+        return {'FINISHED'}
+
+def update_profiler_settings(self, context):
+    _op_profiler.enabled = self.mp_profile_operators
+    _op_profiler.use_cprofile = self.mp_profile_cprofile
+
+def get_preferences():
+    addon = bpy.context.preferences.addons.get(__package__) if __package__ else None
+    return addon.preferences if addon else None
+
+def get_script_override_path(script_name):
+    """Return py/<script_name> next to the .blend if the override is enabled and the file exists."""
+    preferences = get_preferences()
+    if preferences is None or not preferences.use_blend_script_override or not bpy.data.filepath:
+        return None
+    script_path = os.path.join(os.path.dirname(bpy.data.filepath), 'py', script_name)
+    return script_path if os.path.isfile(script_path) else None
+
 def get_script_path(script_name):
-    try:
-        blend_file_dir = os.path.dirname(bpy.data.filepath)
-        script_path = os.path.join(blend_file_dir, 'py', script_name)
+    return get_script_override_path(script_name) or os.path.join(_script_dir, script_name)
 
-        if not os.path.isfile(script_path):
-            raise FileNotFoundError(f"The script file '{script_name}' was not found.")
+class MultiresProjectingPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__ or __name__
 
-    except (NameError, FileNotFoundError):
-        current_file_path = os.path.abspath(__file__)
-        current_file_dir = os.path.dirname(current_file_path)
-        script_path = os.path.join(current_file_dir, 'py', script_name)
+    use_blend_script_override: bpy.props.BoolProperty(
+        name="Use scripts next to the .blend",
+        description="Run py/<script> from the folder of the current .blend instead of the add-on when it exists",
+        default=False
+    )
+
+    defer_operator_registration: bpy.props.BoolProperty(
+        name="Register operators on first expand",
+        description="Register the operators of a panel category only when its box is first expanded (takes effect on restart)",
+        default=False
+    )
+
+    write_startup_report: bpy.props.BoolProperty(
+        name="Write startup report",
+        description="Append the startup timings to startup_profile.jsonl in the add-on's user folder",
+        default=False
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "use_blend_script_override")
+        layout.prop(self, "defer_operator_registration")
+        row = layout.row()
+        row.prop(self, "write_startup_report")
+        row.operator(MP_OT_StartupReport.bl_idname, text="", icon='TEXT')
+
+class MP_OT_StartupReport(bpy.types.Operator):
+    """Write the add-on startup timings to the mp_startup_profile.json text block"""
+    bl_idname = "mp.startup_report"
+    bl_label = "Toolset Startup Report"
+
+    def execute(self, context):
+        text = _startup.write_text()
+        self.report({'INFO'}, f"Startup report written to '{text.name}'")
+        return {'FINISHED'}
 
-    return os.path.abspath(script_path)
+def get_startup_report_path():
+    try:
+        directory = bpy.utils.extension_path_user(__package__, create=True)
+    except (ValueError, AttributeError):
+        directory = bpy.utils.user_resource('CONFIG', path="multires_projecting", create=True)
+    return os.path.join(directory, "startup_profile.jsonl")
 
 class MP_NODEGROUPS_MT_Menu(bpy.types.Menu):
     bl_label = "mp_nodegroups"
@@ -135,6 +453,31 @@ class MultiresProjectingPanel(bpy.types.Panel):
         elif space_type in {'NODE_EDITOR', 'SHADER_EDITOR'}:
             self.draw_panel(layout, context, ["mp_shader"])
 
+        self.draw_performance(layout, context)
+
+    def draw_performance(self, layout, context):
+        wm = context.window_manager
+        box = layout.box()
+        row = box.row()
+        row.alignment = 'EXPAND'
+        row.prop(context.scene, "mp_performance_expanded", icon="TRIA_DOWN" if context.scene.mp_performance_expanded else "TRIA_RIGHT", emboss=False, text="performance")
+        if not context.scene.mp_performance_expanded:
+            return
+        col = box.column(align=True)
+        row = col.row(align=True)
+        row.prop(wm, "mp_profile_operators", text="timing", toggle=True)
+        row.prop(wm, "mp_profile_cprofile", text="cProfile", toggle=True)
+        row.operator(MP_OT_PerformanceExport.bl_idname, text="", icon='EXPORT')
+        row.operator(MP_OT_PerformanceClear.bl_idname, text="", icon='TRASH')
+        row.operator(MP_OT_ReloadScripts.bl_idname, text="", icon='FILE_REFRESH')
+        slowest = _op_profiler.slowest()
+        if not slowest:
+            col.label(text="no calls recorded")
+        for op_id, stat in slowest:
+            row = col.row(align=True)
+            row.label(text=op_id.removeprefix("mp."))
+            row.label(text=f"{stat['calls']}x  avg {stat['total'] / stat['calls'] * 1000:.1f} ms  last {stat['last'] * 1000:.1f} ms")
+
     def draw_panel(self, layout, context, category_names):
         for category_name in category_names:
             category = categories[category_name]
@@ -143,23 +486,30 @@ class MultiresProjectingPanel(bpy.types.Panel):
             row.alignment = 'EXPAND'
             row.prop(context.scene, category["prop_name"], icon="TRIA_DOWN" if getattr(context.scene, category["prop_name"]) else "TRIA_RIGHT", emboss=False, text=category_name)
             if getattr(context.scene, category["prop_name"]):
+                if category_name not in _registered_categories:
+                    # Operators can't be registered while drawing, do it right after.
+                    col = box.column(align=True)
+                    col.label(text="loading...")
+                    schedule_category_registration(category_name)
+                    continue
                 col = box.column(align=True)
-                i = 0
-                for title, size in category.get("row_data", []):
-                    if size == 0:
+                for row_layout in category["layout"]:
+                    if row_layout is None:
                         # Add an empty column as a placeholder with increased gap
                         col.separator(factor=1.5)
-                    else:
-                        operator_row = category["operators"][i:i + size]
-                        if title:
-                            col.label(text=title)
-                        row = col.row(align=True)
-                        for operator in operator_row:
-                            row.operator(operator.bl_idname, text=operator.bl_label, icon=operator.icon).filepath = operator.filepath
-                        i += size # Move the index update here to avoid double printing
+                        continue
+                    title, buttons = row_layout
+                    if title:
+                        col.label(text=title)
+                    row = col.row(align=True)
+                    for bl_idname, label, icon, filepath, toggle_prop in buttons:
+                        depress = bool(context.scene.get(*toggle_prop)) if toggle_prop else False
+                        row.operator(bl_idname, text=label, icon=icon, depress=depress).filepath = filepath
 
 
 
+_startup.lap("addon", "module setup")
+
 categories["mp_vcol_bake"]["operators"] = [
     create_operator_6("BakeVcol.bake_GI_full", "full", "EXPERIMENTAL"),
     create_operator_6("BakeVcol.bake_GI_indirect", "indirect", "EXPERIMENTAL"),
@@ -169,6 +519,8 @@ categories["mp_vcol_bake"]["operators"] = [
     create_operator_1("misc_prepare_for_NPR_light_bake", "prepare for NPR light bake", "SETTINGS"),
 ]
 
+_startup.lap("mp_vcol_bake", "build")
+
 categories["mp_vcol_bake"]["row_data"] = [
     ("bake_GI", 2),
     ("", 1),
@@ -219,14 +571,20 @@ categories["mp_shader"]["operators"] = [
     create_operator_2("adij_mask.ADIJ_set__7", "", "STRIP_COLOR_07"),
     create_operator_2("adij_mask.ADIJ_set__8", "", "STRIP_COLOR_08"),
     create_operator_2("adij_mask.ADIJ_set__unlink", "", "UNLINKED"),
+
+    create_operator_2("shader_mask.batch_dry_run", "dry run", "VIEWZOOM"),
+    create_operator_2("shader_mask.batch_apply", "apply", "CHECKMARK"),
     
     create_operator_5("shader_reset_CURVE_RGB_curves", "reset RGB curve node", "IPO_LINEAR"),
     
     create_operator_2("Shader_VisibilityKey.update", "", "FILE_REFRESH"),
     create_operator_2("Shader_VisibilityKey.hide1by1", "hide", "HIDE_ON"),
-    create_operator_2("Shader_VisibilityKey.show1by1", "show", "HIDE_OFF"),   
+    create_operator_2("Shader_VisibilityKey.show1by1", "show", "HIDE_OFF"),
+    create_operator_2("Shader_VisibilityKey.advance_toggle", "", "FRAME_NEXT"),
 ]
 
+_startup.lap("mp_shader", "build")
+
 categories["mp_shader"]["row_data"] = [
     ("main", 1),
     ("", 1),
@@ -240,9 +598,10 @@ categories["mp_shader"]["row_data"] = [
     ("CamID mask set", 9),
     ("CamID opacity set", 9),
     ("adijust mask set", 9),
+    ("batch CamID mask (CamP_mask_map.json)", 2),
     ("", 0),
     ("op for selected nodes", 1),
-    ("insert CamP_ID_visibility key", 3),
+    ("insert CamP_ID_visibility key", 4),
 ]
 
 
@@ -258,6 +617,8 @@ categories["mp_misc"]["operators"] = [
     create_operator_1("misc_set_scene", "scene set", "SCENE_DATA"),
 ]
 
+_startup.lap("mp_misc", "build")
+
 categories["mp_misc"]["row_data"] = [
     ("", 1),
     ("", 1),
@@ -277,8 +638,8 @@ categories["mp_cam_and_tex"]["operators"] = [
     create_operator_1("tex_quick_save_overpaint", "", "FILE_TICK"),
     
     create_operator_1("tex_projecting_vid_overpaint", "project to obj(vid)", "RENDER_RESULT"),
-    create_operator_3("Placeholder.nothing", "", "BLANK1"),
-    create_operator_3("Placeholder.nothing", "", "BLANK1"),
+    create_operator_3("Cam_Registry.sync", "", "FILE_REFRESH"),
+    create_operator_3("Cam_Registry.toggle_selected", "", "CHECKBOX_HLT"),
   
     create_operator_3("Cam_Visibility.hide_current_object", "1by1", "HIDE_ON"),
     create_operator_3("Cam_Visibility.hide_all_objects", "all", "HIDE_ON"),
@@ -291,15 +652,24 @@ categories["mp_cam_and_tex"]["operators"] = [
     
     create_operator_1("Cam_CamP_save", "backup CamP", "FILE_TEXT"),
     create_operator_1("Cam_CamP_restore", "restore CamP", "FILE_TEXT"),
+    scene_toggle(create_operator_3("Cam_Registry.archive_db_toggle", "", "DISK_DRIVE"), "mp_camp_db"),
+
+    create_operator_3("Cam_Switch.copy_rig_to_clipboard", "rig→📋", "COPYDOWN"),
+    create_operator_3("Cam_Switch.apply_rig_from_clipboard", "📋→rig", "PASTEDOWN"),
+    create_operator_3("Cam_Switch.export_rig_file", "", "EXPORT"),
+    create_operator_3("Cam_Switch.import_rig_file", "", "IMPORT"),
     
     create_operator_3("Cam_Main.MainCam_Switch", "Switch", "OUTLINER_OB_CAMERA"),
     create_operator_3("Cam_Main.MainCam_Action_Bake", "Action Bake", "OUTLINER_OB_CAMERA"),
     
     create_operator_3("Cam_Mist.set_distance", "set mist keyframes", "KEY_HLT"),
+    create_operator_3("Cam_Mist.set_distance_all", "all CamPs", "KEYINGSET"),
     
     create_operator_3("Cam_Switch.QShot_combine", "QShot combine", "OUTLINER_OB_CAMERA"),
 ]
 
+_startup.lap("mp_cam_and_tex", "build")
+
 categories["mp_cam_and_tex"]["row_data"] = [
     ("overpaint", 3),
     ("", 3),
@@ -307,11 +677,12 @@ categories["mp_cam_and_tex"]["row_data"] = [
     ("", 0),
     ("CamP operations", 1),
     ("", 3),
-    ("", 2),
+    ("", 3),
+    ("CamP rig (all CamPs)", 4),
     ("", 0),
     ("Main Cam operations", 2),
     ("", 0),
-    ("z-depth picker insert keys", 1),
+    ("z-depth picker insert keys", 2),
     ("others", 1),
 ]
 
@@ -352,6 +723,7 @@ categories["mp_Combo_op"]["operators"] = [
     create_operator_2("vcol_mix.cel_midtone", "mid", "NODE_SOCKET_FLOAT"),
     create_operator_2("vcol_mix.cel_darktone", "dim", "NODE_SOCKET_MENU"),
     create_operator_2("vcol_mix.cel_ambient", "amb", "NODE_SOCKET_COLLECTION"),
+    create_operator_2("vcol_mix.cel_all", "all", "ADD"),
 
     create_operator_2("vcol_mix.remove_highlight", "X", "NODE_SOCKET_COLLECTION"),
     create_operator_2("vcol_mix.remove_littone", "X", "NODE_SOCKET_COLLECTION"),
@@ -361,8 +733,14 @@ categories["mp_Combo_op"]["operators"] = [
     
     create_operator_1("obj_region_ID_assign", "assign to obj", "COPY_ID"),
     create_operator_2("vcol_mask.region_ID_toggle", "", "HIDE_OFF"),
+
+    scene_toggle(create_operator_2("vcol_mask.compact_ids_toggle", "compact", "LINENUMBERS_ON"), "mp_compact_mask_ids"),
+    create_operator_2("vcol_mask.to_compact_ids", "col→ID", "SORTSIZE"),
+    create_operator_2("vcol_mask.from_compact_ids", "ID→col", "COLOR"),
 ]
 
+_startup.lap("mp_Combo_op", "build")
+
 categories["mp_Combo_op"]["row_data"] = [
     ("CamP ID mask", 10),
     ("color adijust mask", 10),
@@ -370,10 +748,12 @@ categories["mp_Combo_op"]["row_data"] = [
     ("paint mix layer active", 3),
     ("paint mix layer remove", 3),
     ("", 0),
-    ("cel colors active", 5),
+    ("cel colors active", 6),
     ("cel colors remove", 5),
     ("", 0),
     ("region color ID", 2),
+    ("", 0),
+    ("mask ID storage", 3),
 ]
 
 
@@ -409,37 +789,125 @@ categories["mp_nodegroups"]["operators"] = [
     create_operator_7("ShaderAdder_add_Anisotropic_Style", ".Anisotropic Style"),
 ]
 
+_startup.lap("mp_nodegroups", "build")
+
 categories["mp_nodegroups"]["layout.separator"] =[4, 8, 12, 16, 18]
 
-for category in categories.values():
-    setattr(bpy.types.Scene, category["prop_name"], bpy.props.BoolProperty(name="", default=True))
+def build_category_layout(category_name):
+    """Slice the operators of a category by its row_data into the rows the panel draws.
+
+    Each row is (title, ((bl_idname, label, icon, filepath, toggle_prop), ...)), or None for a gap.
+    """
+    category = categories[category_name]
+    operators = category["operators"]
+    rows = []
+    i = 0
+    for title, size in category["row_data"]:
+        if size == 0:
+            rows.append(None)
+            continue
+        if i + size > len(operators):
+            raise ValueError(f"{category_name}: row_data row '{title}' needs operators {i}-{i + size - 1}, but only {len(operators)} are defined")
+        rows.append((title, tuple((op.bl_idname, op.bl_label, op.icon, op.filepath, getattr(op, "toggle_prop", None)) for op in operators[i:i + size])))
+        i += size
+    if i != len(operators):
+        raise ValueError(f"{category_name}: row_data covers {i} operators, but {len(operators)} are defined")
+    return tuple(rows)
+
+for category_name, category in categories.items():
+    if "row_data" in category:
+        category["layout"] = build_category_layout(category_name)
+
+_startup.lap("addon", "layout")
+
+def make_expand_update(category_name):
+    def update(self, context):
+        if getattr(self, categories[category_name]["prop_name"]):
+            register_category(category_name)
+    return update
+
+for category_name, category in categories.items():
+    setattr(bpy.types.Scene, category["prop_name"], bpy.props.BoolProperty(name="", default=True, update=make_expand_update(category_name)))
+
+bpy.types.Scene.mp_performance_expanded = bpy.props.BoolProperty(name="", default=False)
+bpy.types.WindowManager.mp_profile_operators = bpy.props.BoolProperty(name="Time Operators", description="Record wall time and call count of every toolset operator", default=False, update=update_profiler_settings)
+bpy.types.WindowManager.mp_profile_cprofile = bpy.props.BoolProperty(name="cProfile Operators", description="Also capture a cProfile run of each timed call (slow)", default=False, update=update_profiler_settings)
 
 mp = type("mp_PT_panel", (MultiresProjectingPanel,), {"bl_idname": "mp_PT_panel", "bl_label": "Multires Projecting Toolset v0.5"})
 mp_shader = type("mp_SHADER_PT_panel", (MultiresProjectingPanel,), {"bl_idname": "mp_SHADER_PT_panel", "bl_label": "Multires Projecting Shader", "bl_space_type": 'NODE_EDITOR'})
 
 
 _registered_classes = []
+_registered_categories = set()
+_pending_categories = set()
+
+# Categories drawn in the sidebar panels, which may be registered on first expand.
+_deferrable_categories = {"mp_vcol_bake", "mp_Combo_op", "mp_cam_and_tex", "mp_misc", "mp_shader"}
+
+def register_category(category_name):
+    if category_name in _registered_categories:
+        return
+    start = time.perf_counter()
+    for operator in categories[category_name]["operators"]:
+        bpy.utils.register_class(operator)
+        _registered_classes.append(operator)
+    _registered_categories.add(category_name)
+    _startup.add(category_name, "register", time.perf_counter() - start)
+
+def schedule_category_registration(category_name):
+    if category_name in _pending_categories:
+        return
+    _pending_categories.add(category_name)
+
+    def register_pending():
+        _pending_categories.discard(category_name)
+        register_category(category_name)
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                area.tag_redraw()
+        return None
+
+    bpy.app.timers.register(register_pending, first_interval=0.0)
 
 def register():
-    global _registered_classes
     try:
         unregister()
     except Exception:
         pass
-    cls = []
-    for category in categories.values():
-        for operator in category["operators"]:
-            bpy.utils.register_class(operator)
-            cls.append(operator)
+    start = time.perf_counter()
+    cls = _registered_classes
+    if __package__:
+        bpy.utils.register_class(MultiresProjectingPreferences)
+        cls.append(MultiresProjectingPreferences)
+    preferences = get_preferences()
+    defer = getattr(preferences, "defer_operator_registration", False)
+    for category_name in categories:
+        if not (defer and category_name in _deferrable_categories):
+            register_category(category_name)
     bpy.utils.register_class(mp)
     cls.append(mp)
     bpy.utils.register_class(mp_shader)
     cls.append(mp_shader)
     bpy.utils.register_class(MP_NODEGROUPS_MT_Menu)
     cls.append(MP_NODEGROUPS_MT_Menu)
+    bpy.utils.register_class(MP_OT_ReloadScripts)
+    cls.append(MP_OT_ReloadScripts)
+    bpy.utils.register_class(MP_OT_StartupReport)
+    cls.append(MP_OT_StartupReport)
+    bpy.utils.register_class(MP_OT_PerformanceExport)
+    cls.append(MP_OT_PerformanceExport)
+    bpy.utils.register_class(MP_OT_PerformanceClear)
+    cls.append(MP_OT_PerformanceClear)
     if not any(draw_mp_nodegroups_menu.__name__ == f.__name__ for f in bpy.types.NODE_MT_add._dyn_ui_initialize()):
         bpy.types.NODE_MT_add.append(draw_mp_nodegroups_menu)
-    _registered_classes = cls
+    bind_script_function("Cam_CamP_registry___script.py", "register")()
+    bind_script_function("shader_nodegroup_index___script.py", "register_handlers")()
+    _startup.add("addon", "register", time.perf_counter() - start)
+    if getattr(preferences, "write_startup_report", False):
+        try:
+            _startup.write_json(get_startup_report_path())
+        except OSError as e:
+            print(f"Failed to write startup report: {e}")
 
 def unregister():
     global _registered_classes
@@ -447,12 +915,19 @@ def unregister():
         for f in bpy.types.NODE_MT_add._dyn_ui_initialize():
             if f.__name__ == draw_mp_nodegroups_menu.__name__:
                 bpy.types.NODE_MT_add.remove(f)
+    index_module = sys.modules.get(f"{_script_package}.shader_nodegroup_index___script")
+    if index_module is not None:
+        index_module.unregister_handlers()
+    registry_module = sys.modules.get(f"{_script_package}.Cam_CamP_registry___script")
+    if registry_module is not None:
+        registry_module.unregister()
     for c in reversed(_registered_classes):
         try:
             bpy.utils.unregister_class(c)
         except Exception:
             pass
     _registered_classes.clear()
+    _registered_categories.clear()
 
 def draw_mp_nodegroups_menu(self, context):
     self.layout.separator()
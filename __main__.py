@@ -0,0 +1,242 @@
+"""Headless batch runner: execute a JSON job spec without any UI.
+
+    blender -b shot.blend --python <add-on folder>/__main__.py -- job.json
+    blender -b shot.blend --python-expr "import runpy; runpy.run_module('bl_ext.user_default.Multires_Projecting_Toolset', run_name='__main__')" -- job.json
+
+A job spec lists the steps to run in order::
+
+    {
+        "steps": [
+            {"op": "render_camp", "camps": "1-12"},
+            {"op": "bake_ao", "collection": "Props"},
+            {"op": "bake_gi", "objects": ["Rock"], "passes": "indirect"},
+            {"op": "project_camps", "object": "Wall", "camps": [1, 3], "merge_with": ["Trim"]},
+            {"op": "verify_camp_state", "benchmark": true},
+            {"op": "save"}
+        ],
+        "stop_on_error": true,
+        "report": "//batch_report.json"
+    }
+
+Objects are given by "objects" (names) or "collection"; without either the
+selection saved in the .blend is used. Each step is timed, a JSON summary is
+printed (and written to "report" if set) and Blender exits with status 1 when
+a step failed. Pass "-" instead of a file name to read the spec from stdin.
+"""
+
+import bpy
+import os
+import sys
+import json
+import time
+import importlib
+import importlib.util
+import traceback
+
+
+def get_addon_package():
+    """Name of the add-on package, importing it first when it is not enabled."""
+    if __package__:
+        return __package__
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    init_path = os.path.join(addon_dir, "__init__.py")
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if module_file and os.path.abspath(module_file) == init_path:
+            return name
+    name = os.path.basename(addon_dir)
+    spec = importlib.util.spec_from_file_location(name, init_path, submodule_search_locations=[addon_dir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return name
+
+def import_script(module_name):
+    return importlib.import_module(f"{get_addon_package()}.py.{module_name}")
+
+
+def parse_camps(value):
+    """CamP indexes from 3, [1, 3], "1-12" or "1,3,5-7"; None means all enabled in the CamP registry."""
+    if value is None or value == "all":
+        return None
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str):
+        indexes = []
+        for part in value.split(","):
+            start, _, end = part.strip().partition("-")
+            indexes.extend(range(int(start), int(end or start) + 1))
+        return indexes
+    return [int(i) for i in value]
+
+def get_object(name):
+    obj = bpy.data.objects.get(name)
+    if obj is None:
+        raise ValueError(f'Object "{name}" not found')
+    return obj
+
+def get_step_objects(step):
+    if "objects" in step:
+        return [get_object(name) for name in step["objects"]]
+    if "collection" in step:
+        collection = bpy.data.collections.get(step["collection"])
+        if collection is None:
+            raise ValueError(f'Collection "{step["collection"]}" not found')
+        return list(collection.all_objects)
+    return list(bpy.context.selected_objects)
+
+def select_only(objects):
+    view_layer = bpy.context.view_layer
+    for obj in view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    if objects:
+        view_layer.objects.active = objects[0]
+
+
+def run_render_camp(step):
+    render = import_script("Cam_CamP_render___script")
+    camps = parse_camps(step.get("camps"))
+    if camps is None:
+        camps = import_script("Cam_CamP_registry___script").slots(bpy.context.scene)
+    return {"outputs": [render.render_CamP_still(bpy.context.scene, i) for i in camps]}
+
+def run_bake(step, bake):
+    objects = get_step_objects(step)
+    meshes = [obj for obj in objects if obj.type == 'MESH']
+    if not meshes:
+        raise ValueError("No mesh objects to bake")
+    select_only(meshes)
+    bake(objects=meshes)
+    return {"objects": [obj.name for obj in meshes]}
+
+def run_bake_ao(step):
+    return run_bake(step, import_script("Bake_op___script").BakeVcol.bake_ambient_occlusion)
+
+def run_bake_gi(step):
+    BakeVcol = import_script("Bake_op___script").BakeVcol
+    bakes = {"full": BakeVcol.bake_GI_full, "indirect": BakeVcol.bake_GI_indirect, "shadow": BakeVcol.bake_shadow}
+    passes = step.get("passes", "full")
+    if passes not in bakes:
+        raise ValueError(f'Unknown GI passes "{passes}", expected one of {sorted(bakes)}')
+    return run_bake(step, bakes[passes])
+
+def run_bake_shadow(step):
+    return run_bake(step, import_script("Bake_op___script").BakeVcol.bake_shadow)
+
+def run_bake_vcolcombine(step):
+    return run_bake(step, import_script("Bake_op___script").BakeVcol.bake_vcolcombine)
+
+def run_project_camps(step):
+    overpaint = import_script("tex_projecting_overpaint___script")
+    obj = get_object(step["object"])
+    if obj.type != 'MESH' or not obj.active_material:
+        raise ValueError(f'"{obj.name}" must be a mesh with an active material')
+    if not overpaint.activate_overpaint_node(obj):
+        raise ValueError(f'The active material of "{obj.name}" has no overpaint image node')
+    psd_op_paths, available_camera_indexes = overpaint.find_CamP_images(bpy.context.scene)
+    camps = parse_camps(step.get("camps"))
+    if camps is None:
+        camps = available_camera_indexes
+    missing = [i for i in camps if i not in available_camera_indexes]
+    if missing:
+        raise ValueError(f"No PSD overpaint found for CamP {missing}")
+    merge_with = [get_object(name) for name in step.get("merge_with", [])]
+
+    errors = []
+    def report(level, message):
+        print(f"{'/'.join(sorted(level))}: {message}")
+        if 'ERROR' in level:
+            errors.append(message)
+
+    overpaint.overpaint_camera_projection(obj, merge_with, camps, psd_op_paths,
+                                          merge_mesh=step.get("merge", bool(merge_with)), report=report)
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return {"camps": camps}
+
+def run_verify_camp_state(step):
+    camp_state = import_script("Cam_CamP_state___script")
+    camps = parse_camps(step.get("camps"))
+    mismatches = camp_state.verify(bpy.context.scene, camps, step.get("tolerance", 1e-5))
+    result = {"mismatches": [list(map(str, mismatch)) for mismatch in mismatches]}
+    if step.get("benchmark", True):
+        result["benchmark"] = camp_state.benchmark(bpy.context.scene, camps)
+    if mismatches:
+        raise RuntimeError(f"{len(mismatches)} CamP state mismatches, first: {mismatches[0]}")
+    return result
+
+def run_save(step):
+    filepath = step.get("filepath")
+    if filepath:
+        bpy.ops.wm.save_as_mainfile(filepath=bpy.path.abspath(filepath), copy=step.get("copy", False))
+    else:
+        bpy.ops.wm.save_mainfile()
+    return {"filepath": filepath or bpy.data.filepath}
+
+STEP_OPS = {
+    "render_camp": run_render_camp,
+    "bake_ao": run_bake_ao,
+    "bake_gi": run_bake_gi,
+    "bake_shadow": run_bake_shadow,
+    "bake_vcolcombine": run_bake_vcolcombine,
+    "project_camps": run_project_camps,
+    "verify_camp_state": run_verify_camp_state,
+    "save": run_save,
+}
+
+
+def run_job(job):
+    """Run every step of a job spec. Returns the report dict."""
+    results = []
+    job_start = time.perf_counter()
+    for index, step in enumerate(job.get("steps", [])):
+        op = step.get("op")
+        result = {"index": index, "op": op}
+        start = time.perf_counter()
+        try:
+            if op not in STEP_OPS:
+                raise ValueError(f'Unknown op "{op}", expected one of {sorted(STEP_OPS)}')
+            result.update(STEP_OPS[op](step) or {})
+            result["status"] = "ok"
+        except Exception as e:
+            traceback.print_exc()
+            result["status"] = "error"
+            result["error"] = str(e)
+        result["seconds"] = round(time.perf_counter() - start, 4)
+        results.append(result)
+        print(f"[{index}] {op}: {result['status']} in {result['seconds']:.2f}s", flush=True)
+        if result["status"] == "error" and job.get("stop_on_error", True):
+            break
+    failed = [r for r in results if r["status"] == "error"]
+    return {
+        "blend": bpy.data.filepath,
+        "steps": results,
+        "failed": len(failed),
+        "skipped": len(job.get("steps", [])) - len(results),
+        "total_seconds": round(time.perf_counter() - job_start, 4),
+    }
+
+def load_job(argv):
+    args = argv[argv.index("--") + 1:] if "--" in argv else []
+    if not args:
+        raise SystemExit("usage: blender -b file.blend --python __main__.py -- job.json")
+    if args[0] == "-":
+        return json.load(sys.stdin)
+    with open(args[0], encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    job = load_job(sys.argv if argv is None else argv)
+    report = run_job(job)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if job.get("report"):
+        with open(bpy.path.abspath(job["report"]), "w", encoding="utf-8") as f:
+            f.write(text)
+    return 1 if report["failed"] or report["skipped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
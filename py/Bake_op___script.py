@@ -2,21 +2,41 @@ import bpy
 from mathutils import Vector
 
 class BakeVcol:
+    # The bake functions take an optional list of objects so they can run without a
+    # window (blender -b); by default they work on the current selection.
     @staticmethod
-    def bake_selected_meshes(bake_settings, colname='GI', use_world_override=True):
+    def target_meshes(objects=None):
+        if objects is None:
+            objects = bpy.context.selected_objects
+        return [o for o in objects if o.type == 'MESH']
+
+    @staticmethod
+    def error_message(text):
+        if bpy.app.background:
+            raise RuntimeError(text)
+        bpy.context.window_manager.popup_menu(
+            lambda self, context: self.layout.label(text=text),
+            title="Error",
+            icon='ERROR'
+        )
+
+    @staticmethod
+    def undo_push(message):
+        # There is no undo stack in background mode
+        if not bpy.app.background:
+            bpy.ops.ed.undo_push(message=message)
+
+    @staticmethod
+    def bake_selected_meshes(bake_settings, colname='GI', use_world_override=True, objects=None):
         # Start the undo block
-        bpy.ops.ed.undo_push(message="Start of script operation")
+        BakeVcol.undo_push("Start of script operation")
         # Check if there are any selected mesh objects
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
+        selected_meshes = BakeVcol.target_meshes(objects)
         if not selected_meshes:
-            bpy.context.window_manager.popup_menu(
-                lambda self, context: self.layout.label(text="You need to select at least one mesh to bake."),
-                title="Error",
-                icon='ERROR'
-            )
+            BakeVcol.error_message("You need to select at least one mesh to bake.")
         else:
             current_scene_name = bpy.context.scene.name
-            current_viewlayer_name = bpy.context.window.view_layer.name
+            current_viewlayer_name = bpy.context.view_layer.name
             current_world = bpy.context.scene.world  # Record the current world
             current_render_engine = bpy.context.scene.render.engine  # Record the current render engine
 
@@ -119,10 +139,10 @@ class BakeVcol:
                 except AttributeError:
                     pass
 
-        bpy.ops.ed.undo_push(message="End of script operation")
+        BakeVcol.undo_push("End of script operation")
 
     @staticmethod
-    def bake_GI_full():
+    def bake_GI_full(objects=None):
         bake_settings = {
             "use_pass_direct": True,
             "use_pass_indirect": True,
@@ -131,10 +151,10 @@ class BakeVcol:
             "use_pass_transmission": True,
             "use_pass_emit": True,
         }
-        BakeVcol.bake_selected_meshes(bake_settings)
+        BakeVcol.bake_selected_meshes(bake_settings, objects=objects)
 
     @staticmethod
-    def bake_GI_indirect():
+    def bake_GI_indirect(objects=None):
         bake_settings = {
             "use_pass_direct": False,
             "use_pass_indirect": True,
@@ -143,10 +163,10 @@ class BakeVcol:
             "use_pass_transmission": True,
             "use_pass_emit": True,
         }
-        BakeVcol.bake_selected_meshes(bake_settings)
+        BakeVcol.bake_selected_meshes(bake_settings, objects=objects)
 
     @staticmethod
-    def bake_shadow():
+    def bake_shadow(objects=None):
         bake_settings = {
             "use_pass_direct": True,
             "use_pass_indirect": False,
@@ -156,10 +176,10 @@ class BakeVcol:
             "use_pass_emit": True,
         }
         # Call bake_selected_meshes with colname 'shadow' and no world override
-        BakeVcol.bake_selected_meshes(bake_settings, colname='shadow', use_world_override=False)
+        BakeVcol.bake_selected_meshes(bake_settings, colname='shadow', use_world_override=False, objects=objects)
 
     @staticmethod
-    def bake_ambient_occlusion():
+    def bake_ambient_occlusion(objects=None):
         """Function to execute the AO baking process."""
         # Save the current render engine
         current_render_engine = bpy.context.scene.render.engine
@@ -167,8 +187,7 @@ class BakeVcol:
         bpy.context.scene.render.engine = 'CYCLES'
 
         # Get selected mesh objects
-        selected_objects = bpy.context.selected_objects
-        mesh_objects = [obj for obj in selected_objects if obj.type == 'MESH']
+        mesh_objects = BakeVcol.target_meshes(objects)
 
         # Record the active vertex color attribute for each selected mesh
         active_vertex_colors = {}
@@ -188,7 +207,8 @@ class BakeVcol:
 
         # Bake AO to vertex colors for each object
         for obj in mesh_objects:
-            bpy.ops.object.select_all(action='DESELECT')
+            for selected in bpy.context.selected_objects:
+                selected.select_set(False)
             obj.select_set(True)
             bpy.context.view_layer.objects.active = obj
 
@@ -209,20 +229,16 @@ class BakeVcol:
                 pass
 
     @staticmethod
-    def bake_vcolcombine():
+    def bake_vcolcombine(objects=None):
         # Start the undo block
-        bpy.ops.ed.undo_push(message="Start of script operation")
+        BakeVcol.undo_push("Start of script operation")
 
         current_render_engine = bpy.context.scene.render.engine
 
         # Check if there are any selected mesh objects
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
+        selected_meshes = BakeVcol.target_meshes(objects)
         if not selected_meshes:
-            bpy.context.window_manager.popup_menu(
-                lambda self, context: self.layout.label(text="You need to select at least one mesh to bake."),
-                title="Error",
-                icon='ERROR'
-            )
+            BakeVcol.error_message("You need to select at least one mesh to bake.")
 
         colname = 'Vcolcombine'
         original_active_colors = {}  # Dictionary to store original active colors
@@ -329,7 +345,7 @@ class BakeVcol:
                 pass
 
         # End the undo block
-        bpy.ops.ed.undo_push(message="End of script operation")
+        BakeVcol.undo_push("End of script operation")
 
 # Uncomment the following lines to test the functions
 # BakeVcol.bake_GI_full()
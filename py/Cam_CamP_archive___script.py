@@ -0,0 +1,350 @@
+"""CamP backup archives: named snapshots of every CamP, stored as JSON in one text block.
+
+    {"format": "mp_camp_archives", "version": 2,
+     "records": {"<hash>": {"name": "CamP_sub01", "slot": 1, "location": [...], ...}, ...},
+     "archives": {"base": {"cameras": ["<hash>", ...]}, ...}}
+
+Camera records are content addressed: an archive lists the hashes of its camera records
+and a record is stored once however many archives use it, so a backup where one CamP
+moved adds one record. Records no archive uses any more are dropped on write.
+
+The parsed archives are cached per text block together with a revision number kept on
+the text block, which every write through this module bumps, and the text they were
+parsed from. Lookups and writes compare that text with the text block, so hand edits in
+the Text Editor are parsed again rather than overwritten; only redraws (verify=False)
+trust the revision alone, and the title list then costs nothing however many archives
+there are.
+
+With the CamP archive database enabled (Cam_CamP_db) archives are also written to it,
+and titles, lookups and restores read from it first, falling back to the text block
+for archives it doesn't have. Enabling it brings the database archives of the shot in
+line with the text block (push_to_db).
+
+Archives of the old CamP_backups_list.md text block are imported the first time the
+archives are loaded, and later with import_legacy (the import button of the restore
+dialog). Version 1 archives (full records per archive) are converted on their next write.
+"""
+
+import bpy
+import json
+import hashlib
+from . import Cam_CamP_db___script as camp_db
+from . import Cam_CamP_registry___script as camp_registry
+from . import Cam_CamP_state___script as camp_state
+
+
+TEXT_NAME = "CamP_backups.json"
+LEGACY_TEXT_NAME = "CamP_backups_list.md"
+ARCHIVE_FORMAT = "mp_camp_archives"
+ARCHIVE_VERSION = 2
+REVISION_PROP = "mp_revision"
+DEFAULT_TITLE = "base"
+DATA_PROPS = ("lens", "shift_x", "shift_y", "clip_start", "clip_end", "sensor_width")
+
+LEGACY_HEADER = "------------------------------------"
+LEGACY_TITLE_PREFIX = "CameraArchive_"
+LEGACY_CAMERA_END = "------------------"
+# Legacy "Key: value" lines -> (record key, parser)
+LEGACY_FIELDS = {
+    "Location": ("location", lambda value: [float(i) for i in value.split(",")]),
+    "Rotation": ("rotation", lambda value: [float(i) for i in value.split(",")]),
+    "Lens": ("lens", float),
+    "Shift X": ("shift_x", float),
+    "Shift Y": ("shift_y", float),
+    "Clip Start": ("clip_start", float),
+    "Clip End": ("clip_end", float),
+    "Sensor Width": ("sensor_width", float),
+    "Resolution X": ("resolution_x", int),
+    "Resolution Y": ("resolution_y", int),
+    "Mist Depth": ("mist_depth", float),
+}
+
+
+# text session_uid -> (revision, archives, text they were parsed from)
+_cache = {}
+# Archive database writes of this session, part of the revision
+_db_writes = [0]
+
+def empty():
+    return {"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "records": {}, "archives": {}}
+
+def record_hash(record):
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def add_records(data, cameras):
+    """Store camera records by hash. Returns their hashes."""
+    hashes = []
+    for record in cameras:
+        key = record_hash(record)
+        data["records"].setdefault(key, record)
+        hashes.append(key)
+    return hashes
+
+def collect_garbage(data):
+    used = {key for archive in data["archives"].values() for key in archive["cameras"]}
+    for key in [key for key in data["records"] if key not in used]:
+        del data["records"][key]
+
+def migrate(data):
+    """Version 1 archives, with full camera records per archive, as content addressed archives."""
+    if data.get("version", 1) >= ARCHIVE_VERSION:
+        return data
+    migrated = empty()
+    for title, archive in data["archives"].items():
+        migrated["archives"][title] = {"cameras": add_records(migrated, archive["cameras"])}
+    return migrated
+
+def get_text(create=False):
+    text = bpy.data.texts.get(TEXT_NAME)
+    if text is None and create:
+        text = bpy.data.texts.new(TEXT_NAME)
+        text.from_string(json.dumps(empty()))
+        text[REVISION_PROP] = 0
+    return text
+
+def revision():
+    """Revision of the archives; changes with every write."""
+    text = get_text()
+    return (text.get(REVISION_PROP, 0) if text else -1) + _db_writes[0]
+
+def load(verify=True):
+    """The archives dict, parsed again when the text changed. Do not modify it, use put/remove.
+
+    verify=False skips comparing the text, for drawing code.
+    """
+    text = get_text()
+    if text is None:
+        if LEGACY_TEXT_NAME not in bpy.data.texts:
+            return empty()
+        try:
+            import_legacy()
+        except AttributeError:
+            # Writing ID data is not allowed while drawing
+            return migrate(parse_legacy(bpy.data.texts[LEGACY_TEXT_NAME].as_string()))
+        text = get_text()
+    cached = _cache.get(text.session_uid)
+    text_revision = text.get(REVISION_PROP, 0)
+    if cached is not None and cached[0] == text_revision and not verify:
+        return cached[1]
+    source = text.as_string()
+    if cached is None or cached[0] != text_revision or cached[2] != source:
+        data = json.loads(source or "{}")
+        if data.get("format") != ARCHIVE_FORMAT:
+            raise ValueError(f'"{TEXT_NAME}" is not a CamP archive text block')
+        cached = (text_revision, migrate(data), source)
+        _cache[text.session_uid] = cached
+    return cached[1]
+
+def save(data):
+    collect_garbage(data)
+    text = get_text(create=True)
+    source = json.dumps(data, indent=1)
+    text.from_string(source)
+    text[REVISION_PROP] = text.get(REVISION_PROP, 0) + 1
+    # Compare with what the text block returns, which may differ in the trailing newline
+    _cache[text.session_uid] = (text[REVISION_PROP], data, text.as_string())
+
+
+def titles(verify=True):
+    text_titles = list(load(verify)["archives"])
+    if camp_db.enabled():
+        db_titles = camp_db.titles(camp_db.current_shot())
+        in_db = set(db_titles)
+        return db_titles + [title for title in text_titles if title not in in_db]
+    return text_titles
+
+def get(title):
+    """Archive of the title with its camera records resolved, or None."""
+    if camp_db.enabled():
+        stored = camp_db.get(camp_db.current_shot(), title)
+        if stored is not None:
+            return {"cameras": stored[1]}
+    data = load()
+    archive = data["archives"].get(title)
+    if archive is None:
+        return None
+    return {"cameras": [data["records"][key] for key in archive["cameras"]]}
+
+def get_hashes(title):
+    if camp_db.enabled():
+        stored = camp_db.get(camp_db.current_shot(), title)
+        if stored is not None:
+            return stored[0]
+    archive = load()["archives"].get(title)
+    return None if archive is None else archive["cameras"]
+
+def base_path(title):
+    return f"//multires_projecting/{title}/"
+
+def put(title, cameras):
+    """Store the camera records as archive title, replacing an archive of that title."""
+    title = title or DEFAULT_TITLE
+    data = load()
+    hashes = add_records(data, cameras)
+    data["archives"][title] = {"cameras": hashes}
+    save(data)
+    if camp_db.enabled():
+        camp_db.put(camp_db.current_shot(), title, cameras, hashes, base_path(title))
+        _db_writes[0] += 1
+
+def push_to_db():
+    """Make the database archives of this shot match the text block, the source of truth
+    while the database was off: new or changed archives are written, archives the text
+    block no longer has are removed. Returns (written titles, removed titles)."""
+    data = load()
+    shot = camp_db.current_shot()
+    stored = camp_db.archive_hashes(shot)
+    written, removed = [], []
+    for title, archive in data["archives"].items():
+        if stored.get(title) == archive["cameras"]:
+            continue
+        cameras = [data["records"][key] for key in archive["cameras"]]
+        camp_db.put(shot, title, cameras, archive["cameras"], base_path(title))
+        written.append(title)
+    for title in stored:
+        if title not in data["archives"]:
+            camp_db.remove(shot, title)
+            removed.append(title)
+    _db_writes[0] += bool(written or removed)
+    return written, removed
+
+def remove(title):
+    """Remove an archive. Returns False when there is none of that title."""
+    removed = camp_db.enabled() and camp_db.remove(camp_db.current_shot(), title)
+    _db_writes[0] += removed
+    data = load()
+    if data["archives"].pop(title, None) is not None:
+        save(data)
+        removed = True
+    return removed
+
+
+def camera_record(scene, camera, slot, mist_depth=None):
+    record = {
+        "name": camera.name,
+        "slot": slot,
+        "location": list(camera.location),
+        "rotation": list(camera.rotation_euler),
+    }
+    for prop in DATA_PROPS:
+        record[prop] = getattr(camera.data, prop)
+    per_camera_resolution = getattr(camera.data, "per_camera_resolution", None)
+    if per_camera_resolution is not None:
+        record["resolution_x"] = per_camera_resolution.resolution_x
+        record["resolution_y"] = per_camera_resolution.resolution_y
+    else:
+        record["resolution_x"], record["resolution_y"] = 1920, 1080
+    # Mist depth of the CamP, read from its keys at the CamP frame
+    record["mist_depth"] = camp_state.mist_depth(scene, slot) if mist_depth is None else mist_depth
+    return record
+
+def snapshot(scene=None):
+    """Camera records of the enabled CamPs."""
+    scene = scene or bpy.context.scene
+    CamP_entries = camp_registry.entries(scene)
+    depths = camp_state.mist_depths(scene, [entry.slot for entry in CamP_entries])
+    return [camera_record(scene, entry.camera, entry.slot, depths[entry.slot]) for entry in CamP_entries]
+
+def find_camera(record, scene=None):
+    """Camera of a record: the registered CamP of its slot, else the object of its name."""
+    camera = camp_registry.get_camera(record["slot"], scene) if record.get("slot") is not None else None
+    if camera is None:
+        camera = bpy.data.objects.get(record["name"])
+    return camera if camera is not None and camera.type == 'CAMERA' else None
+
+def current_record(record, scene=None):
+    """Record of the current state of the camera a record belongs to, or None without camera."""
+    scene = scene or bpy.context.scene
+    camera = find_camera(record, scene)
+    if camera is None:
+        return None
+    slot = record.get("slot")
+    if slot is None:
+        slot = camp_registry.slot_of(camera, scene)
+    return camera_record(scene, camera, slot)
+
+def changed_records(title, scene=None):
+    """(record, camera) of the cameras of an archive whose current parameters differ from it."""
+    scene = scene or bpy.context.scene
+    archive = get(title)
+    if archive is None:
+        return None
+    changed = []
+    for key, record in zip(get_hashes(title), archive["cameras"]):
+        current = current_record(record, scene)
+        if current is not None and record_hash(current) != key:
+            changed.append((record, find_camera(record, scene)))
+    return changed
+
+
+def camera_key(record):
+    return record["slot"] if record.get("slot") is not None else record["name"]
+
+def diff(old_cameras, new_cameras):
+    """[(camera key, "changed" | "added" | "removed"), ...] between two lists of camera records."""
+    old = {camera_key(record): record_hash(record) for record in old_cameras}
+    new = {camera_key(record): record_hash(record) for record in new_cameras}
+    changes = []
+    for key in sorted(old.keys() | new.keys(), key=lambda key: (isinstance(key, str), key)):
+        if key not in new:
+            changes.append((key, "removed"))
+        elif key not in old:
+            changes.append((key, "added"))
+        elif old[key] != new[key]:
+            changes.append((key, "changed"))
+    return changes
+
+def diff_titles(old_title, new_title=None, scene=None):
+    """Changes from archive old_title to archive new_title, or to the current CamPs without new_title."""
+    old = get(old_title)
+    new = get(new_title) if new_title else {"cameras": snapshot(scene)}
+    if old is None or new is None:
+        return None
+    return diff(old["cameras"], new["cameras"])
+
+
+def parse_legacy(text):
+    """Archives of the CamP_backups_list.md format, as version 1 archives."""
+    data = {"format": ARCHIVE_FORMAT, "version": 1, "archives": {}}
+    cameras = record = None
+    for line in text.split("\n"):
+        if line.startswith(LEGACY_HEADER + LEGACY_TITLE_PREFIX) and line.endswith(LEGACY_HEADER):
+            title = line[len(LEGACY_HEADER + LEGACY_TITLE_PREFIX):-len(LEGACY_HEADER)].strip()
+            cameras = []
+            data["archives"][title] = {"cameras": cameras}
+            record = None
+        elif cameras is None:
+            continue
+        elif line == LEGACY_CAMERA_END:
+            record = None
+        elif record is not None and ": " in line:
+            key, value = line.split(": ", 1)
+            if key in LEGACY_FIELDS:
+                name, parser = LEGACY_FIELDS[key]
+                record[name] = parser(value)
+        elif line.strip():
+            match = camp_registry.CAMERA_NAME_RE.match(line.strip())
+            record = {"name": line.strip(), "slot": int(match.group(1)) if match else None}
+            cameras.append(record)
+    return data
+
+def import_legacy(text_name=LEGACY_TEXT_NAME, overwrite=False):
+    """Merge the archives of a CamP_backups_list.md text block. Returns (imported titles, skipped titles).
+
+    Titles that already have an archive are skipped unless overwrite is set.
+    """
+    legacy = bpy.data.texts.get(text_name)
+    if legacy is None:
+        return [], []
+    legacy_archives = parse_legacy(legacy.as_string())["archives"]
+    data = load() if get_text() else empty()
+    imported, skipped = [], []
+    for title, archive in legacy_archives.items():
+        if title in data["archives"] and not overwrite:
+            skipped.append(title)
+            continue
+        data["archives"][title] = {"cameras": add_records(data, archive["cameras"])}
+        imported.append(title)
+    save(data)
+    return imported, skipped
@@ -0,0 +1,203 @@
+"""Optional on-disk CamP archive database, shared by every .blend file of a project folder.
+
+The SQLite file sits in the multires_projecting/ output folder next to the .blend files
+and holds the archives of every shot (the .blend file name), their output folders and
+the render status of their CamPs. Camera records are content addressed like in the
+text block archives. It is enabled per scene with the "mp_camp_db" scene property; the
+text block archives are written either way.
+
+Connections use a busy timeout and writes take the write lock up front (BEGIN
+IMMEDIATE), so several headless Blender processes can share the file. The default
+rollback journal is kept: WAL needs shared memory between the processes, which network
+shares (where project folders often sit) don't provide.
+"""
+
+import bpy
+import os
+import json
+import time
+import sqlite3
+from contextlib import closing, contextmanager
+
+
+DB_NAME = "camp_archives.sqlite"
+OUTPUT_DIR = "multires_projecting"
+ENABLE_PROP = "mp_camp_db"
+BUSY_TIMEOUT_MS = 30000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    hash TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS archives (
+    id INTEGER PRIMARY KEY,
+    shot TEXT NOT NULL,
+    title TEXT NOT NULL,
+    base_path TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    UNIQUE (shot, title)
+);
+CREATE TABLE IF NOT EXISTS archive_cameras (
+    archive_id INTEGER NOT NULL REFERENCES archives (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    slot INTEGER,
+    camera TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES records (hash),
+    render_status TEXT NOT NULL DEFAULT 'none',
+    rendered_at REAL,
+    PRIMARY KEY (archive_id, position)
+);
+CREATE INDEX IF NOT EXISTS archives_title ON archives (title);
+CREATE INDEX IF NOT EXISTS archive_cameras_camera ON archive_cameras (camera);
+CREATE INDEX IF NOT EXISTS archive_cameras_slot ON archive_cameras (archive_id, slot);
+CREATE INDEX IF NOT EXISTS archive_cameras_hash ON archive_cameras (hash);
+"""
+
+
+def enabled(scene=None):
+    scene = scene or bpy.context.scene
+    return bool(scene.get(ENABLE_PROP, False)) and bool(bpy.data.filepath)
+
+def db_path():
+    return os.path.join(bpy.path.abspath(f"//{OUTPUT_DIR}"), DB_NAME)
+
+def current_shot():
+    return os.path.splitext(bpy.path.basename(bpy.data.filepath))[0]
+
+def native_path(path):
+    """Absolute, platform native form of a (possibly //-relative) path, without trailing separator."""
+    return os.path.normpath(bpy.path.abspath(path))
+
+
+def connect(path=None):
+    path = path or db_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Transactions are opened explicitly, see transaction()
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # Also turns back a database left in WAL mode by an earlier version
+    connection.execute("PRAGMA journal_mode = DELETE")
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+@contextmanager
+def transaction(path=None):
+    """Connection in a write transaction, committed on success and rolled back on errors."""
+    with closing(connect(path)) as connection:
+        # Take the write lock now, instead of failing to upgrade a read lock later
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+def query(sql, params=(), path=None):
+    with closing(connect(path)) as connection:
+        return connection.execute(sql, params).fetchall()
+
+
+def put(shot, title, cameras, hashes, base_path):
+    """Store an archive (camera records with their content hashes), replacing one of that shot and title."""
+    with transaction() as connection:
+        connection.executemany("INSERT OR IGNORE INTO records (hash, data) VALUES (?, ?)",
+                               [(key, json.dumps(record)) for key, record in zip(hashes, cameras)])
+        connection.execute("DELETE FROM archives WHERE shot = ? AND title = ?", (shot, title))
+        archive_id = connection.execute(
+            "INSERT INTO archives (shot, title, base_path, saved_at) VALUES (?, ?, ?, ?)",
+            (shot, title, native_path(base_path), time.time())).lastrowid
+        connection.executemany(
+            "INSERT INTO archive_cameras (archive_id, position, slot, camera, hash) VALUES (?, ?, ?, ?, ?)",
+            [(archive_id, i, record.get("slot"), record["name"], key) for i, (key, record) in enumerate(zip(hashes, cameras))])
+        collect_garbage(connection)
+
+def remove(shot, title):
+    """Remove an archive. Returns False when there is none of that shot and title."""
+    with transaction() as connection:
+        removed = connection.execute("DELETE FROM archives WHERE shot = ? AND title = ?", (shot, title)).rowcount
+        collect_garbage(connection)
+    return bool(removed)
+
+def collect_garbage(connection):
+    connection.execute("DELETE FROM records WHERE hash NOT IN (SELECT hash FROM archive_cameras)")
+
+def titles(shot):
+    rows = query("SELECT title FROM archives WHERE shot = ? ORDER BY id", (shot,))
+    return [title for title, in rows]
+
+def get(shot, title):
+    """(hashes, camera records) of an archive, or None."""
+    rows = query("SELECT c.hash, r.data FROM archives a "
+                 "JOIN archive_cameras c ON c.archive_id = a.id JOIN records r ON r.hash = c.hash "
+                 "WHERE a.shot = ? AND a.title = ? ORDER BY c.position", (shot, title))
+    if not rows:
+        return None
+    return [key for key, data in rows], [json.loads(data) for key, data in rows]
+
+def archive_hashes(shot):
+    """{title: [record hash, ...]} of every archive of a shot."""
+    rows = query("SELECT a.title, c.hash FROM archives a JOIN archive_cameras c ON c.archive_id = a.id "
+                 "WHERE a.shot = ? ORDER BY a.id, c.position", (shot,))
+    hashes = {title: [] for title in titles(shot)}
+    for title, key in rows:
+        hashes[title].append(key)
+    return hashes
+
+def archives(shot=None, title=None, camera=None):
+    """[(shot, title, base_path, saved_at), ...] of the archives matching the given filters."""
+    sql = "SELECT DISTINCT a.shot, a.title, a.base_path, a.saved_at FROM archives a"
+    conditions, params = [], []
+    if camera is not None:
+        sql += " JOIN archive_cameras c ON c.archive_id = a.id"
+        conditions.append("c.camera = ?")
+        params.append(camera)
+    if shot is not None:
+        conditions.append("a.shot = ?")
+        params.append(shot)
+    if title is not None:
+        conditions.append("a.title = ?")
+        params.append(title)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return query(sql + " ORDER BY a.shot, a.id", params)
+
+def set_render_status(shot, title, slot, status="rendered"):
+    """Record the render status of a CamP of an archive. Returns False when the archive has no such CamP."""
+    with transaction() as connection:
+        updated = connection.execute(
+            "UPDATE archive_cameras SET render_status = ?, rendered_at = ? "
+            "WHERE slot = ? AND archive_id = (SELECT id FROM archives WHERE shot = ? AND title = ?)",
+            (status, time.time(), slot, shot, title)).rowcount
+    return bool(updated)
+
+def render_status(shot, title):
+    """{slot: (render status, rendered_at)} of an archive."""
+    rows = query("SELECT c.slot, c.render_status, c.rendered_at FROM archive_cameras c "
+                 "JOIN archives a ON a.id = c.archive_id WHERE a.shot = ? AND a.title = ?", (shot, title))
+    return {slot: (status, rendered_at) for slot, status, rendered_at in rows}
+
+
+def output_title(scene):
+    """Archive title the Output_path_MP node points at (//multires_projecting/<title>/), or None."""
+    output_path_node = scene.node_tree.nodes.get("Output_path_MP") if scene.node_tree else None
+    if output_path_node is None:
+        return None
+    parent, title = os.path.split(os.path.normpath(output_path_node.base_path.replace("//", "")))
+    return title if os.path.basename(parent) == OUTPUT_DIR else None
+
+def mark_rendered(scene, slot):
+    """Mark a CamP of the archive the scene renders to as rendered, when the database is enabled."""
+    if not enabled(scene):
+        return False
+    title = output_title(scene)
+    if title is None:
+        return False
+    try:
+        return set_render_status(current_shot(), title, slot)
+    except sqlite3.Error as e:
+        # The render itself went through; only its status is lost
+        print(f"CamP archive database error, render status not recorded: {e}")
+        return False
@@ -0,0 +1,163 @@
+import bpy
+import os
+import re
+
+
+CAMERA_PREFIX = "CamP_sub"
+CAMERA_NAME_RE = re.compile(rf"^{CAMERA_PREFIX}(\d+)$")
+
+def camera_name(slot):
+    """Naming convention of a CamP slot, also used for its output folder and images."""
+    return f"{CAMERA_PREFIX}{slot:02d}"
+
+
+def poll_camera(self, obj):
+    return obj.type == 'CAMERA'
+
+def update_slot(self, context):
+    invalidate(self.id_data)
+
+class CamPRegistryEntry(bpy.types.PropertyGroup):
+    camera: bpy.props.PointerProperty(name="Camera", type=bpy.types.Object, poll=poll_camera)
+    slot: bpy.props.IntProperty(name="Slot", description="CamP number, keyed on frame -slot", default=1, min=1, update=update_slot)
+    resolution: bpy.props.IntVectorProperty(name="Resolution", description="Render resolution of the CamP, 0 uses the scene resolution", size=2, default=(0, 0), min=0)
+    image_path: bpy.props.StringProperty(name="Image Path", description="Overpaint image, empty uses <Output_path_MP>/CamP_subNN/CamP_subNN_render.psd", subtype='FILE_PATH')
+    enabled: bpy.props.BoolProperty(name="Enabled", default=True)
+
+class CamPSlotToggle(bpy.types.PropertyGroup):
+    """One checkbox per CamP slot in operator dialogs, which can't hold object pointers."""
+    slot: bpy.props.IntProperty()
+    use: bpy.props.BoolProperty(default=False)
+
+CLASSES = (CamPRegistryEntry, CamPSlotToggle)
+
+
+def unregister():
+    if hasattr(bpy.types.Scene, "mp_camp_registry"):
+        del bpy.types.Scene.mp_camp_registry
+    # Match by name so classes of a reloaded copy of this module are replaced too
+    for cls in reversed(CLASSES):
+        registered = getattr(bpy.types, cls.__name__, None)
+        if registered is not None:
+            bpy.utils.unregister_class(registered)
+
+def register():
+    unregister()
+    for cls in CLASSES:
+        bpy.utils.register_class(cls)
+    bpy.types.Scene.mp_camp_registry = bpy.props.CollectionProperty(type=CamPRegistryEntry)
+    _slot_cache.clear()
+
+
+# scene session_uid -> (entry count, {slot: collection index})
+_slot_cache = {}
+
+def get_registry(scene=None):
+    if not hasattr(bpy.types.Scene, "mp_camp_registry"):
+        register()
+    return (scene or bpy.context.scene).mp_camp_registry
+
+def invalidate(scene=None):
+    _slot_cache.pop((scene or bpy.context.scene).session_uid, None)
+
+def slot_map(scene):
+    registry = get_registry(scene)
+    cached = _slot_cache.get(scene.session_uid)
+    if cached is None or cached[0] != len(registry):
+        cached = (len(registry), {entry.slot: i for i, entry in enumerate(registry)})
+        _slot_cache[scene.session_uid] = cached
+    return cached[1]
+
+def get_entry(slot, scene=None):
+    """Registry entry of a CamP slot or None, without scanning the registry."""
+    scene = scene or bpy.context.scene
+    registry = get_registry(scene)
+    i = slot_map(scene).get(slot)
+    if i is not None and (i >= len(registry) or registry[i].slot != slot):
+        # Entries were removed and added again, or reordered
+        invalidate(scene)
+        i = slot_map(scene).get(slot)
+    return None if i is None else registry[i]
+
+def get_camera(slot, scene=None):
+    entry = get_entry(slot, scene)
+    return entry.camera if entry else None
+
+def add_entry(scene, camera, slot):
+    entry = get_registry(scene).add()
+    entry.camera = camera
+    entry.slot = slot
+    invalidate(scene)
+    return entry
+
+def sync(scene=None):
+    """Register CamP_subNN cameras not registered yet and drop entries whose camera was deleted.
+
+    Returns the number of added entries.
+    """
+    scene = scene or bpy.context.scene
+    registry = get_registry(scene)
+    for i in reversed(range(len(registry))):
+        if registry[i].camera is None:
+            registry.remove(i)
+    registered = {entry.camera.name for entry in registry}
+    used = {entry.slot for entry in registry}
+    found = []
+    for obj in bpy.data.objects:
+        match = CAMERA_NAME_RE.match(obj.name)
+        if match and obj.type == 'CAMERA' and obj.name not in registered and int(match.group(1)) not in used:
+            found.append((int(match.group(1)), obj))
+    for slot, obj in sorted(found, key=lambda item: item[0]):
+        add_entry(scene, obj, slot)
+    invalidate(scene)
+    return len(found)
+
+def entries(scene=None, enabled_only=True):
+    """Registered entries with a camera, sorted by slot. An empty registry is filled from the scene first."""
+    scene = scene or bpy.context.scene
+    registry = get_registry(scene)
+    if not len(registry):
+        try:
+            sync(scene)
+        except AttributeError:
+            # Writing ID data is not allowed while drawing
+            pass
+    result = [entry for entry in registry if entry.camera and (entry.enabled or not enabled_only)]
+    result.sort(key=lambda entry: entry.slot)
+    return result
+
+def slots(scene=None, enabled_only=True):
+    return [entry.slot for entry in entries(scene, enabled_only)]
+
+def slot_of(camera, scene=None):
+    """Slot of a registered camera, else the slot of its CamP_subNN name, else None."""
+    for entry in get_registry(scene):
+        if entry.camera == camera:
+            return entry.slot
+    match = CAMERA_NAME_RE.match(camera.name)
+    return int(match.group(1)) if match else None
+
+
+def output_dir(scene, slot):
+    """Folder of the CamP's renders and overpaints, relative to the .blend file."""
+    output_path_node = scene.node_tree.nodes.get("Output_path_MP") if scene.node_tree else None
+    if output_path_node:
+        return os.path.join(output_path_node.base_path.replace("//", ""), camera_name(slot))
+    return os.path.join("multires_projecting", camera_name(slot))
+
+def image_path(scene, slot):
+    """Overpaint PSD of the CamP: the entry's image_path, or the default file in its output folder."""
+    entry = get_entry(slot, scene)
+    if entry and entry.image_path:
+        return entry.image_path
+    psd_image = f"{camera_name(slot)}_render.psd"
+    output_path_node = scene.node_tree.nodes.get("Output_path_MP") if scene.node_tree else None
+    if output_path_node:
+        psd_path = os.path.relpath(os.path.join(os.path.dirname(bpy.data.filepath), output_dir(scene, slot), psd_image), bpy.path.abspath("//"))
+        return "//" + psd_path.replace("\\", "/")
+    return os.path.join(os.path.dirname(bpy.data.filepath), output_dir(scene, slot), psd_image)
+
+
+# A reload (mp.reload_scripts) swaps in this copy's classes if the registry was registered
+if hasattr(bpy.types.Scene, "mp_camp_registry"):
+    register()
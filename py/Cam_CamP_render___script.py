@@ -1,13 +1,89 @@
 import bpy
 import os
 import re
+from . import Cam_CamP_db___script as camp_db
+from . import Cam_CamP_registry___script as camp_registry
+
+
+# Helper function: Delete files by extension
+def delete_files_by_extension(directory, extension):
+    try:
+        for filename in os.listdir(directory):
+            if filename.endswith(extension):
+                file_path = os.path.join(directory, filename)
+                os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+# Helper function: Rename MP4 files
+def rename_mp4_files(output_directory, camera_name):
+    for filename in os.listdir(output_directory):
+        if filename.endswith(".mp4"):
+            match = re.search(r'(?P<frame_number>\d{4})-(?P<end>\d{4})\.mp4$', filename)
+            if match:
+                new_filename = filename.replace(match.group(0), "").replace("{camera}", camera_name) + f"{match.group('end')}.mp4"
+                os.rename(os.path.join(output_directory, filename), os.path.join(output_directory, new_filename))
+
+# Helper function: Rename PNG files
+def rename_png_files(output_directory, camera_name):
+    for filename in os.listdir(output_directory):
+        if filename.endswith(".png"):
+            match = re.search(r'-(?P<frame_number>\d{4})\.png$', filename)
+            if match:
+                new_filename = filename.replace(match.group(0), "").replace("{camera}", camera_name) + ".png"
+                os.rename(os.path.join(output_directory, filename), os.path.join(output_directory, new_filename))
+
+def prepare_CamP_output(scene, CamP_index):
+    """Point Output_path_MP at the CamP's folder. Returns (node, original base_path, output directory)."""
+    camera_name = camp_registry.camera_name(CamP_index)
+    if camp_registry.get_camera(CamP_index, scene) is None:
+        raise ValueError(f'Camera {camera_name} is not registered')
+    output_path_node = scene.node_tree.nodes.get("Output_path_MP") if scene.node_tree else None
+    if not output_path_node or not hasattr(output_path_node, "base_path"):
+        raise ValueError('Node "Output_path_MP" not found or missing base_path attribute')
+    original_base_path = output_path_node.base_path
+    output_path_node.base_path = os.path.join(output_path_node.base_path, camera_name)
+    relative_output_directory = output_path_node.base_path.lstrip('/') + '/'
+    output_directory = os.path.join(os.path.dirname(bpy.data.filepath), relative_output_directory)
+    os.makedirs(output_directory, exist_ok=True)
+    return output_path_node, original_base_path, output_directory
+
+def render_CamP_still(scene, CamP_index):
+    """Render the controlnet images of one CamP. Needs no window, so it also runs in background mode."""
+    camera_name = camp_registry.camera_name(CamP_index)
+    output_path_node, original_base_path, output_directory = prepare_CamP_output(scene, CamP_index)
+    entry = camp_registry.get_entry(CamP_index, scene)
+    render = scene.render
+    saved = (scene.frame_current, scene.camera, render.image_settings.file_format, render.use_overwrite, scene.use_nodes)
+    saved_resolution = (render.resolution_x, render.resolution_y)
+    try:
+        delete_files_by_extension(output_directory, ".png")
+        render.image_settings.file_format = 'PNG'
+        render.use_overwrite = True
+        scene.use_nodes = True
+        if all(entry.resolution):
+            render.resolution_x, render.resolution_y = entry.resolution
+        scene.camera = entry.camera
+        # The render evaluates its own depsgraph at the frame, so the scene isn't evaluated here
+        scene.frame_current = -CamP_index
+        bpy.ops.render.render(write_still=True, scene=scene.name)
+        rename_png_files(output_directory, camera_name)
+    finally:
+        current_frame, current_camera, render.image_settings.file_format, render.use_overwrite, scene.use_nodes = saved
+        render.resolution_x, render.resolution_y = saved_resolution
+        scene.frame_current = current_frame
+        scene.camera = current_camera
+        output_path_node.base_path = original_base_path
+    camp_db.mark_rendered(scene, CamP_index)
+    return output_directory
+
 
 class RenderSelectedCamPOperator(bpy.types.Operator):
     bl_idname = "scene.render_selected_camp"
     bl_label = "Render Selected CamP"
     bl_options = {'REGISTER'}
 
-    render_CamP: bpy.props.IntProperty(name="Select CamP ind(1~24)", description="Specify a CamP_sub to render controlnet images", default=1, min=1, max=24)
+    render_CamP: bpy.props.IntProperty(name="Select CamP ind", description="Specify a registered CamP_sub to render controlnet images", default=1, min=1)
     render_video: bpy.props.BoolProperty(name="Render Video", description="Enable video rendering mode", default=False)
     frame_start: bpy.props.IntProperty(name="Frame Start", description="Start frame of the video", default=1, min=1)
     frame_count: bpy.props.IntProperty(name="Frame Count", description="Total number of frames to render", default=121, min=1)
@@ -97,139 +173,96 @@ class RenderSelectedCamPOperator(bpy.types.Operator):
         context.scene.frame_set(settings['current_frame'])
         context.scene.camera = settings['current_camera']
 
-    # Helper function: Delete files by extension
-    def delete_files_by_extension(self, directory, extension):
-        import os
-        try:
-            for filename in os.listdir(directory):
-                if filename.endswith(extension):
-                    file_path = os.path.join(directory, filename)
-                    os.remove(file_path)
-        except FileNotFoundError:
-            pass
-
     # Helper function: Remove all Viewer nodes
     def remove_existing_viewer_nodes(self, node_tree):
         viewer_nodes = [node for node in node_tree.nodes if node.type == 'VIEWER']
         for viewer_node in viewer_nodes:
             node_tree.nodes.remove(viewer_node)
 
-    # Helper function: Rename MP4 files
-    def rename_mp4_files(self, output_directory, camera_name):
-        import os
-        import re
-        for filename in os.listdir(output_directory):
-            if filename.endswith(".mp4"):
-                match = re.search(r'(?P<frame_number>\d{4})-(?P<end>\d{4})\.mp4$', filename)
-                if match:
-                    new_filename = filename.replace(match.group(0), "").replace("{camera}", camera_name) + f"{match.group('end')}.mp4"
-                    os.rename(os.path.join(output_directory, filename), os.path.join(output_directory, new_filename))
-
-    # Helper function: Rename PNG files
-    def rename_png_files(self, output_directory, camera_name):
-        import os
-        import re
-        for filename in os.listdir(output_directory):
-            if filename.endswith(".png"):
-                match = re.search(r'-(?P<frame_number>\d{4})\.png$', filename)
-                if match:
-                    new_filename = filename.replace(match.group(0), "").replace("{camera}", camera_name) + ".png"
-                    os.rename(os.path.join(output_directory, filename), os.path.join(output_directory, new_filename))
-
     # Main execution logic
     def execute(self, context):
-        import os
-        import re
-        settings = self.save_settings(context)
-        current_camera = bpy.context.scene.camera
-        camera_name = f"CamP_sub{self.render_CamP:02d}"
+        camera_name = camp_registry.camera_name(self.render_CamP)
 
-        if camera_name not in bpy.data.objects:
-            self.report({'ERROR'}, f'Camera {camera_name} does not exist')
-            return {'CANCELLED'}
+        if not self.render_video:
+            try:
+                render_CamP_still(context.scene, self.render_CamP)
+            except ValueError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+            self.report({'INFO'}, f'{camera_name} rendered successfully')
+            return {'FINISHED'}
 
+        settings = self.save_settings(context)
         node_tree = context.scene.node_tree
-        output_path_node = node_tree.nodes.get("Output_path_MP")
-        if not output_path_node or not hasattr(output_path_node, "base_path"):
-            self.report({'ERROR'}, 'Node "Output_path_MP" not found or missing base_path attribute')
+        try:
+            output_path_node, original_base_path, output_directory = prepare_CamP_output(context.scene, self.render_CamP)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
             return {'CANCELLED'}
 
-        original_base_path = output_path_node.base_path
-        output_path_node.base_path = os.path.join(output_path_node.base_path, camera_name)
-        relative_output_directory = output_path_node.base_path.lstrip('/') + '/'
-        output_directory = os.path.join(os.path.dirname(bpy.data.filepath), relative_output_directory)
-        os.makedirs(output_directory, exist_ok=True)
-
-        if self.render_video:
-            self.delete_files_by_extension(output_directory, ".mp4")
-        else:
-            self.delete_files_by_extension(output_directory, ".png")
+        delete_files_by_extension(output_directory, ".mp4")
 
         bpy.context.scene.render.image_settings.file_format = 'PNG'
         bpy.context.scene.render.use_overwrite = True
         bpy.context.scene.use_nodes = True
-        bpy.context.scene.camera = bpy.data.objects[camera_name]
+        bpy.context.scene.camera = camp_registry.get_camera(self.render_CamP, context.scene)
 
-        if self.render_video:
-            original_markers = [(marker.name, marker.frame, marker.camera) for marker in context.scene.timeline_markers if marker.camera]
-            for marker in reversed(context.scene.timeline_markers):
-                if marker.camera:
-                    context.scene.timeline_markers.remove(marker)
-
-            # Force switch to camera view
-            for area in bpy.context.screen.areas:
-                if area.type == 'VIEW_3D':
-                    for space in area.spaces:
-                        if space.type == 'VIEW_3D':
-                            if space.region_3d.view_perspective != 'CAMERA':
-                                space.region_3d.view_perspective = 'CAMERA'
-
-            context.space_data.shading.type = 'RENDERED'
-            context.space_data.shading.use_compositor = 'ALWAYS'
-            context.space_data.overlay.show_overlays = False
-
-            context.scene.frame_start = self.frame_start
-            context.scene.frame_end = self.frame_start + self.frame_count - 1
-            context.scene.render.image_settings.file_format = 'FFMPEG'
-            context.scene.render.ffmpeg.format = 'MPEG4'
-            context.scene.render.resolution_percentage = 100
-
-            self.remove_existing_viewer_nodes(node_tree)
-            viewer_node = node_tree.nodes.new("CompositorNodeViewer")
-
-            keep_indices = [i for i, v in enumerate(self.sockets_to_keep[:len(output_path_node.file_slots)]) if v]
-
-            for i in keep_indices:
-                input_socket = output_path_node.inputs[i]
-                if input_socket.is_linked:
-                    from_socket = input_socket.links[0].from_socket
-                    node_tree.links.new(from_socket, viewer_node.inputs[0])
-                    bpy.context.scene.render.filepath = os.path.join(output_directory, f"{input_socket.name}")
-                    bpy.ops.render.opengl(animation=True, view_context=True)
-                    node_tree.links.remove(viewer_node.inputs[0].links[0])
-                else:
-                    self.report({'WARNING'}, f'Slot {i+1} has no connection')
+        original_markers = [(marker.name, marker.frame, marker.camera) for marker in context.scene.timeline_markers if marker.camera]
+        for marker in reversed(context.scene.timeline_markers):
+            if marker.camera:
+                context.scene.timeline_markers.remove(marker)
 
-            node_tree.nodes.remove(viewer_node)
-            self.rename_mp4_files(output_directory, camera_name)
+        # Force switch to camera view
+        for area in bpy.context.screen.areas:
+            if area.type == 'VIEW_3D':
+                for space in area.spaces:
+                    if space.type == 'VIEW_3D':
+                        if space.region_3d.view_perspective != 'CAMERA':
+                            space.region_3d.view_perspective = 'CAMERA'
+
+        context.space_data.shading.type = 'RENDERED'
+        context.space_data.shading.use_compositor = 'ALWAYS'
+        context.space_data.overlay.show_overlays = False
+
+        context.scene.frame_start = self.frame_start
+        context.scene.frame_end = self.frame_start + self.frame_count - 1
+        context.scene.render.image_settings.file_format = 'FFMPEG'
+        context.scene.render.ffmpeg.format = 'MPEG4'
+        context.scene.render.resolution_percentage = 100
+
+        self.remove_existing_viewer_nodes(node_tree)
+        viewer_node = node_tree.nodes.new("CompositorNodeViewer")
+
+        keep_indices = [i for i, v in enumerate(self.sockets_to_keep[:len(output_path_node.file_slots)]) if v]
+
+        for i in keep_indices:
+            input_socket = output_path_node.inputs[i]
+            if input_socket.is_linked:
+                from_socket = input_socket.links[0].from_socket
+                node_tree.links.new(from_socket, viewer_node.inputs[0])
+                bpy.context.scene.render.filepath = os.path.join(output_directory, f"{input_socket.name}")
+                bpy.ops.render.opengl(animation=True, view_context=True)
+                node_tree.links.remove(viewer_node.inputs[0].links[0])
+            else:
+                self.report({'WARNING'}, f'Slot {i+1} has no connection')
 
-            for name, frame, camera in original_markers:
-                if camera and camera.name in bpy.data.objects:
-                    marker = context.scene.timeline_markers.new(name=name, frame=frame)
-                    marker.camera = bpy.data.objects[camera.name]
+        node_tree.nodes.remove(viewer_node)
+        rename_mp4_files(output_directory, camera_name)
 
-        else:
-            bpy.context.scene.frame_set(-self.render_CamP)
-            bpy.ops.render.render(write_still=True)
-            self.rename_png_files(output_directory, camera_name)
+        for name, frame, camera in original_markers:
+            if camera and camera.name in bpy.data.objects:
+                marker = context.scene.timeline_markers.new(name=name, frame=frame)
+                marker.camera = bpy.data.objects[camera.name]
 
         self.restore_settings(context, settings)
         output_path_node.base_path = original_base_path
+        camp_db.mark_rendered(context.scene, self.render_CamP)
         self.report({'INFO'}, f'{camera_name} rendered successfully')
         return {'FINISHED'}
 
-# Register operator
-bpy.utils.register_class(RenderSelectedCamPOperator)
+if __name__ == "__main__":
+    # Register operator
+    bpy.utils.register_class(RenderSelectedCamPOperator)
 
-# Call operator
-bpy.ops.scene.render_selected_camp('INVOKE_DEFAULT')
+    # Call operator
+    bpy.ops.scene.render_selected_camp('INVOKE_DEFAULT')
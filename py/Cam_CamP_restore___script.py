@@ -1,6 +1,11 @@
 import bpy
 from bpy.types import Operator, PropertyGroup, UIList
 import os
+import sqlite3
+from . import Cam_CamP_archive___script as camp_archive
+from . import Cam_CamP_db___script as camp_db
+from . import Cam_CamP_registry___script as camp_registry
+from . import Cam_CamP_state___script as camp_state
 
 class PATH_INFO_OT_Info(Operator):
     bl_idname = "object.path_info"
@@ -8,25 +13,23 @@ class PATH_INFO_OT_Info(Operator):
     bl_description = "Copy all title folder paths to clipboard"
 
     def execute(self, context):
-        backup_text = bpy.data.texts.get('CamP_backups_list.md')
-        if backup_text is not None:
-            lines = backup_text.as_string().split('\n')
-            paths = []
-            for line in lines:
-                if line.startswith('------------------------------------') and 'CameraArchive_' in line and line.endswith('------------------------------------'):
-                    title = line.split('CameraArchive_')[1].split('------------------------------------')[0].strip()
-                    base_path = f"//multires_projecting/{title}/"
-                    abs_path = bpy.path.abspath(base_path)
-                    # Replace all forward slashes with backslashes and remove the trailing backslash
-                    abs_path = abs_path.replace('/', '\\').rstrip('\\')
-                    paths.append(abs_path)
-            if paths:
-                bpy.context.window_manager.clipboard = '\n'.join(paths)
-                self.report({'INFO'}, "Paths copied to clipboard.")
+        try:
+            if camp_db.enabled(context.scene):
+                # Output folders of every shot sharing the archive database
+                paths = [base_path for shot, title, base_path, saved_at in camp_db.archives()]
             else:
-                self.report({'WARNING'}, "No paths found.")
+                paths = [camp_db.native_path(camp_archive.base_path(title)) for title in camp_archive.titles()]
+        except ValueError as e:
+            self.report({'ERROR'}, f"'{camp_archive.TEXT_NAME}' could not be read: {e}")
+            return {'CANCELLED'}
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
+        if paths:
+            bpy.context.window_manager.clipboard = '\n'.join(paths)
+            self.report({'INFO'}, "Paths copied to clipboard.")
         else:
-            self.report({'WARNING'}, "No 'CamP_backups_list.md' text block found.")
+            self.report({'WARNING'}, "No CamP backups found.")
         return {'FINISHED'}
 
 class RESTORE_OT_CamPParameters(Operator):
@@ -35,11 +38,16 @@ class RESTORE_OT_CamPParameters(Operator):
     title_index: bpy.props.IntProperty(name="Title Index", default=0)
     title: bpy.props.StringProperty(name="Backup Title")
     titles: bpy.props.CollectionProperty(type=bpy.types.PropertyGroup)
+    revision: bpy.props.IntProperty(options={'HIDDEN', 'SKIP_SAVE'})
 
     def execute(self, context):
         if self.title_index < len(self.titles):
             self.title = self.titles[self.title_index].name  # Set the title property based on the selected index
-            result = self.restore_camera_parameters()
+            try:
+                result = self.restore_camera_parameters()
+            except sqlite3.Error as e:
+                self.report({'ERROR'}, f"CamP archive database error: {e}")
+                return {'CANCELLED'}
             if result == {'FINISHED'}:
                 self.update_base_path()
             return result
@@ -48,100 +56,64 @@ class RESTORE_OT_CamPParameters(Operator):
             return {'CANCELLED'}
 
     def restore_camera_parameters(self):
-        backup_text = bpy.data.texts.get('CamP_backups_list.md')
-        if backup_text is not None:
-            lines = backup_text.as_string().split('\n')
-            i = 0
-            title_found = False
-            while i < len(lines):
-                if lines[i] == f'------------------------------------CameraArchive_{self.title}------------------------------------':
-                    title_found = True
-                elif lines[i].startswith('------------------------------------CameraArchive_'):
-                    title_found = False
-                if title_found:
-                    cam = bpy.data.objects.get(lines[i])
-                    if cam is not None and cam.type == 'CAMERA':
-                        self.apply_parameters(cam, lines[i + 1:i + 12])
-                        i += 12
-                        continue
-                i += 1
-        else:
-            self.report({'WARNING'}, "No 'CamP_backups_list.md' text block found.")
+        # Only the cameras whose current parameters differ from the backup are touched
+        changed = camp_archive.changed_records(self.title, bpy.context.scene)
+        if changed is None:
+            self.report({'WARNING'}, f"No backup found with the title '{self.title}'.")
             return {'CANCELLED'}
+        mist_depths = {}
+        for record, cam in changed:
+            self.apply_parameters(cam, record, mist_depths)
+        self.report({'INFO'}, f"Restored {len(changed)} changed CamPs from '{self.title}'.")
+        # Key the mist depth of every CamP on its CamP frame in one F-curve write,
+        # without going to those frames
+        camp_state.key_mist_depth(bpy.context.scene, mist_depths)
         return {'FINISHED'}
 
     @staticmethod
-    def apply_parameters(cam, lines):
-        import math
-        prop_map = {
-            'Location': lambda x: [float(i) for i in x.split(',')],
-            'Rotation': lambda x: [math.degrees(float(i)) for i in x.split(',')],
-            'Lens': float,
-            'Shift X': float,
-            'Shift Y': float,
-            'Clip Start': float,
-            'Clip End': float,
-            'Sensor Width': float,
-            'Resolution X': int,
-            'Resolution Y': int,
-            'Mist Depth': float,
-        }
-        # Save the current frame
-        current_frame = bpy.context.scene.frame_current
-        for line in lines:
-            if ': ' in line:
-                prop, value = line.split(': ', 1)
-                if prop in prop_map:
-                    value = prop_map[prop](value)
-                    if prop == 'Rotation':
-                        cam.rotation_euler = [math.radians(val) for val in value]
-                    elif prop == 'Location':
-                        cam.location = value
-                    elif prop in ['Resolution X']:
-                        try:
-                            cam.data.per_camera_resolution.resolution_x = int(value)
-                        except AttributeError:
-                            pass
-                    elif prop in ['Resolution Y']:
-                        try:
-                            cam.data.per_camera_resolution.resolution_y = int(value)
-                        except AttributeError:
-                            pass
-                    elif prop == 'Mist Depth':
-                        # Set the frame for the camera
-                        frame_offset = int(cam.name.split('sub')[1])
-                        frame_number = 0 - frame_offset
-                        bpy.context.scene.frame_set(frame_number)
-                        # Set the mist depth for the current world and frame
-                        world = bpy.context.scene.world
-                        world.mist_settings.depth = value
-                        # Insert a keyframe at the current frame
-                        world.mist_settings.keyframe_insert(data_path='depth', frame=frame_number)
-                    else:
-                        setattr(cam.data, prop.lower().replace(' ', '_'), value)
-        # Restore the current frame
-        bpy.context.scene.frame_set(current_frame)
-
-    def get_titles(self, context):
-        backup_text = bpy.data.texts.get('CamP_backups_list.md')
-        if backup_text is not None:
-            lines = backup_text.as_string().split('\n')
-            for i, line in enumerate(lines):
-                if line.startswith('------------------------------------') and 'CameraArchive_' in line and line.endswith('------------------------------------'):
-                    title = line.split('CameraArchive_')[1].split('------------------------------------')[0].strip()
-                    item = self.titles.add()
-                    item.name = title
-
-    def update_titles(self, context):
+    def apply_parameters(cam, record, mist_depths):
+        if "location" in record:
+            cam.location = record["location"]
+        if "rotation" in record:
+            cam.rotation_euler = record["rotation"]
+        for prop in camp_archive.DATA_PROPS:
+            if prop in record:
+                setattr(cam.data, prop, record[prop])
+        per_camera_resolution = getattr(cam.data, "per_camera_resolution", None)
+        if per_camera_resolution is not None:
+            per_camera_resolution.resolution_x = record.get("resolution_x", per_camera_resolution.resolution_x)
+            per_camera_resolution.resolution_y = record.get("resolution_y", per_camera_resolution.resolution_y)
+        if record.get("mist_depth") is not None:
+            slot = camp_registry.slot_of(cam, bpy.context.scene)
+            if slot is not None:
+                mist_depths[slot] = record["mist_depth"]
+
+    def update_titles(self, context, verify=True):
         self.titles.clear()
-        self.get_titles(context)
+        for title in camp_archive.titles(verify):
+            item = self.titles.add()
+            item.name = title
+        self.revision = camp_archive.revision()
 
     def invoke(self, context, event):
-        self.update_titles(context)
+        try:
+            self.update_titles(context)
+        except ValueError as e:
+            self.report({'ERROR'}, f"'{camp_archive.TEXT_NAME}' could not be read: {e}")
+            return {'CANCELLED'}
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
         return context.window_manager.invoke_props_dialog(self)
 
     def draw(self, context):
-        self.update_titles(context)
+        # Refill the list only when a backup was added or removed meanwhile
+        if self.revision != camp_archive.revision():
+            try:
+                self.update_titles(context, verify=False)
+            except sqlite3.Error as e:
+                # Keep the list shown; the database is asked again on the next redraw
+                print(f"CamP archive database error: {e}")
         layout = self.layout
         row = layout.row()
         row.template_list("UI_UL_list", "titles", self, "titles", self, "title_index", rows=5)
@@ -149,11 +121,15 @@ class RESTORE_OT_CamPParameters(Operator):
         if self.title_index < len(self.titles):
             remove_op.title = self.titles[self.title_index].name
         info_op = row.operator("object.path_info", text="", icon="INFO")
-        self.update_titles(context)
+        if self.title_index < len(self.titles):
+            diff_op = row.operator("object.camp_backup_diff", text="", icon="ARROW_LEFTRIGHT")
+            diff_op.title = self.titles[self.title_index].name
+        if camp_archive.LEGACY_TEXT_NAME in bpy.data.texts:
+            row.operator("object.import_camp_legacy_backups", text="", icon="IMPORT")
 
     def update_base_path(self):
         base_path = bpy.data.scenes[bpy.context.scene.name].node_tree.nodes["Output_path_MP"].base_path
-        new_base_path = f"//multires_projecting/{self.title}/"
+        new_base_path = camp_archive.base_path(self.title)
         base_path = new_base_path
         bpy.data.scenes[bpy.context.scene.name].node_tree.nodes["Output_path_MP"].base_path = new_base_path
 
@@ -161,49 +137,106 @@ class REMOVE_OT_CamPBackup(Operator):
     bl_idname = "object.remove_camp_backup"
     bl_label = "Remove CamP Backup"
     title: bpy.props.StringProperty(name="Backup Title")
-    titles: bpy.props.CollectionProperty(type=bpy.types.PropertyGroup)
 
     def execute(self, context):
-        backup_text = bpy.data.texts.get('CamP_backups_list.md')
-        if backup_text is not None:
-            lines = backup_text.as_string().split('\n')
-            title = self.title  # Use the title property
-            start_title = f'------------------------------------CameraArchive_{title}------------------------------------'
-            if start_title in lines:
-                end_title = '------------------'
-                start_idx = lines.index(start_title)
-                try:
-                    end_idx = start_idx + lines[start_idx:].index(end_title) + 1
-                    while end_idx < len(lines) and not lines[end_idx].startswith('------------------------------------CameraArchive_'):
-                        end_idx += lines[end_idx:].index(end_title) + 1
-                except ValueError:
-                    end_idx = len(lines)
-                lines = lines[:start_idx] + lines[end_idx:]
-                backup_text.from_string('\n'.join(lines).rstrip('\n') + '\n')
-            else:
-                self.report({'WARNING'}, f"No backup found with the title '{title}'.")
-                return {'CANCELLED'}
-        else:
-            self.report({'WARNING'}, "No 'CamP_backups_list.md' text block found.")
+        try:
+            removed = camp_archive.remove(self.title)
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
+        if not removed:
+            self.report({'WARNING'}, f"No backup found with the title '{self.title}'.")
             return {'CANCELLED'}
         return {'FINISHED'}
 
-    def get_titles(self, context):
-        backup_text = bpy.data.texts.get('CamP_backups_list.md')
-        if backup_text is not None:
-            lines = backup_text.as_string().split('\n')
-            for i, line in enumerate(lines):
-                if line.startswith('------------------------------------') and 'CameraArchive_' in line and line.endswith('------------------------------------'):
-                    title = line.split('CameraArchive_')[1].split('------------------------------------')[0].strip()
-                    item = self.titles.add()
-                    item.name = title
-
     def invoke(self, context, event):
-        self.titles.clear()
-        self.get_titles(context)
         return self.execute(context)
 
+class IMPORT_OT_CamPLegacyBackups(Operator):
+    bl_idname = "object.import_camp_legacy_backups"
+    bl_label = "Import CamP_backups_list.md"
+    bl_description = "Import the backups of the old CamP_backups_list.md text block; titles that already exist are kept"
+
+    def execute(self, context):
+        if camp_archive.LEGACY_TEXT_NAME not in bpy.data.texts:
+            self.report({'WARNING'}, f"No '{camp_archive.LEGACY_TEXT_NAME}' text block found.")
+            return {'CANCELLED'}
+        try:
+            imported, skipped = camp_archive.import_legacy()
+        except ValueError as e:
+            self.report({'ERROR'}, f"'{camp_archive.TEXT_NAME}' could not be read: {e}")
+            return {'CANCELLED'}
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
+        message = f"Imported {len(imported)} CamP backups"
+        if skipped:
+            message += f", kept {len(skipped)} existing: {', '.join(skipped)}"
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
+
+# The enum callback runs on every redraw, so the titles are read in invoke and again
+# only when the archive revision changes. It also keeps the items alive, which Blender
+# doesn't for dynamic enum items.
+_compare_titles = {"revision": None, "titles": [], "items": []}
+
+def update_compare_titles(verify=True):
+    _compare_titles["titles"] = camp_archive.titles(verify)
+    _compare_titles["revision"] = camp_archive.revision()
+
+def compare_items(self, context):
+    if _compare_titles["revision"] != camp_archive.revision():
+        try:
+            update_compare_titles(verify=False)
+        except sqlite3.Error as e:
+            print(f"CamP archive database error: {e}")
+    items = [("CURRENT", "current CamPs", "Compare with the current CamP parameters")]
+    items += [(title, title, "") for title in _compare_titles["titles"] if title != self.title]
+    _compare_titles["items"] = items
+    return items
+
+class DIFF_OT_CamPBackups(Operator):
+    bl_idname = "object.camp_backup_diff"
+    bl_label = "Compare CamP Backup"
+    bl_description = "List the CamPs that differ between a backup and the current CamPs or another backup"
+    title: bpy.props.StringProperty(name="Backup Title")
+    compare_to: bpy.props.EnumProperty(name="Compare to", items=compare_items)
+
+    def execute(self, context):
+        new_title = None if self.compare_to == "CURRENT" else self.compare_to
+        try:
+            changes = camp_archive.diff_titles(self.title, new_title, context.scene)
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
+        if changes is None:
+            self.report({'WARNING'}, f"No backup found with the title '{self.title}'.")
+            return {'CANCELLED'}
+        lines = [f"{camp_registry.camera_name(key) if isinstance(key, int) else key}: {status}" for key, status in changes]
+        for line in lines:
+            print(line)
+        title = f"{self.title} → {new_title or 'current'}: {len(changes)} CamPs differ"
+        context.window_manager.popup_menu(
+            lambda menu, context: [menu.layout.label(text=line) for line in lines or ["No differences"]],
+            title=title,
+            icon='ARROW_LEFTRIGHT'
+        )
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        try:
+            update_compare_titles()
+        except ValueError as e:
+            self.report({'ERROR'}, f"'{camp_archive.TEXT_NAME}' could not be read: {e}")
+            return {'CANCELLED'}
+        except sqlite3.Error as e:
+            self.report({'ERROR'}, f"CamP archive database error: {e}")
+            return {'CANCELLED'}
+        return context.window_manager.invoke_props_dialog(self)
+
 bpy.utils.register_class(PATH_INFO_OT_Info)
 bpy.utils.register_class(RESTORE_OT_CamPParameters)
 bpy.utils.register_class(REMOVE_OT_CamPBackup)
+bpy.utils.register_class(IMPORT_OT_CamPLegacyBackups)
+bpy.utils.register_class(DIFF_OT_CamPBackups)
 bpy.ops.object.restore_camp_parameters('INVOKE_DEFAULT')
@@ -0,0 +1,181 @@
+"""CamP rig exchange: every registered CamP in one versioned, checksummed JSON payload.
+
+    {"format": "mp_camp_rig", "version": 1, "checksum": "...", "cameras": [{"slot": 1, ...}, ...]}
+
+The checksum covers the cameras, so a truncated or edited paste is rejected instead of
+half applied.
+"""
+
+import bpy
+import json
+import hashlib
+from . import Cam_CamP_registry___script as camp_registry
+from . import Cam_CamP_state___script as camp_state
+
+
+RIG_FORMAT = "mp_camp_rig"
+RIG_VERSION = 1
+DATA_PROPS = ("lens", "shift_x", "shift_y", "clip_start", "clip_end", "sensor_width")
+
+
+class RigError(ValueError):
+    pass
+
+
+def checksum(cameras):
+    canonical = json.dumps(cameras, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def camera_record(scene, entry):
+    camera = entry.camera
+    record = {
+        "slot": entry.slot,
+        "name": camera.name,
+        "location": list(camera.location),
+        "rotation_mode": camera.rotation_mode,
+        "rotation_euler": list(camera.rotation_euler),
+        "rotation_quaternion": list(camera.rotation_quaternion),
+        "rotation_axis_angle": list(camera.rotation_axis_angle),
+        "resolution": list(entry.resolution),
+        # Only keyed mist is part of the rig
+        "mist_depth": camp_state.mist_depth(scene, entry.slot) if camp_state.mist_fcurve(scene) else None,
+        "enabled": entry.enabled,
+    }
+    for prop in DATA_PROPS:
+        record[prop] = getattr(camera.data, prop)
+    per_camera_resolution = getattr(camera.data, "per_camera_resolution", None)
+    if per_camera_resolution is not None:
+        record["per_camera_resolution"] = [per_camera_resolution.resolution_x, per_camera_resolution.resolution_y]
+    return record
+
+def serialize(scene=None, slots=None):
+    """The rig of the registered CamPs (all of them, or the given slots) as compact JSON."""
+    scene = scene or bpy.context.scene
+    entries = camp_registry.entries(scene, enabled_only=False)
+    if slots is not None:
+        entries = [entry for entry in entries if entry.slot in slots]
+    cameras = [camera_record(scene, entry) for entry in entries]
+    rig = {"format": RIG_FORMAT, "version": RIG_VERSION, "checksum": checksum(cameras), "cameras": cameras}
+    return json.dumps(rig, separators=(",", ":"))
+
+def parse(text):
+    """Camera records of a rig payload. Raises RigError on anything but a complete rig."""
+    try:
+        rig = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise RigError(f"Not a CamP rig, or an incomplete one ({e.msg})") from None
+    if not isinstance(rig, dict) or rig.get("format") != RIG_FORMAT:
+        raise RigError("Not a CamP rig")
+    version = rig.get("version")
+    if not is_int(version):
+        raise RigError(f"CamP rig version {version!r} is not a version number")
+    if version > RIG_VERSION:
+        raise RigError(f"CamP rig version {version} is newer than this toolset supports ({RIG_VERSION})")
+    cameras = rig.get("cameras")
+    if not isinstance(cameras, list) or rig.get("checksum") != checksum(cameras):
+        raise RigError("CamP rig checksum mismatch, the payload is incomplete or was edited")
+    # apply() must not fail halfway, so every record is checked before anything is touched
+    slots = set()
+    for i, record in enumerate(cameras):
+        problem = record_problem(record)
+        if problem:
+            raise RigError(f"CamP rig camera {i + 1}: {problem}")
+        if record["slot"] in slots:
+            raise RigError(f"CamP rig has CamP {record['slot']} twice")
+        slots.add(record["slot"])
+    return cameras
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def is_vector(value, size, item_check=is_number):
+    return isinstance(value, list) and len(value) == size and all(item_check(v) for v in value)
+
+ROTATION_MODES = {'QUATERNION', 'XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY', 'ZYX', 'AXIS_ANGLE'}
+
+def record_problem(record):
+    """What is wrong with a camera record, or None when apply() can use it."""
+    if not isinstance(record, dict):
+        return "not a camera record"
+    if not is_int(record.get("slot")) or record["slot"] < 1:
+        return f"invalid slot {record.get('slot')!r}"
+    if not is_vector(record.get("location"), 3):
+        return "invalid location"
+    if not is_vector(record.get("rotation_euler"), 3):
+        return "invalid rotation_euler"
+    for prop in DATA_PROPS:
+        if not is_number(record.get(prop)):
+            return f"invalid {prop}"
+    if "rotation_mode" in record and record["rotation_mode"] not in ROTATION_MODES:
+        return f"invalid rotation_mode {record['rotation_mode']!r}"
+    if "rotation_quaternion" in record and not is_vector(record["rotation_quaternion"], 4):
+        return "invalid rotation_quaternion"
+    if "rotation_axis_angle" in record and not is_vector(record["rotation_axis_angle"], 4):
+        return "invalid rotation_axis_angle"
+    # Each rotation mode needs the rotation it is applied from
+    if record.get("rotation_mode") == 'QUATERNION' and "rotation_quaternion" not in record:
+        return "rotation_mode QUATERNION without rotation_quaternion"
+    if record.get("rotation_mode") == 'AXIS_ANGLE' and "rotation_axis_angle" not in record:
+        return "rotation_mode AXIS_ANGLE without rotation_axis_angle"
+    if "resolution" in record and not (is_vector(record["resolution"], 2, is_int) and min(record["resolution"]) >= 0):
+        return "invalid resolution"
+    if "per_camera_resolution" in record and not is_vector(record["per_camera_resolution"], 2, is_int):
+        return "invalid per_camera_resolution"
+    if "enabled" in record and not isinstance(record["enabled"], bool):
+        return "invalid enabled"
+    if record.get("mist_depth") is not None and not is_number(record["mist_depth"]):
+        return "invalid mist_depth"
+    return None
+
+def target_collection(scene):
+    """Collection new CamPs go to: the one holding the existing CamPs, else the scene collection."""
+    for entry in camp_registry.entries(scene, enabled_only=False):
+        if entry.camera.users_collection:
+            return entry.camera.users_collection[0]
+    return scene.collection
+
+def apply(cameras, scene=None):
+    """Apply camera records in one pass; missing CamPs are created. Returns (updated, created)."""
+    scene = scene or bpy.context.scene
+    collection = None
+    updated = created = 0
+    mist_depths = {}
+    for record in cameras:
+        slot = int(record["slot"])
+        entry = camp_registry.get_entry(slot, scene)
+        if entry is None or entry.camera is None:
+            if collection is None:
+                collection = target_collection(scene)
+            name = camp_registry.camera_name(slot)
+            camera = bpy.data.objects.new(name, bpy.data.cameras.new(name))
+            collection.objects.link(camera)
+            if entry is None:
+                entry = camp_registry.add_entry(scene, camera, slot)
+            else:
+                entry.camera = camera
+            created += 1
+        else:
+            updated += 1
+        camera = entry.camera
+        camera.location = record["location"]
+        camera.rotation_mode = record.get("rotation_mode", camera.rotation_mode)
+        camera.rotation_euler = record["rotation_euler"]
+        if "rotation_quaternion" in record:
+            camera.rotation_quaternion = record["rotation_quaternion"]
+        if "rotation_axis_angle" in record:
+            camera.rotation_axis_angle = record["rotation_axis_angle"]
+        for prop in DATA_PROPS:
+            setattr(camera.data, prop, record[prop])
+        entry.resolution = record.get("resolution", (0, 0))
+        entry.enabled = record.get("enabled", True)
+        per_camera_resolution = getattr(camera.data, "per_camera_resolution", None)
+        if per_camera_resolution is not None and "per_camera_resolution" in record:
+            per_camera_resolution.resolution_x, per_camera_resolution.resolution_y = record["per_camera_resolution"]
+        if record.get("mist_depth") is not None:
+            mist_depths[slot] = record["mist_depth"]
+    # All mist keys in one F-curve write
+    camp_state.key_mist_depth(scene, mist_depths)
+    return updated, created
@@ -0,0 +1,240 @@
+"""CamP state: the keyed per-CamP values at frame -slot, read straight from the F-curves.
+
+CamP n is bound to frame -n, and switching CamPs used to mean scene.frame_set(-n), which
+re-evaluates every animated property of the scene. The toolset only keys a few things per
+CamP: the marker camera, the world mist depth, the .CamP_ID_visibility node inputs and the
+object hide_render/hide_viewport flags. These are evaluated from their F-curves here and
+applied alone.
+
+This matches frame_set for unmuted F-curves of an active action played at full influence
+with REPLACE blending, which is how the toolset keys them. Muted F-curves and groups are
+skipped like the animation system skips them. When a channel's ID also has unmuted NLA
+tracks, a partial action influence or another blend type, apply() falls back to
+frame_set. verify() checks the equivalence on the open file.
+
+The saving is in skipping the scene evaluation, so it is real where nothing evaluates the
+scene afterwards: background batch runs and renders, which evaluate their own depsgraph.
+With set_frame, the frame change still evaluates the whole animation at the next redraw
+or view layer update. benchmark() times both cases, the evaluation that follows included.
+"""
+
+import bpy
+import time
+from collections import namedtuple
+from . import anim_keys___script as anim_keys
+from . import Cam_CamP_registry___script as camp_registry
+from . import shader_nodegroup_index___script as nodegroup_index
+
+
+MIST_PATH = "mist_settings.depth"
+HIDE_PATHS = ("hide_render", "hide_viewport")
+VISIBILITY_GROUP = ".CamP_ID_visibility"
+# Blender's animation system turns a float into a bool with value > 1 - FLT_EPSILON
+FLOAT_AS_BOOL = 1.0 - 1.1920929e-07
+
+Channel = namedtuple("Channel", "id_data data_path index fcurve")
+
+
+def CamP_frame(slot):
+    return -slot
+
+def marker_camera(scene, frame):
+    """The camera the timeline markers switch to at frame, like Blender's camera switch."""
+    camera = first_camera = None
+    camera_frame = min_frame = None
+    for marker in scene.timeline_markers:
+        if marker.camera is None or marker.camera.hide_render:
+            continue
+        if marker.frame <= frame and (camera_frame is None or marker.frame > camera_frame):
+            camera, camera_frame = marker.camera, marker.frame
+        if min_frame is None or marker.frame < min_frame:
+            first_camera, min_frame = marker.camera, marker.frame
+    return camera or first_camera
+
+def mist_fcurve(scene):
+    return anim_keys.find_fcurve(scene.world, MIST_PATH) if scene.world else None
+
+def mist_depth(scene, slot):
+    """Mist depth of a CamP, without changing the frame."""
+    fcurve = mist_fcurve(scene)
+    if fcurve is None:
+        return scene.world.mist_settings.depth if scene.world else None
+    return fcurve.evaluate(CamP_frame(slot))
+
+def mist_depths(scene, slots):
+    """{slot: mist depth} of several CamPs from one F-curve lookup."""
+    fcurve = mist_fcurve(scene)
+    if fcurve is None:
+        depth = scene.world.mist_settings.depth if scene.world else None
+        return {slot: depth for slot in slots}
+    return {slot: fcurve.evaluate(CamP_frame(slot)) for slot in slots}
+
+def key_mist_depth(scene, slots_depths):
+    """Key {slot: depth} on the world mist in one bulk write; the current value follows the keys."""
+    if not slots_depths or scene.world is None:
+        return
+    fcurve = anim_keys.ensure_fcurve(scene.world, MIST_PATH)
+    anim_keys.write_keys(fcurve, {CamP_frame(slot): depth for slot, depth in slots_depths.items()})
+    scene.world.mist_settings.depth = fcurve.evaluate(scene.frame_current)
+
+
+def action_fcurves(id_data):
+    anim = id_data.animation_data
+    return anim.action.fcurves if anim and anim.action else ()
+
+def is_muted(fcurve):
+    return fcurve.mute or (fcurve.group is not None and fcurve.group.mute)
+
+def is_plain_action(id_data):
+    """True when the ID's animation is its active action alone, at full influence with REPLACE blending."""
+    anim = id_data.animation_data
+    if anim is None:
+        return True
+    if any(not track.mute for track in anim.nla_tracks):
+        return False
+    return anim.action_influence == 1.0 and anim.action_blend_type == 'REPLACE'
+
+def animated_channels(scene):
+    """Unmuted F-curves of every property the toolset keys per CamP."""
+    channels = []
+    fcurve = mist_fcurve(scene)
+    if fcurve and not is_muted(fcurve):
+        channels.append(Channel(scene.world, MIST_PATH, 0, fcurve))
+    for material, nodes in nodegroup_index.nodegroup_index.find(VISIBILITY_GROUP):
+        prefixes = tuple(f'nodes["{bpy.utils.escape_identifier(node.name)}"].inputs' for node in nodes)
+        for fcurve in action_fcurves(material.node_tree):
+            if fcurve.data_path.startswith(prefixes) and not is_muted(fcurve):
+                channels.append(Channel(material.node_tree, fcurve.data_path, fcurve.array_index, fcurve))
+    for obj in scene.objects:
+        for fcurve in action_fcurves(obj):
+            if fcurve.data_path in HIDE_PATHS and not is_muted(fcurve):
+                channels.append(Channel(obj, fcurve.data_path, fcurve.array_index, fcurve))
+    return channels
+
+def needs_frame_set(channels):
+    """True when a channel's ID has NLA or action blending the evaluator doesn't reproduce."""
+    ids = {channel.id_data for channel in channels}
+    return not all(is_plain_action(id_data) for id_data in ids)
+
+def resolve(channel):
+    """(owner, property name) of a channel's data path."""
+    owner_path, _, prop = channel.data_path.rpartition(".")
+    owner = channel.id_data.path_resolve(owner_path) if owner_path else channel.id_data
+    return owner, prop
+
+def as_property_value(owner, prop, value):
+    prop_type = owner.bl_rna.properties[prop].type
+    if prop_type == 'BOOLEAN':
+        return value > FLOAT_AS_BOOL
+    if prop_type == 'INT':
+        return int(value)
+    return value
+
+def read_channel(channel):
+    owner, prop = resolve(channel)
+    value = getattr(owner, prop)
+    return value[channel.index] if owner.bl_rna.properties[prop].is_array else value
+
+def write_channel(channel, value):
+    owner, prop = resolve(channel)
+    value = as_property_value(owner, prop, value)
+    if owner.bl_rna.properties[prop].is_array:
+        getattr(owner, prop)[channel.index] = value
+    else:
+        setattr(owner, prop, value)
+
+
+def evaluate(scene, slot, channels=None):
+    """(camera, [(channel, value), ...]) of a CamP. Pass channels to reuse them across CamPs."""
+    frame = CamP_frame(slot)
+    channels = animated_channels(scene) if channels is None else channels
+    return marker_camera(scene, frame), [(channel, channel.fcurve.evaluate(frame)) for channel in channels]
+
+def apply(scene, slot, channels=None, set_frame=True):
+    """Switch to a CamP by applying only its keyed values.
+
+    With set_frame the frame becomes -slot through frame_current. That tags a frame
+    change, so the next redraw or view layer update still evaluates the whole
+    animation; it then agrees with the applied values. Without set_frame nothing
+    else is evaluated, which is the fast path for background and render use.
+    Falls back to frame_set when needs_frame_set(channels).
+    """
+    channels = animated_channels(scene) if channels is None else channels
+    if needs_frame_set(channels):
+        scene.frame_set(CamP_frame(slot))
+        return scene.camera
+    camera, values = evaluate(scene, slot, channels)
+    if camera:
+        scene.camera = camera
+    for channel, value in values:
+        write_channel(channel, value)
+    if set_frame:
+        scene.frame_current = CamP_frame(slot)
+    return camera
+
+
+def verify(scene=None, slots=None, tolerance=1e-5):
+    """Compare the evaluator with scene.frame_set on every CamP. Returns the mismatches."""
+    scene = scene or bpy.context.scene
+    slots = camp_registry.slots(scene) if slots is None else slots
+    channels = animated_channels(scene)
+    mismatches = []
+    original_frame = scene.frame_current
+    try:
+        for slot in slots:
+            camera, values = evaluate(scene, slot, channels)
+            scene.frame_set(CamP_frame(slot))
+            if camera and scene.camera != camera:
+                mismatches.append((slot, "camera", camera.name, scene.camera.name if scene.camera else None))
+            for channel, value in values:
+                owner, prop = resolve(channel)
+                expected = as_property_value(owner, prop, value)
+                actual = read_channel(channel)
+                if abs(float(actual) - float(expected)) > tolerance:
+                    mismatches.append((slot, f"{channel.id_data.name}: {channel.data_path}[{channel.index}]", expected, actual))
+    finally:
+        scene.frame_set(original_frame)
+    for mismatch in mismatches:
+        print("CamP state mismatch:", *mismatch)
+    print(f"CamP state verified on {len(slots)} CamPs, {len(channels)} channels: {len(mismatches)} mismatches")
+    return mismatches
+
+def benchmark(scene=None, slots=None):
+    """Time switching through the CamPs with frame_set and with the evaluator.
+
+    The evaluator is timed with set_frame, followed by the view layer update a redraw
+    would run, and without set_frame, as background and render use it.
+    """
+    scene = scene or bpy.context.scene
+    slots = camp_registry.slots(scene) if slots is None else slots
+    view_layer = bpy.context.view_layer
+    original_frame, original_camera = scene.frame_current, scene.camera
+
+    start = time.perf_counter()
+    for slot in slots:
+        scene.frame_set(CamP_frame(slot))
+    frame_set_seconds = time.perf_counter() - start
+    scene.frame_set(original_frame)
+
+    start = time.perf_counter()
+    channels = animated_channels(scene)
+    for slot in slots:
+        apply(scene, slot, channels)
+        view_layer.update()
+    state_seconds = time.perf_counter() - start
+    scene.frame_set(original_frame)
+
+    start = time.perf_counter()
+    channels = animated_channels(scene)
+    for slot in slots:
+        apply(scene, slot, channels, set_frame=False)
+    state_no_frame_seconds = time.perf_counter() - start
+
+    scene.camera = original_camera
+    scene.frame_set(original_frame)
+    result = {"camps": len(slots), "channels": len(channels), "frame_set": frame_set_seconds,
+              "state": state_seconds, "state_no_frame": state_no_frame_seconds}
+    print(f"{len(slots)} CamP switches: frame_set {frame_set_seconds:.4f}s, "
+          f"state + update {state_seconds:.4f}s ({frame_set_seconds / max(state_seconds, 1e-9):.1f}x), "
+          f"state without frame change {state_no_frame_seconds:.4f}s ({frame_set_seconds / max(state_no_frame_seconds, 1e-9):.1f}x)")
+    return result
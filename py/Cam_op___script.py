@@ -1,68 +1,110 @@
 import bpy
+import math
+import time
+import sqlite3
+import numpy as np
+from . import anim_keys___script as anim_keys
+from . import Cam_CamP_registry___script as camp_registry
+from . import Cam_CamP_state___script as camp_state
+from . import Cam_CamP_rig___script as camp_rig
+from . import Cam_CamP_db___script as camp_db
+from . import Cam_CamP_archive___script as camp_archive
 
 class Cam_Visibility:
+    data_paths = ("hide_render", "hide_viewport")
+
     @staticmethod
-    def has_keyframe(obj, frame):
+    def keyed_frames(obj):
+        """{data_path: set of keyed frames} for the object's action, read once per operation."""
+        index = {}
         if obj.animation_data and obj.animation_data.action:
             for fcurve in obj.animation_data.action.fcurves:
-                if frame in [kf.co[0] for kf in fcurve.keyframe_points]:
-                    return True
-        return False
+                co = np.empty(len(fcurve.keyframe_points) * 2, dtype=np.float32)
+                fcurve.keyframe_points.foreach_get("co", co)
+                index.setdefault(fcurve.data_path, set()).update(co[0::2].tolist())
+        return index
+
+    @staticmethod
+    def has_keyframe(obj, frame, index=None):
+        index = Cam_Visibility.keyed_frames(obj) if index is None else index
+        return any(frame in frames for frames in index.values())
+
+    @staticmethod
+    def write_keys(obj, keys, index=None):
+        """Key {frame: hidden} on hide_render and hide_viewport in one bulk write per F-curve.
+
+        With an index, frames already keyed on a data path are left alone there.
+        """
+        frame = bpy.context.scene.frame_current
+        for data_path in Cam_Visibility.data_paths:
+            frames = index.get(data_path, ()) if index is not None else ()
+            new_keys = {f: float(hidden) for f, hidden in keys.items() if f not in frames}
+            if new_keys:
+                fcurve = anim_keys.ensure_fcurve(obj, data_path)
+                anim_keys.write_keys(fcurve, new_keys, interpolation='CONSTANT')
+                if index is not None:
+                    index.setdefault(data_path, set()).update(new_keys)
+            else:
+                fcurve = anim_keys.find_fcurve(obj, data_path)
+            # Show the keyed state right away instead of re-evaluating the scene with frame_set,
+            # converted to bool the way the animation system does
+            if fcurve:
+                setattr(obj, data_path, camp_state.as_property_value(obj, data_path, fcurve.evaluate(frame)))
 
     @staticmethod
     def insert_keyframes(obj, frame, visibility):
-        obj.hide_render = visibility
-        obj.hide_viewport = visibility
-        if not Cam_Visibility.has_keyframe(obj, frame):
-            obj.keyframe_insert(data_path="hide_render", frame=frame)
-            obj.keyframe_insert(data_path="hide_viewport", frame=frame)
+        Cam_Visibility.write_keys(obj, {frame: visibility}, Cam_Visibility.keyed_frames(obj))
 
 
     @staticmethod
     def hide_all_objects():
-        scene = bpy.context.scene
-        original_frame = scene.frame_current
-        obj_list = bpy.context.selected_objects
-        frame_ranges = [(-24, 0)]
+        # Visible before and after the CamP range, hidden from its first frame on
+        for obj in bpy.context.selected_objects:
+            Cam_Visibility.write_keys(obj, {-25: False, -24: True, 0: False}, Cam_Visibility.keyed_frames(obj))
+
 
-        for obj in obj_list:
-            if not Cam_Visibility.has_keyframe(obj, -25):
-                Cam_Visibility.insert_keyframes(obj, -25, False)
-            if not Cam_Visibility.has_keyframe(obj, 0):
-                Cam_Visibility.insert_keyframes(obj, 0, False)
+    @staticmethod
+    def benchmark(object_count=5000):
+        """Time hide_all and hide_current style keying on synthetic objects.
 
-        for start, end in frame_ranges:
-            for obj in obj_list:
-                Cam_Visibility.insert_keyframes(obj, start, True)
-                Cam_Visibility.insert_keyframes(obj, end, True)
-                if start == -24:
-                    Cam_Visibility.insert_keyframes(obj, start, False)
-                if end == 0:
-                    Cam_Visibility.insert_keyframes(obj, end, False)
-        scene.frame_set(original_frame)
+        Run from the Python console, e.g. Cam_Visibility.benchmark(). The objects and
+        their actions are removed afterwards.
+        """
+        objects = [bpy.data.objects.new(f"mp_benchmark_visibility_{i}", None) for i in range(object_count)]
+        try:
+            start = time.perf_counter()
+            for obj in objects:
+                Cam_Visibility.write_keys(obj, {-25: False, -24: True, 0: False}, Cam_Visibility.keyed_frames(obj))
+            hide_all_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for obj in objects:
+                index = Cam_Visibility.keyed_frames(obj)
+                Cam_Visibility.write_keys(obj, {-12: True}, None)
+                Cam_Visibility.write_keys(obj, {-13: False, -11: False}, index)
+            hide_current_seconds = time.perf_counter() - start
+        finally:
+            actions = {obj.animation_data.action for obj in objects if obj.animation_data and obj.animation_data.action}
+            for obj in objects:
+                bpy.data.objects.remove(obj)
+            for action in actions:
+                bpy.data.actions.remove(action)
+
+        report = {"objects": object_count, "hide_all_seconds": hide_all_seconds, "hide_current_seconds": hide_current_seconds}
+        print(f"visibility keys on {object_count} objects: hide_all {hide_all_seconds:.3f}s, hide_current {hide_current_seconds:.3f}s")
+        return report
 
 
     @staticmethod
     def hide_current_object():
-        scene = bpy.context.scene
-        original_frame = scene.frame_current
-        obj_list = bpy.context.selected_objects
-        for obj in obj_list:
-            current_frame = scene.frame_current
-            if -24 <= current_frame <= -1:
-                # Remove existing keyframe if any
-                if obj.animation_data and obj.animation_data.action:
-                    for fcurve in obj.animation_data.action.fcurves:
-                        for kf in fcurve.keyframe_points:
-                            if kf.co[0] == current_frame:
-                                fcurve.keyframe_points.remove(kf)
-                # Insert new keyframes
-                Cam_Visibility.insert_keyframes(obj, current_frame, True)
-                if not Cam_Visibility.has_keyframe(obj, current_frame - 1):
-                    Cam_Visibility.insert_keyframes(obj, current_frame - 1, False)
-                if not Cam_Visibility.has_keyframe(obj, current_frame + 1):
-                    Cam_Visibility.insert_keyframes(obj, current_frame + 1, False)
-        scene.frame_set(original_frame)
+        current_frame = bpy.context.scene.frame_current
+        if not -24 <= current_frame <= -1:
+            return
+        for obj in bpy.context.selected_objects:
+            index = Cam_Visibility.keyed_frames(obj)
+            # The current frame is always rekeyed, the neighbours only when not keyed yet
+            Cam_Visibility.write_keys(obj, {current_frame: True}, None)
+            Cam_Visibility.write_keys(obj, {current_frame - 1: False, current_frame + 1: False}, index)
 
 
 
@@ -93,24 +135,20 @@ class Cam_Switch:
             )
             return
 
-        cam_list = [f"CamP_sub{str(i).zfill(2)}" for i in range(1, 25)]
-        cam_objects = {name: bpy.data.objects.get(name) for name in cam_list}
-        existing_cam_names = [name for name, cam in cam_objects.items() if cam]
-
         class CamP_fit_to_active_Operator(bpy.types.Operator):
             bl_idname = "object.camp_fit_to_active"
             bl_label = "CamP_fit_to_active"
             bl_options = {'REGISTER'}
 
-            selected_cam_index: bpy.props.IntProperty(name="CamP ind(1~24)", description="Specific a CamP_sub to apply", default=1, min=1, max=24)
+            selected_cam_index: bpy.props.IntProperty(name="CamP ind", description="Specific a registered CamP_sub to apply", default=1, min=1)
 
             def invoke(self, context, event):
                 wm = context.window_manager
                 return wm.invoke_props_dialog(self)
 
             def execute(self, context):
-                selected_cam_name = f"CamP_sub{str(self.selected_cam_index).zfill(2)}"
-                target_cam = bpy.data.objects.get(selected_cam_name)
+                selected_cam_name = camp_registry.camera_name(self.selected_cam_index)
+                target_cam = camp_registry.get_camera(self.selected_cam_index, context.scene)
                 if target_cam:
                     if active_camera and context.space_data.region_3d.view_perspective == 'CAMERA':
                         active_cam_data = active_camera.data
@@ -125,7 +163,7 @@ class Cam_Switch:
                     self.report({'INFO'}, f"CamP_sub{self.selected_cam_index} updated successfully.")
                 else:
                     bpy.context.window_manager.popup_menu(
-                        lambda self, context: self.layout.label(text=f"Error: Camera {selected_cam_name} does not exist."),
+                        lambda self, context: self.layout.label(text=f"Error: Camera {selected_cam_name} is not registered."),
                         title="Error",
                         icon='ERROR'
                     )
@@ -207,6 +245,88 @@ class Cam_Switch:
             title="Success",
             icon='INFO'
         )
+
+
+    @staticmethod
+    def rig_popup(message, title="Success", icon='INFO'):
+        bpy.context.window_manager.popup_menu(
+            lambda self, context: self.layout.label(text=message),
+            title=title,
+            icon=icon
+        )
+
+    @staticmethod
+    def apply_rig(text, source):
+        try:
+            cameras = camp_rig.parse(text)
+        except camp_rig.RigError as e:
+            Cam_Switch.rig_popup(f"Error: {e}", title="Error", icon='ERROR')
+            return
+        updated, created = camp_rig.apply(cameras, bpy.context.scene)
+        # The panel operators don't push undo steps themselves; the whole rig is one step
+        bpy.ops.ed.undo_push(message="Apply CamP rig")
+        Cam_Switch.rig_popup(f"CamP rig applied from {source}: {updated} updated, {created} created.")
+
+    @staticmethod
+    def copy_rig_to_clipboard():
+        payload = camp_rig.serialize(bpy.context.scene)
+        bpy.context.window_manager.clipboard = payload
+        Cam_Switch.rig_popup(f"CamP rig copied to clipboard ({len(camp_registry.entries(bpy.context.scene, enabled_only=False))} CamPs).")
+
+    @staticmethod
+    def apply_rig_from_clipboard():
+        Cam_Switch.apply_rig(bpy.context.window_manager.clipboard, "clipboard")
+
+    @staticmethod
+    def rig_file():
+        class CamPRigFileOperator(bpy.types.Operator):
+            """Export or import all CamPs as a CamP rig file"""
+            bl_idname = "object.camp_rig_file"
+            bl_label = "CamP Rig File"
+            bl_options = {'REGISTER'}
+
+            filepath: bpy.props.StringProperty(subtype='FILE_PATH')
+            filter_glob: bpy.props.StringProperty(default="*.json", options={'HIDDEN'})
+            mode: bpy.props.EnumProperty(name="Mode", items=[('EXPORT', "Export", ""), ('IMPORT', "Import", "")])
+
+            def execute(self, context):
+                filepath = bpy.path.abspath(self.filepath)
+                if self.mode == 'EXPORT':
+                    if not filepath.lower().endswith(".json"):
+                        filepath += ".json"
+                    with open(filepath, "w", encoding="utf-8") as f:
+                        f.write(camp_rig.serialize(context.scene))
+                    self.report({'INFO'}, f"CamP rig exported to {filepath}")
+                else:
+                    try:
+                        with open(filepath, encoding="utf-8") as f:
+                            text = f.read()
+                    except OSError as e:
+                        self.report({'ERROR'}, str(e))
+                        return {'CANCELLED'}
+                    Cam_Switch.apply_rig(text, bpy.path.basename(filepath))
+                return {'FINISHED'}
+
+            def invoke(self, context, event):
+                if not self.filepath:
+                    self.filepath = bpy.path.abspath("//CamP_rig.json")
+                context.window_manager.fileselect_add(self)
+                return {'RUNNING_MODAL'}
+
+        # Register the operator if it hasn't been registered yet
+        if CamPRigFileOperator.bl_idname not in bpy.types.Operator.__subclasses__():
+            bpy.utils.register_class(CamPRigFileOperator)
+        return CamPRigFileOperator
+
+    @staticmethod
+    def export_rig_file():
+        Cam_Switch.rig_file()
+        bpy.ops.object.camp_rig_file('INVOKE_DEFAULT', mode='EXPORT')
+
+    @staticmethod
+    def import_rig_file():
+        Cam_Switch.rig_file()
+        bpy.ops.object.camp_rig_file('INVOKE_DEFAULT', mode='IMPORT')
                 
     @staticmethod
     def QShot_combine():
@@ -228,30 +348,44 @@ class Cam_Switch:
             # Copy over the camera properties
             for attr in ["lens", "shift_x", "shift_y", "clip_start", "clip_end", "sensor_width"]:
                 setattr(new_camera, attr, getattr(first_shot_camera.data, attr))
+            # Shots are merged in marker order and a later shot owns the frames of its keys:
+            # earlier keys inside that range are dropped on every F-curve the shot keys
+            merged_keys = {}  # (data_path, array_index) -> {attr: array}
+            source_fcurves = {}  # (data_path, array_index) -> F-curve of the first shot keying it
+            frame_end = None
+            shot_count = 0
             for camera in Shot_cameras:
-                if camera.animation_data.action:
-                    if new_camera_obj.animation_data is None:
-                        new_camera_obj.animation_data_create()
-                    if new_camera_obj.animation_data.action is None:
-                        new_camera_obj.animation_data.action = camera.animation_data.action.copy()
-                    else:
-                        new_camera_obj.animation_data.action.frame_range = (new_camera_obj.animation_data.action.frame_range[0], max(new_camera_obj.animation_data.action.frame_range[1], camera.animation_data.action.frame_range[1]))
-                        for fcurve in camera.animation_data.action.fcurves:
-                            if fcurve.data_path in [fc.data_path for fc in new_camera_obj.animation_data.action.fcurves]:
-                                new_fcurve = new_camera_obj.animation_data.action.fcurves.find(fcurve.data_path, index=fcurve.array_index)
-                                for kp in fcurve.keyframe_points:
-                                    new_kp = new_fcurve.keyframe_points.insert(kp.co[0], kp.co[1], options={'FAST'})
-                                    new_kp.interpolation = kp.interpolation
-                                    new_kp.handle_left = kp.handle_left
-                                    new_kp.handle_right = kp.handle_right
-                            else:
-                                new_fcurve = new_camera_obj.animation_data.action.fcurves.new(fcurve.data_path, index=fcurve.array_index)
-                                new_fcurve.keyframe_points.add(len(fcurve.keyframe_points))
-                                for i, kp in enumerate(fcurve.keyframe_points):
-                                    new_fcurve.keyframe_points[i].co = kp.co
-                                    new_fcurve.keyframe_points[i].interpolation = kp.interpolation
-                                    new_fcurve.keyframe_points[i].handle_left = kp.handle_left
-                                    new_fcurve.keyframe_points[i].handle_right = kp.handle_right
+                action = camera.animation_data.action if camera.animation_data else None
+                if action is None:
+                    continue
+                shot_fcurves = {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in action.fcurves if len(fcurve.keyframe_points)}
+                if not shot_fcurves:
+                    continue
+                shot_keys = {key: anim_keys.read_keys(fcurve) for key, fcurve in shot_fcurves.items()}
+                frames = np.concatenate([data["co"][0::2] for data in shot_keys.values()])
+                shot_start, shot_end = frames.min(), frames.max()
+                for key, data in shot_keys.items():
+                    merged_keys[key] = anim_keys.splice_keys(merged_keys.get(key), data, shot_start, shot_end)
+                    source_fcurves.setdefault(key, shot_fcurves[key])
+                shot_count += 1
+                frame_end = action.frame_range[1] if frame_end is None else max(frame_end, action.frame_range[1])
+                if new_camera_obj.animation_data is None:
+                    new_camera_obj.animation_data_create()
+                if new_camera_obj.animation_data.action is None:
+                    # The first shot's action brings groups, modifiers and extrapolation along
+                    new_camera_obj.animation_data.action = action.copy()
+
+            if merged_keys:
+                merged_action = new_camera_obj.animation_data.action
+                fcurves = {(fcurve.data_path, fcurve.array_index): fcurve for fcurve in merged_action.fcurves}
+                for key, data in merged_keys.items():
+                    new_fcurve = fcurves.get(key)
+                    if new_fcurve is None:
+                        group = source_fcurves[key].group
+                        new_fcurve = merged_action.fcurves.new(key[0], index=key[1], action_group=group.name if group else "")
+                    anim_keys.replace_keys(new_fcurve, data)
+                if shot_count > 1:
+                    merged_action.frame_range = (merged_action.frame_range[0], max(merged_action.frame_range[1], frame_end))
             bpy.context.view_layer.objects.active = new_camera_obj
             for area in bpy.context.screen.areas:
                 if area.type == 'VIEW_3D':
@@ -259,62 +393,101 @@ class Cam_Switch:
 
 
 class Cam_Mist:
+    cone_angle = 45  # degrees around the view direction that count for the mist distance
+
+    @staticmethod
+    def popup(message, title="Error"):
+        bpy.context.window_manager.popup_menu(lambda self, context:
+            self.layout.label(text=message),
+            title=title, icon='ERROR')
+
+    @staticmethod
+    def target_objects():
+        objects = list(bpy.context.selected_objects)
+        active = bpy.context.active_object
+        if active is not None and active not in objects:
+            objects.append(active)
+        return [obj for obj in objects if obj.type != 'CAMERA']
+
+    @staticmethod
+    def world_points(objects, depsgraph):
+        """World space points of the objects and whether each one is cone tested.
+
+        Meshes give their evaluated vertices (modifiers applied), other objects their origin,
+        which always counts.
+        """
+        points = []
+        cone_test = []
+        for obj in objects:
+            if obj.type == 'MESH':
+                obj_eval = obj.evaluated_get(depsgraph)
+                mesh = obj_eval.to_mesh()
+                co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+                mesh.vertices.foreach_get("co", co)
+                co = co.astype(np.float64)
+                matrix = np.array(obj_eval.matrix_world, dtype=np.float64)
+                obj_eval.to_mesh_clear()
+                points.append(co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3])
+                cone_test.append(np.ones(len(co) // 3, dtype=bool))
+            else:
+                points.append(np.array([obj.matrix_world.translation], dtype=np.float64))
+                cone_test.append(np.zeros(1, dtype=bool))
+        if not points:
+            return np.empty((0, 3)), np.empty(0, dtype=bool)
+        return np.concatenate(points), np.concatenate(cone_test)
+
+    @staticmethod
+    def mist_distance(camera, points, cone_test, cone_angle=None):
+        """Mist depth for the camera: 1.15x the farthest point inside the view cone, at least 5."""
+        matrix = np.array(camera.matrix_world, dtype=np.float64)
+        # Cameras look down their local -Z axis
+        forward = -matrix[:3, 2] / np.linalg.norm(matrix[:3, 2])
+        to_points = points - matrix[:3, 3]
+        lengths = np.linalg.norm(to_points, axis=1)
+        cos_limit = math.cos(math.radians(Cam_Mist.cone_angle if cone_angle is None else cone_angle))
+        in_cone = (to_points @ forward) > cos_limit * lengths
+        counted = np.where(cone_test, in_cone & (lengths > 0), True)
+        max_distance = lengths[counted].max() if counted.any() else 0
+        return max(max_distance * 1.15, 5)
+
+    @staticmethod
     def set_distance():
-        import mathutils
-        import math
-        # Get the camera object
-        camera = bpy.context.scene.camera
+        scene = bpy.context.scene
+        camera = scene.camera
         # If the scene has no camera, pop up a window and return
         if camera is None:
-            bpy.context.window_manager.popup_menu(lambda self, context: 
-                self.layout.label(text="No camera in the scene. Please add a camera."), 
-                title="Error", icon='ERROR')
+            Cam_Mist.popup("No camera in the scene. Please add a camera.")
             return
-
-        # If the scene has no selected object, display a popup message
-        selected_obj = bpy.context.active_object
-        if selected_obj is None:
-            bpy.context.window_manager.popup_menu(lambda self, context: 
-                self.layout.label(text="Please select an object to calculate the distance."), 
-                title="Error", icon='ERROR')
+        objects = Cam_Mist.target_objects()
+        if not objects:
+            Cam_Mist.popup("Please select an object to calculate the distance.")
             return
 
-        # Calculate the camera's forward direction
-        camera_forward = camera.matrix_world.to_quaternion() @ mathutils.Vector((0, 0, -1))
-        # Initialize distance and vertex
-        max_distance = 0
-        farthest_vertex = None
-        # Check if the selected object is a mesh
-        if selected_obj.type == 'MESH':
-            # Check each vertex in the selected object's mesh
-            for vertex in selected_obj.data.vertices:
-                # Calculate the vertex's location in world coordinates
-                vertex_location = selected_obj.matrix_world @ vertex.co
-                # Calculate the vector from the camera to the vertex
-                to_vertex = vertex_location - camera.location
-                # Calculate the angle between the camera's forward direction and the vector to the vertex
-                angle = to_vertex.angle(camera_forward)
-                # If the angle is within 45 degrees and the distance is greater than the current maximum, update the maximum and the farthest vertex
-                if angle < math.radians(45) and to_vertex.length > max_distance:
-                    max_distance = to_vertex.length
-                    farthest_vertex = vertex_location
-        else:
-            # If the selected object is not a mesh, calculate the distance to its origin
-            max_distance = (camera.location - selected_obj.location).length
-        # Increase the distance by 15% of its current value, with a minimum of 5
-        distance = max(max_distance * 1.15, 5)
+        points, cone_test = Cam_Mist.world_points(objects, bpy.context.evaluated_depsgraph_get())
+        distance = Cam_Mist.mist_distance(camera, points, cone_test)
         # Set the distance value as the mist settings depth
-        bpy.context.scene.world.mist_settings.depth = distance     
-        # Check if current frame number is within the specified ranges
-        frame_current = bpy.context.scene.frame_current
-        if (-24 <= frame_current <= -1):
-            
-            # If true, insert a keyframe
-            bpy.context.scene.world.mist_settings.keyframe_insert(data_path='depth', frame=bpy.context.scene.frame_current)
+        scene.world.mist_settings.depth = distance
+        # Key it if the current frame is a CamP frame
+        slot = -scene.frame_current
+        if slot in camp_registry.slots(scene, enabled_only=False):
+            camp_state.key_mist_depth(scene, {slot: distance})
         else:
-            bpy.context.window_manager.popup_menu(lambda self, context: 
-                self.layout.label(text="Current frame is not within the usable range."), 
-                title="Warning", icon='ERROR')
+            Cam_Mist.popup("Current frame is not within the usable range.", title="Warning")
+
+    @staticmethod
+    def set_distance_all():
+        """Compute and key the mist depth of every enabled CamP from its own camera in one batch."""
+        scene = bpy.context.scene
+        objects = Cam_Mist.target_objects()
+        if not objects:
+            Cam_Mist.popup("Please select an object to calculate the distance.")
+            return
+        entries = camp_registry.entries(scene)
+        if not entries:
+            Cam_Mist.popup("No CamP cameras are registered.")
+            return
+        points, cone_test = Cam_Mist.world_points(objects, bpy.context.evaluated_depsgraph_get())
+        camp_state.key_mist_depth(scene, {entry.slot: Cam_Mist.mist_distance(entry.camera, points, cone_test) for entry in entries})
 
 class Cam_Main:
     @staticmethod
@@ -418,6 +591,116 @@ class Cam_Main:
 
         bpy.ops.object.main_cam_switch('INVOKE_DEFAULT')
 
+    # Camera data properties baked along with the transform
+    bake_data_props = ("lens", "shift_x", "shift_y", "clip_start", "clip_end", "sensor_width")
+
+    @staticmethod
+    def camera_dependencies(camera):
+        """The camera and every object its transform or data depends on: parents, constraint and driver targets."""
+        found = set()
+        stack = [camera]
+        while stack:
+            obj = stack.pop()
+            if obj in found:
+                continue
+            found.add(obj)
+            if obj.parent:
+                stack.append(obj.parent)
+            for constraint in obj.constraints:
+                for attr in ("target", "pole_target"):
+                    target = getattr(constraint, attr, None)
+                    if isinstance(target, bpy.types.Object):
+                        stack.append(target)
+                for target in getattr(constraint, "targets", ()):
+                    if isinstance(target.target, bpy.types.Object):
+                        stack.append(target.target)
+            for anim in (obj.animation_data, getattr(obj.data, "animation_data", None)):
+                for driver in (anim.drivers if anim else ()):
+                    for variable in driver.driver.variables:
+                        for target in variable.targets:
+                            if isinstance(target.id, bpy.types.Object):
+                                stack.append(target.id)
+        return found
+
+    @staticmethod
+    def sample_camera(camera, frames):
+        """World matrices and data values of the camera on each frame.
+
+        Only the camera and its dependencies are evaluated, in a temporary scene, so the
+        frame of the open scene never changes.
+        """
+        matrices = []
+        data_values = {prop: [] for prop in Cam_Main.bake_data_props}
+        temp_scene = bpy.data.scenes.new(".MP_camera_bake")
+        try:
+            for obj in Cam_Main.camera_dependencies(camera):
+                temp_scene.collection.objects.link(obj)
+            for frame in frames:
+                temp_scene.frame_set(frame)
+                camera_eval = camera.evaluated_get(temp_scene.view_layers[0].depsgraph)
+                matrices.append(camera_eval.matrix_world.copy())
+                for prop in Cam_Main.bake_data_props:
+                    data_values[prop].append(getattr(camera_eval.data, prop))
+        finally:
+            bpy.data.scenes.remove(temp_scene)
+        return matrices, data_values
+
+    @staticmethod
+    def bake_camera(source_camera, start_frame, end_frame, reduce=False, tolerance=0.0001):
+        """Bake the camera's world transform and lens settings into a new, unparented, unconstrained copy."""
+        frames = list(range(start_frame, end_frame + 1))
+        matrices, data_values = Cam_Main.sample_camera(source_camera, frames)
+
+        target_camera = source_camera.copy()
+        target_camera.data = source_camera.data.copy()
+        target_camera.name = f"{source_camera.name}_baked"
+        target_camera.data.name = f"{source_camera.name}_baked"
+        for collection in source_camera.users_collection:
+            collection.objects.link(target_camera)
+        target_camera.animation_data_clear()
+        target_camera.data.animation_data_clear()
+        target_camera.constraints.clear()
+        target_camera.parent = None
+        # The baked transform is the whole world transform
+        target_camera.delta_location = (0, 0, 0)
+        target_camera.delta_rotation_euler = (0, 0, 0)
+        target_camera.delta_rotation_quaternion = (1, 0, 0, 0)
+        target_camera.delta_scale = (1, 1, 1)
+        if target_camera.rotation_mode == 'AXIS_ANGLE':
+            target_camera.rotation_mode = 'XYZ'
+        rotation_mode = target_camera.rotation_mode
+
+        channels = {}  # (id, data_path, index) -> values per frame
+        euler = quaternion = None
+        for matrix in matrices:
+            location, rotation, scale = matrix.decompose()
+            if rotation_mode == 'QUATERNION':
+                # Keep the sign of the previous frame so the interpolation takes the short way
+                if quaternion:
+                    rotation.make_compatible(quaternion)
+                rotation_values = quaternion = rotation
+            else:
+                # Stay compatible with the previous frame to avoid 360 degree flips
+                euler = rotation.to_euler(rotation_mode, euler) if euler else rotation.to_euler(rotation_mode)
+                rotation_values = euler
+            for data_path, values in (("location", location), ("rotation_quaternion" if rotation_mode == 'QUATERNION' else "rotation_euler", rotation_values), ("scale", scale)):
+                for index, value in enumerate(values):
+                    channels.setdefault((target_camera, data_path, index), []).append(value)
+        for prop, values in data_values.items():
+            if max(values) - min(values) > 1e-6:
+                channels[(target_camera.data, prop, 0)] = values
+            else:
+                setattr(target_camera.data, prop, values[0])
+
+        frames = np.array(frames, dtype=np.float64)
+        for (id_data, data_path, index), values in channels.items():
+            values = np.array(values, dtype=np.float64)
+            keep = anim_keys.reduce_linear(frames, values, tolerance) if reduce else np.ones(len(frames), dtype=bool)
+            group = "Object Transforms" if id_data == target_camera else ""
+            fcurve = anim_keys.ensure_fcurve(id_data, data_path, index, group)
+            anim_keys.write_keys(fcurve, dict(zip(frames[keep].tolist(), values[keep].tolist())), interpolation='LINEAR' if reduce else None)
+        return target_camera
+
     @staticmethod
     def MainCam_Action_Bake():
         class MainCamActionBakeOperator(bpy.types.Operator):
@@ -450,52 +733,34 @@ class Cam_Main:
                 description="The end frame for baking the animation"
             )
 
-            def execute(self, context):
-                original_start_frame = bpy.context.scene.frame_start
-                original_end_frame = bpy.context.scene.frame_end
+            reduce_keys: bpy.props.BoolProperty(
+                name="Reduce Keys",
+                default=False,
+                description="Drop keys that linear interpolation between their neighbours reproduces within the tolerance"
+            )
 
+            tolerance: bpy.props.FloatProperty(
+                name="Tolerance",
+                default=0.0001,
+                min=0.0,
+                precision=5,
+                description="Largest difference a dropped key may have from the interpolated value"
+            )
+
+            def execute(self, context):
                 if self.camera_name in bpy.data.objects:
                     source_camera = bpy.data.objects[self.camera_name]
-                    # Duplicate the source camera
+                    start = time.perf_counter()
+                    target_camera = Cam_Main.bake_camera(source_camera, self.start_frame, self.end_frame, self.reduce_keys, self.tolerance)
                     bpy.ops.object.select_all(action='DESELECT')
-                    source_camera.select_set(True)
-                    bpy.context.view_layer.objects.active = source_camera
-                    bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked":False, "mode":'TRANSLATION'})
-                    target_camera = bpy.context.active_object
-
-                    # Rename the target camera
-                    target_camera.name = f"{self.camera_name}_baked"
-
-                    # Rename the target camera's data
-                    target_camera.data.name = f"{self.camera_name}_baked"
-
-                    # Bake the source camera's animation to the target camera
-                    self.bake_camera_animation(source_camera, target_camera, self.start_frame, self.end_frame)
-
+                    target_camera.select_set(True)
+                    context.view_layer.objects.active = target_camera
+                    self.report({'INFO'}, f"Baked {self.end_frame - self.start_frame + 1} frames of {self.camera_name} in {time.perf_counter() - start:.2f}s")
                 else:
                     self.report({'ERROR'}, "Camera not found")
 
-                # Restore original frame range
-                bpy.context.scene.frame_start = original_start_frame
-                bpy.context.scene.frame_end = original_end_frame
-
                 return {'FINISHED'}
 
-            def bake_camera_animation(self, source_camera, target_camera, start_frame, end_frame):
-                # Select the target camera
-                bpy.context.view_layer.objects.active = target_camera
-                target_camera.select_set(True)
-
-                # Set the frame range
-                bpy.context.scene.frame_start = start_frame
-                bpy.context.scene.frame_end = end_frame
-
-                # Bake the animation
-                bpy.ops.object.select_all(action='DESELECT')
-                target_camera.select_set(True)
-                bpy.context.view_layer.objects.active = target_camera
-                bpy.ops.nla.bake(frame_start=start_frame, frame_end=end_frame, step=1, only_selected=True, visual_keying=True, clear_constraints=True, clear_parents=True, bake_types={'OBJECT'}, use_current_action=False)
-
             def invoke(self, context, event):
                 return context.window_manager.invoke_props_dialog(self)
 
@@ -505,7 +770,63 @@ class Cam_Main:
 
         bpy.ops.object.main_cam_action_bake('INVOKE_DEFAULT')
 
-                
+
+
+class Cam_Registry:
+    @staticmethod
+    def sync():
+        """Register new CamP_subNN cameras and drop deleted ones from the scene's CamP registry."""
+        scene = bpy.context.scene
+        added = camp_registry.sync(scene)
+        enabled = len(camp_registry.entries(scene))
+        total = len(camp_registry.entries(scene, enabled_only=False))
+        bpy.context.window_manager.popup_menu(lambda self, context:
+            self.layout.label(text=f"{added} CamP added, {enabled} of {total} enabled."),
+            title="CamP registry", icon='INFO')
+
+    @staticmethod
+    def toggle_selected():
+        """Enable/disable the selected CamP cameras; disabled CamPs are skipped by every CamP operator."""
+        scene = bpy.context.scene
+        camp_registry.sync(scene)
+        for obj in bpy.context.selected_objects:
+            slot = camp_registry.slot_of(obj, scene)
+            if slot is not None:
+                entry = camp_registry.get_entry(slot, scene)
+                entry.enabled = not entry.enabled
+
+
+    @staticmethod
+    def use_archive_db():
+        return camp_db.enabled(bpy.context.scene)
+
+    @staticmethod
+    def archive_db_toggle():
+        """Share CamP backups, output folders and render status through the archive database of the project folder."""
+        scene = bpy.context.scene
+        if not bpy.data.filepath:
+            bpy.context.window_manager.popup_menu(lambda self, context:
+                self.layout.label(text="Save the .blend file first, the archive database sits next to it."),
+                title="CamP archive database", icon='ERROR')
+            return
+        scene[camp_db.ENABLE_PROP] = not scene.get(camp_db.ENABLE_PROP, False)
+        icon = 'INFO'
+        if Cam_Registry.use_archive_db():
+            try:
+                # Backups saved, edited or removed while the database was off are carried over
+                written, removed = camp_archive.push_to_db()
+                state = f"on, {len(written)} backups written, {len(removed)} removed: {camp_db.db_path()}"
+            except (ValueError, sqlite3.Error) as e:
+                # Left off, so lookups don't go to a database that isn't in line with the text block
+                scene[camp_db.ENABLE_PROP] = False
+                state, icon = f"left off, {e}", 'ERROR'
+        else:
+            state = "off"
+        bpy.context.window_manager.popup_menu(lambda self, context:
+            self.layout.label(text=f"CamP archive database {state}"),
+            title="CamP archive database", icon=icon)
+
+               
 # Placeholder class and def
 class Placeholder:
     def nothing():
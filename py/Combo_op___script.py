@@ -1,4 +1,12 @@
 import bpy
+import bmesh
+import json
+import time
+import bisect
+import colorsys
+import numpy as np
+from collections import namedtuple
+from . import anim_keys___script as anim_keys
 
 class ColorPreset:
     @staticmethod
@@ -19,6 +27,28 @@ class ColorPreset:
     Col_7 = hex_to_rgb("#c572b7")
     Col_8 = hex_to_rgb("#795441")
 
+    PRESETS = (Col_0, Col_1, Col_2, Col_3, Col_4, Col_5, Col_6, Col_7, Col_8)
+
+# Mask ID -> RGB lookup for the compact mask mode. 0 is "no mask", 1-8 are the
+# button colors and the rest, up to the INT8 limit, get golden-ratio spaced hues.
+MASK_ID_COLORS = np.array(
+    ColorPreset.PRESETS + tuple(colorsys.hsv_to_rgb((i * 0.618034) % 1.0, 0.6, 0.85) for i in range(len(ColorPreset.PRESETS), 128)),
+    dtype=np.float32
+)
+MASK_ID_BY_COLOR = {color: mask_id for mask_id, color in enumerate(ColorPreset.PRESETS)}
+
+def pack_rgb_bytes(colors):
+    """Pack float RGB rows into one int per row, as stored in a byte color layer."""
+    rgb = np.round(np.asarray(colors)[..., :3] * 255).astype(np.int32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+MASK_ID_KEYS = pack_rgb_bytes(MASK_ID_COLORS)
+MASK_ID_KEY_ORDER = np.argsort(MASK_ID_KEYS)
+
+# Preset colors sorted by hue, for shader_mask.hue_match_rgb
+PRESET_HUES = sorted({colorsys.rgb_to_hsv(*color)[0]: color for color in ColorPreset.PRESETS}.items())
+PRESET_HUE_KEYS = [hue for hue, color in PRESET_HUES]
+
 # vcol_mask module
 class vcol_mask:
     @staticmethod
@@ -146,85 +176,304 @@ class vcol_mask:
 
     @staticmethod
     def set_mask(colname, set_col):
+        if vcol_mask.use_compact_ids():
+            vcol_mask.set_mask_id(colname, MASK_ID_BY_COLOR[set_col])
+            return
         selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
         current_mode = bpy.context.mode
-        active_object = bpy.context.view_layer.objects.active
         if current_mode == 'EDIT_MESH':
-            for obj in selected_meshes:
-                bpy.context.view_layer.objects.active = obj
-                mesh = obj.data
-                if colname not in mesh.vertex_colors:
-                    mesh.vertex_colors.new(name=colname)
-                # activate vertex color attribute
-                bpy.context.object.data.vertex_colors.active = mesh.vertex_colors[colname]
-                bpy.ops.object.mode_set(mode='VERTEX_PAINT')
-                bpy.context.scene.tool_settings.unified_paint_settings.color = set_col
-                bpy.context.scene.tool_settings.vertex_paint.brush.color = set_col
-                bpy.context.active_object.data.use_paint_mask = True
-                bpy.ops.paint.vertex_color_set(use_alpha=False)
-                bpy.context.active_object.data.use_paint_mask = False
-                bpy.ops.object.mode_set(mode='EDIT')
-                bpy.context.view_layer.objects.active = active_object
+            for mesh in {obj.data for obj in selected_meshes if obj.mode == 'EDIT'}:
+                vcol_mask.paint_selected_faces(mesh, colname, set_col)
+        else:
+            # Objects sharing a mesh are written once, all through one buffer
+            meshes = {obj.data for obj in selected_meshes}
+            buffer = np.empty(max((len(mesh.loops) for mesh in meshes), default=0) * 4, dtype=np.float32)
+            for mesh in meshes:
+                vcol_mask.fill_mask(mesh, colname, set_col, buffer)
+
+    @staticmethod
+    def paint_selected_faces(mesh, colname, set_col, create=True):
+        """Edit mode: set the RGB of the mask layer on the loops of the selected faces, keeping alpha.
+
+        Works on the edit mesh directly, so there is no mode switch and the brush
+        color is left alone. Returns False if the layer is missing and create is False.
+        """
+        bm = bmesh.from_edit_mesh(mesh)
+        layer = bm.loops.layers.color.get(colname)
+        if layer is None:
+            if not create:
+                return False
+            layer = bm.loops.layers.color.new(colname)
+        for face in bm.faces:
+            if face.select:
+                for loop in face.loops:
+                    loop[layer] = (*set_col, loop[layer][3])
+        bmesh.update_edit_mesh(mesh, loop_triangles=False, destructive=False)
+        # activate vertex color attribute
+        mesh.color_attributes.active_color = mesh.color_attributes.get(colname)
+        return True
+
+    @staticmethod
+    def fill_mask(mesh, colname, set_col, buffer=None):
+        """Object mode: set the RGB of every loop of the mask layer, keeping alpha.
+
+        A new layer gets alpha 0. Colors go through color_srgb so the stored bytes
+        match what the vertex_colors API wrote. Like the vertex_colors API, only
+        face corner layers count as mask layers. Returns the (possibly grown) buffer.
+        """
+        attribute = mesh.color_attributes.get(colname)
+        if attribute is not None and attribute.domain != 'CORNER':
+            attribute = None
+        new_layer = attribute is None
+        if new_layer:
+            attribute = mesh.color_attributes.new(name=colname, type='BYTE_COLOR', domain='CORNER')
+        size = len(attribute.data) * 4
+        if buffer is None or buffer.size < size:
+            buffer = np.empty(size, dtype=np.float32)
+        colors = buffer[:size].reshape(-1, 4)
+        if new_layer:
+            colors[:] = (*set_col, 0.0)
         else:
-            for obj in selected_meshes:
-                bpy.context.view_layer.objects.active = obj
-                mesh = obj.data
-                if colname not in mesh.vertex_colors:
-                    mesh.vertex_colors.new(name=colname)
-                    # set alpha to 0 when creating new attribute
-                    for loop_index in range(len(mesh.loops)):
-                        mesh.vertex_colors[colname].data[loop_index].color = set_col + (0,)
-                else:
-                    # activate vertex color attribute
-                    bpy.context.object.data.vertex_colors.active = mesh.vertex_colors[colname]
-                    for loop_index in range(len(mesh.loops)):
-                        color = list(mesh.vertex_colors[colname].data[loop_index].color)
-                        color[:3] = set_col
-                        mesh.vertex_colors[colname].data[loop_index].color = color
+            # activate vertex color attribute
+            mesh.color_attributes.active_color = attribute
+            attribute.data.foreach_get("color_srgb", buffer[:size])
+            colors[:, :3] = set_col
+        attribute.data.foreach_set("color_srgb", buffer[:size])
+        mesh.update()
+        return buffer
+
+    @staticmethod
+    def benchmark_set_mask(loop_count=1_000_000, set_col=ColorPreset.Col_3):
+        """Time the old per-loop write against fill_mask on a synthetic grid mesh.
+
+        Run from the Python console, e.g. vcol_mask.benchmark_set_mask(). The mesh is
+        removed afterwards.
+        """
+        side = int((loop_count / 4) ** 0.5) + 1
+        grid = np.arange((side + 1) ** 2, dtype=np.int32).reshape(side + 1, side + 1)
+        quads = np.stack((grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]), axis=-1).reshape(-1)
+        xs, ys = np.meshgrid(np.arange(side + 1, dtype=np.float32), np.arange(side + 1, dtype=np.float32))
+        co = np.column_stack((xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=np.float32)))
+
+        mesh = bpy.data.meshes.new("mp_benchmark_set_mask")
+        try:
+            mesh.vertices.add(xs.size)
+            mesh.vertices.foreach_set("co", co.ravel())
+            mesh.loops.add(quads.size)
+            mesh.loops.foreach_set("vertex_index", quads)
+            mesh.polygons.add(quads.size // 4)
+            mesh.polygons.foreach_set("loop_start", np.arange(0, quads.size, 4, dtype=np.int32))
+            mesh.update(calc_edges=True)
+
+            colname = "mask_benchmark"
+            attribute = mesh.color_attributes.new(name=colname, type='BYTE_COLOR', domain='CORNER')
+            original = np.empty(quads.size * 4, dtype=np.float32)
+            attribute.data.foreach_get("color_srgb", original)
+            start = time.perf_counter()
+            for loop_index in range(len(mesh.loops)):
+                color = list(attribute.data[loop_index].color_srgb)
+                color[:3] = set_col
+                attribute.data[loop_index].color_srgb = color
+            loop_seconds = time.perf_counter() - start
+            expected = np.empty(quads.size * 4, dtype=np.float32)
+            attribute.data.foreach_get("color_srgb", expected)
+
+            attribute.data.foreach_set("color_srgb", original)
+            start = time.perf_counter()
+            vcol_mask.fill_mask(mesh, colname, set_col)
+            numpy_seconds = time.perf_counter() - start
+            result = np.empty_like(expected)
+            mesh.color_attributes[colname].data.foreach_get("color_srgb", result)
+        finally:
+            bpy.data.meshes.remove(mesh)
+
+        report = {
+            "loops": int(quads.size),
+            "per_loop_seconds": loop_seconds,
+            "numpy_seconds": numpy_seconds,
+            "speedup": loop_seconds / numpy_seconds if numpy_seconds else float("inf"),
+            "matches": bool(np.allclose(expected, result, atol=1 / 255)),
+        }
+        print(f"set_mask on {report['loops']} loops: per-loop {loop_seconds:.3f}s, numpy {numpy_seconds:.3f}s "
+              f"({report['speedup']:.0f}x), results match: {report['matches']}")
+        return report
 
     @staticmethod
     def delete_mask(colname):
+        if vcol_mask.use_compact_ids():
+            vcol_mask.delete_mask_id(colname)
+            return
         selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
         current_mode = bpy.context.mode
-        active_object = bpy.context.view_layer.objects.active
         if current_mode == 'EDIT_MESH':
+            # Clear the selected faces back to white
+            for mesh in {obj.data for obj in selected_meshes if obj.mode == 'EDIT'}:
+                vcol_mask.paint_selected_faces(mesh, colname, (1.0, 1.0, 1.0), create=False)
+        else:
+            for mesh in {obj.data for obj in selected_meshes}:
+                attribute = mesh.color_attributes.get(colname)
+                if attribute is not None:
+                    mesh.color_attributes.remove(attribute)
+
+    # ---------- COMPACT ID MODE ----------
+    # The mask is stored as one INT8 per face in "<colname>_id" instead of a color
+    # per loop. The shaders read the color layers, so run ids_to_colors before rendering.
+
+    @staticmethod
+    def use_compact_ids():
+        return bool(bpy.context.scene.get("mp_compact_mask_ids", False))
+
+    @staticmethod
+    def compact_ids_toggle():
+        bpy.context.scene["mp_compact_mask_ids"] = not vcol_mask.use_compact_ids()
+
+    @staticmethod
+    def id_attribute(mesh, colname, create=True):
+        name = colname + "_id"
+        attribute = mesh.attributes.get(name)
+        if attribute is None and create:
+            attribute = mesh.attributes.new(name=name, type='INT8', domain='FACE')
+        return attribute
+
+    @staticmethod
+    def write_ids(colname, mask_id, create=True):
+        """Write mask_id to the ID layer of the selected meshes: the selected faces in
+        edit mode, all faces otherwise. Edit mode is left once for all objects."""
+        meshes = {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}
+        edit_mode = bpy.context.mode == 'EDIT_MESH'
+        if edit_mode:
+            bpy.ops.object.mode_set(mode='OBJECT')
+        for mesh in meshes:
+            attribute = vcol_mask.id_attribute(mesh, colname, create)
+            if attribute is None:
+                continue
+            ids = np.empty(len(mesh.polygons), dtype=np.int32)
+            if edit_mode:
+                selected = np.empty(len(mesh.polygons), dtype=bool)
+                mesh.polygons.foreach_get("select", selected)
+                attribute.data.foreach_get("value", ids)
+                ids[selected] = mask_id
+            else:
+                ids.fill(mask_id)
+            attribute.data.foreach_set("value", ids)
+            mesh.update()
+        if edit_mode:
+            bpy.ops.object.mode_set(mode='EDIT')
+
+    @staticmethod
+    def set_mask_id(colname, mask_id):
+        vcol_mask.write_ids(colname, mask_id)
+
+    @staticmethod
+    def delete_mask_id(colname):
+        if bpy.context.mode == 'EDIT_MESH':
+            vcol_mask.write_ids(colname, 0, create=False)
+            return
+        for mesh in {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}:
+            attribute = vcol_mask.id_attribute(mesh, colname, create=False)
+            if attribute is not None:
+                mesh.attributes.remove(attribute)
+
+    @staticmethod
+    def loop_faces(mesh):
+        """Face index of every loop."""
+        loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+        mesh.polygons.foreach_get("loop_total", loop_totals)
+        return np.repeat(np.arange(len(mesh.polygons), dtype=np.int32), loop_totals)
+
+    @staticmethod
+    def colors_to_ids(colname, meshes=None):
+        """Convert a color mask layer into its ID layer. Colors not in the lookup table become 0."""
+        if meshes is None:
+            meshes = {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}
+        for mesh in meshes:
+            attribute = mesh.color_attributes.get(colname)
+            if attribute is None or attribute.domain != 'CORNER':
+                continue
+            colors = np.empty(len(mesh.loops) * 4, dtype=np.float32)
+            attribute.data.foreach_get("color_srgb", colors)
+            # Each face takes the color of its first loop
+            loop_starts = np.empty(len(mesh.polygons), dtype=np.int32)
+            mesh.polygons.foreach_get("loop_start", loop_starts)
+            keys = pack_rgb_bytes(colors.reshape(-1, 4)[loop_starts])
+            sorted_keys = MASK_ID_KEYS[MASK_ID_KEY_ORDER]
+            positions = np.clip(np.searchsorted(sorted_keys, keys), 0, len(sorted_keys) - 1)
+            ids = np.where(sorted_keys[positions] == keys, MASK_ID_KEY_ORDER[positions], 0).astype(np.int32)
+            vcol_mask.id_attribute(mesh, colname).data.foreach_set("value", ids)
+            mesh.update()
+
+    @staticmethod
+    def ids_to_colors(colname, meshes=None):
+        """Write the ID layer back into the color mask layer, keeping its alpha."""
+        if meshes is None:
+            meshes = {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}
+        for mesh in meshes:
+            id_attribute = vcol_mask.id_attribute(mesh, colname, create=False)
+            if id_attribute is None:
+                continue
+            ids = np.empty(len(mesh.polygons), dtype=np.int32)
+            id_attribute.data.foreach_get("value", ids)
+            colors = np.zeros((len(mesh.loops), 4), dtype=np.float32)
+            attribute = mesh.color_attributes.get(colname)
+            # Only face corner layers are mask layers, as in fill_mask
+            if attribute is not None and attribute.domain != 'CORNER':
+                attribute = None
+            if attribute is not None:
+                attribute.data.foreach_get("color_srgb", colors.ravel())
+            colors[:, :3] = MASK_ID_COLORS[np.clip(ids, 0, len(MASK_ID_COLORS) - 1)[vcol_mask.loop_faces(mesh)]]
+            if attribute is None:
+                attribute = mesh.color_attributes.new(name=colname, type='BYTE_COLOR', domain='CORNER')
+            attribute.data.foreach_set("color_srgb", colors.ravel())
+            mesh.update()
+
+    @staticmethod
+    def convert_masks(converter):
+        edit_mode = bpy.context.mode == 'EDIT_MESH'
+        if edit_mode:
             bpy.ops.object.mode_set(mode='OBJECT')
-        for obj in selected_meshes:
-            bpy.context.view_layer.objects.active = obj
-            mesh = obj.data
-            if colname in mesh.vertex_colors:
-                # activate vertex color attribute
-                bpy.context.object.data.vertex_colors.active = mesh.vertex_colors[colname]
-                if current_mode == 'EDIT_MESH':
-                    bpy.ops.object.mode_set(mode='VERTEX_PAINT')
-                    bpy.context.scene.tool_settings.unified_paint_settings.color = (1, 1, 1)
-                    bpy.context.scene.tool_settings.vertex_paint.brush.color = (1, 1, 1)
-                    bpy.context.active_object.data.use_paint_mask = True
-                    bpy.ops.paint.vertex_color_set(use_alpha=False)
-                    bpy.context.active_object.data.use_paint_mask = False
-                    bpy.ops.object.mode_set(mode='EDIT')
-                    bpy.context.view_layer.objects.active = active_object
-                else:
-                    mesh.vertex_colors.remove(mesh.vertex_colors[colname])
-                    
+        for colname in ('mask_CamP_ID', 'mask_col_adijust'):
+            converter(colname)
+        if edit_mode:
+            bpy.ops.object.mode_set(mode='EDIT')
+
+    @staticmethod
+    def to_compact_ids():
+        vcol_mask.convert_masks(vcol_mask.colors_to_ids)
+
+    @staticmethod
+    def from_compact_ids():
+        vcol_mask.convert_masks(vcol_mask.ids_to_colors)
 
 
 # vcol_mix module
+
+# One paint layer: its name, the color a new layer is filled with, the layer it
+# is duplicated from when that one already exists, and its attribute type.
+CelLayer = namedtuple("CelLayer", "name default_color duplicate_from type")
+
 class vcol_mix:
+    LAYER_STACK = {layer.name: layer for layer in (
+        CelLayer('mix_lighten', (0.0, 0.0, 0.0, 0.0), None, 'FLOAT_COLOR'),
+        CelLayer('mix_softlight', (0.5, 0.5, 0.5, 0.0), None, 'FLOAT_COLOR'),
+        CelLayer('mix_darken', (1.0, 1.0, 1.0, 0.0), None, 'FLOAT_COLOR'),
+        CelLayer('cel_mid', (0.5, 0.5, 0.5, 1.0), None, 'BYTE_COLOR'),
+        CelLayer('cel_lit', (1.0, 1.0, 1.0, 1.0), 'cel_mid', 'BYTE_COLOR'),
+        CelLayer('cel_hgl', (1.0, 1.0, 1.0, 1.0), 'cel_lit', 'BYTE_COLOR'),  # Default highlight color
+        CelLayer('cel_dim', (0.1, 0.1, 0.1, 1.0), 'cel_mid', 'BYTE_COLOR'),
+        CelLayer('cel_amb', (0.2, 0.2, 0.2, 1.0), 'cel_dim', 'BYTE_COLOR'),  # Default ambient color
+    )}
+
+    # Creation order of cel_all, every layer after the one it is duplicated from
+    CEL_STACK = ('cel_mid', 'cel_lit', 'cel_hgl', 'cel_dim', 'cel_amb')
+
     def lighten():
-        colname = 'mix_lighten'
-        set_col = (0.0, 0.0, 0.0, 0.0)
-        vcol_mix.process_color_attribute(colname, set_col)
+        vcol_mix.ensure_layers('mix_lighten')
 
     def softlight():
-        colname = 'mix_softlight'
-        set_col = (0.5, 0.5, 0.5, 0.0)
-        vcol_mix.process_color_attribute(colname, set_col)
+        vcol_mix.ensure_layers('mix_softlight')
 
     def darken():
-        colname = 'mix_darken'
-        set_col = (1.0, 1.0, 1.0, 0.0)
-        vcol_mix.process_color_attribute(colname, set_col)
+        vcol_mix.ensure_layers('mix_darken')
 
     def remove_lighten():
         colname = 'mix_lighten'
@@ -257,163 +506,75 @@ class vcol_mix:
                 print(f"Failed to switch back to mode: {prev_mode}, Error: {e}")
 
     @staticmethod
-    def cel_highlight():
-        colname = 'cel_hgl'
-
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            bpy.context.view_layer.objects.active = o
-            mesh = o.data
-
-            # Ensure Blender is in Object mode before attempting operations
-            prev_mode = vcol_mix.ensure_object_mode()
-
-            if colname not in mesh.color_attributes:
-                if 'cel_lit' in mesh.color_attributes:
-                    mesh.color_attributes.active_color = mesh.color_attributes['cel_lit']
-                    bpy.ops.geometry.color_attribute_duplicate()
-                    mesh.color_attributes[-1].name = colname
-                else:
-                    ca = mesh.color_attributes.new(
-                        name=colname,
-                        domain='CORNER',
-                        type='BYTE_COLOR'
-                    )
-                    for elem in ca.data:
-                        elem.color = (1.0, 1.0, 1.0, 1.0)  # Default highlight color
+    def ensure_layers(*layers):
+        """Create the given layers (LAYER_STACK names or CelLayer) on all selected meshes.
+
+        Everything happens in one pass with a single mode switch. Meshes shared by
+        several objects are handled once, and the last layer becomes the active color.
+        """
+        specs = [vcol_mix.LAYER_STACK[layer] if isinstance(layer, str) else layer for layer in layers]
+        meshes = {o.data for o in bpy.context.selected_objects if o.type == 'MESH'}
+        if not meshes:
+            return
+        # Ensure Blender is in Object mode before attempting operations
+        prev_mode = vcol_mix.ensure_object_mode() if bpy.context.object else 'OBJECT'
+        buffer = None
+        for mesh in meshes:
+            for spec in specs:
+                buffer = vcol_mix.ensure_layer(mesh, spec, buffer)
+            mesh.color_attributes.active_color = mesh.color_attributes[specs[-1].name]
+            mesh.update()
+        # Return to the previous mode if needed
+        vcol_mix.back_to_mode(prev_mode)
 
-            mesh.color_attributes.active_color = mesh.color_attributes[colname]
+    @staticmethod
+    def ensure_layer(mesh, spec, buffer=None):
+        """Add one layer to a mesh unless it exists. Returns the (possibly grown) buffer."""
+        attributes = mesh.color_attributes
+        if spec.name in attributes:
+            return buffer
+        source = attributes.get(spec.duplicate_from) if spec.duplicate_from else None
+        if source is not None:
+            data_type, domain, count = source.data_type, source.domain, len(source.data)
+        else:
+            data_type, domain, count = spec.type, 'CORNER', len(mesh.loops)
+        if buffer is None or buffer.size < count * 4:
+            buffer = np.empty(count * 4, dtype=np.float32)
+        values = buffer[:count * 4]
+        # Byte colors are copied as stored (sRGB) so a duplicate is exact
+        prop = "color_srgb" if source is not None and data_type == 'BYTE_COLOR' else "color"
+        if source is not None:
+            source.data.foreach_get(prop, values)
+        else:
+            values.reshape(-1, 4)[:] = spec.default_color
+        # Adding a layer can invalidate existing attribute references, so fetch it by name
+        attributes.new(name=spec.name, type=data_type, domain=domain)
+        attributes[spec.name].data.foreach_set(prop, values)
+        return buffer
 
-            # Return to the previous mode if needed
-            vcol_mix.back_to_mode(prev_mode)
+    @staticmethod
+    def cel_highlight():
+        vcol_mix.ensure_layers('cel_hgl')
 
     @staticmethod
     def cel_littone():
-        colname = 'cel_lit'
-        default_color = (1.0, 1.0, 1.0, 1.0)  # 0~1
-
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            bpy.context.view_layer.objects.active = o
-            mesh = o.data
-
-            # Ensure Blender is in Object mode before attempting operations
-            prev_mode = vcol_mix.ensure_object_mode()
-
-            if colname not in mesh.color_attributes:
-                if 'cel_mid' in mesh.color_attributes:
-                    mesh.color_attributes.active_color = mesh.color_attributes['cel_mid']
-                    bpy.ops.geometry.color_attribute_duplicate()
-                    mesh.color_attributes[-1].name = colname
-                else:
-                    ca = mesh.color_attributes.new(
-                        name=colname,
-                        domain='CORNER',
-                        type='BYTE_COLOR'
-                    )
-                    for elem in ca.data:
-                        elem.color = default_color
-
-            mesh.color_attributes.active_color = mesh.color_attributes[colname]
-
-            # Return to the previous mode if needed
-            vcol_mix.back_to_mode(prev_mode)
+        vcol_mix.ensure_layers('cel_lit')
 
     @staticmethod
     def cel_midtone():
-        colname = 'cel_mid'
-        default_color = (0.5, 0.5, 0.5, 1.0)
-
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            bpy.context.view_layer.objects.active = o
-            mesh = o.data
-
-            # Ensure Blender is in Object mode before attempting operations
-            prev_mode = vcol_mix.ensure_object_mode()
-
-            if 'cel_mid' not in mesh.color_attributes:
-                ca = mesh.color_attributes.new(
-                    name=colname,
-                    domain='CORNER',
-                    type='BYTE_COLOR'
-                )
-                for elem in ca.data:
-                    elem.color = default_color
-
-            mesh.color_attributes.active_color = mesh.color_attributes['cel_mid']
-
-            # Return to the previous mode if needed
-            vcol_mix.back_to_mode(prev_mode)
+        vcol_mix.ensure_layers('cel_mid')
 
     @staticmethod
     def cel_darktone():
-        colname = 'cel_dim'
-        default_color = (0.1, 0.1, 0.1, 1.0)
-
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            bpy.context.view_layer.objects.active = o
-            mesh = o.data
-
-            # Ensure Blender is in Object mode before attempting operations
-            prev_mode = vcol_mix.ensure_object_mode()
-
-            if colname not in mesh.color_attributes:
-                if 'cel_mid' in mesh.color_attributes:
-                    mesh.color_attributes.active_color = mesh.color_attributes['cel_mid']
-                    bpy.ops.geometry.color_attribute_duplicate()
-                    mesh.color_attributes[-1].name = colname
-                else:
-                    ca = mesh.color_attributes.new(
-                        name=colname,
-                        domain='CORNER',
-                        type='BYTE_COLOR'
-                    )
-                    for elem in ca.data:
-                        elem.color = default_color
-
-            mesh.color_attributes.active_color = mesh.color_attributes[colname]
-
-            # Return to the previous mode if needed
-            vcol_mix.back_to_mode(prev_mode)
+        vcol_mix.ensure_layers('cel_dim')
 
     @staticmethod
     def cel_ambient():
-        colname = 'cel_amb'
-        default_color = (0.2, 0.2, 0.2, 1.0)  # Default ambient color
+        vcol_mix.ensure_layers('cel_amb')
 
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            bpy.context.view_layer.objects.active = o
-            mesh = o.data
-
-            # Ensure Blender is in Object mode before attempting operations
-            prev_mode = vcol_mix.ensure_object_mode()
-
-            if colname not in mesh.color_attributes:
-                if 'cel_dim' in mesh.color_attributes:
-                    mesh.color_attributes.active_color = mesh.color_attributes['cel_dim']
-                    bpy.ops.geometry.color_attribute_duplicate()
-                    mesh.color_attributes[-1].name = colname
-                else:
-                    ca = mesh.color_attributes.new(
-                        name=colname,
-                        domain='CORNER',
-                        type='BYTE_COLOR'
-                    )
-                    for elem in ca.data:
-                        elem.color = default_color
-
-            mesh.color_attributes.active_color = mesh.color_attributes[colname]
-
-            # Return to the previous mode if needed
-            vcol_mix.back_to_mode(prev_mode)
+    @staticmethod
+    def cel_all():
+        vcol_mix.ensure_layers(*vcol_mix.CEL_STACK)
 
     def remove_highlight():
         colname = 'cel_hgl'
@@ -436,20 +597,7 @@ class vcol_mix:
         vcol_mix.remove_color_attribute(colname)
 
     def process_color_attribute(colname, set_col):
-        selected_meshes = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-
-        for o in selected_meshes:
-            if not o.data.color_attributes.get(colname):
-                bpy.context.view_layer.objects.active = o
-                o.data.color_attributes.new(name=colname, type='FLOAT_COLOR', domain='CORNER')
-                color_attribute = o.data.color_attributes[colname]
-                data = color_attribute.data
-                for i in range(len(data)):
-                    data[i].color = set_col
-                o.data.update()
-
-            bpy.context.view_layer.objects.active = o
-            o.data.color_attributes.active_color = o.data.color_attributes[colname]
+        vcol_mix.ensure_layers(CelLayer(colname, set_col, None, 'FLOAT_COLOR'))
 
     # Helper function to remove a single color attribute
     def remove_color_attribute(colname):
@@ -462,9 +610,20 @@ class vcol_mix:
 
 
 
+def find_shader_editor():
+    """The first Shader Editor space on the current screen, or None (e.g. in background mode)."""
+    screen = bpy.context.screen
+    if screen is None:
+        return None
+    return next((space for area in screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
+
+
 class shader_mask:
+    MASK_MAP_TEXT = "CamP_mask_map.json"
+    MASK_REPORT_TEXT = "CamP_mask_map_report.md"
+
     def __init__():
-        shader_editor = next((space for area in bpy.context.screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
+        shader_editor = find_shader_editor()
         if shader_editor is None or shader_editor.node_tree is None:
             bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text="No valid shader editor or material found"), title="Error", icon='ERROR')
             return
@@ -483,14 +642,118 @@ class shader_mask:
         for node in bpy.context.selected_nodes:
             if node.name.startswith("projection_layer"):
                 print(node.name)
-                opacity_value = node.inputs['opacity'].default_value / 100
-                brightness = shader_mask.calculate_brightness(custom_color)
-                adjusted_color = shader_mask.adjust_brightness(custom_color, brightness * opacity_value)
-                node.use_custom_color = True
-                node.color = adjusted_color
-                links.new(nodes['CamP_ID_mask'].outputs[mask_id_output], node.inputs['CamP_ID_mask_input'])
+                shader_mask.apply_mask(node, nodes['CamP_ID_mask'], links, custom_color, mask_id_output)
         return
 
+    def apply_mask(node, mask_node, links, custom_color, mask_id_output):
+        """Tint a projection_layer node and link it to a CamP_ID_mask output; mask_id_output None unlinks it."""
+        node.use_custom_color = True
+        if mask_id_output is None:
+            node.color = ColorPreset.Col_0
+            for link in node.inputs['CamP_ID_mask_input'].links:
+                links.remove(link)
+            return
+        opacity_value = node.inputs['opacity'].default_value / 100
+        brightness = shader_mask.calculate_brightness(custom_color)
+        node.color = shader_mask.adjust_brightness(custom_color, brightness * opacity_value)
+        links.new(mask_node.outputs[mask_id_output], node.inputs['CamP_ID_mask_input'])
+
+    def linked_mask_id(node):
+        """CamP mask ID the projection_layer node is linked to: 0 if unlinked, None if linked elsewhere."""
+        socket_links = node.inputs['CamP_ID_mask_input'].links
+        if not socket_links:
+            return 0
+        from_socket = socket_links[0].from_socket
+        mask_id = from_socket.name[len('ID_mask_'):]
+        if socket_links[0].from_node.name == 'CamP_ID_mask' and from_socket.name.startswith('ID_mask_') and mask_id.isdigit():
+            return int(mask_id)
+        return None
+
+    def batch_set_mask(mapping, dry_run=False):
+        """Apply {material name: {projection_layer node name: CamP mask ID}} across the file.
+
+        ID 0 unlinks the mask, 1-8 link ID_mask_1..8 and null leaves the node as it is.
+        Needs no open editor. All other nodes listed are re-tinted; returns the report
+        lines of what changed (or would change).
+        """
+        lines = []
+        changed = 0
+        for material_name, layers in mapping.items():
+            if not isinstance(layers, dict):
+                lines.append(f"- {material_name}: expected {{node name: mask ID}}, got {layers!r}, skipped")
+                continue
+            material = bpy.data.materials.get(material_name)
+            if material is None or not material.node_tree:
+                lines.append(f"- {material_name}: material not found or not using nodes, skipped")
+                continue
+            nodes = material.node_tree.nodes
+            links = material.node_tree.links
+            mask_node = nodes.get('CamP_ID_mask')
+            for node_name, mask_id in layers.items():
+                node = nodes.get(node_name)
+                if node is None or not node.name.startswith("projection_layer") or 'CamP_ID_mask_input' not in node.inputs:
+                    lines.append(f"- {material_name} / {node_name}: no such projection_layer node, skipped")
+                    continue
+                if mask_id is None:
+                    # Linked to something other than CamP_ID_mask in the template
+                    continue
+                if not isinstance(mask_id, int) or isinstance(mask_id, bool) or not 0 <= mask_id <= 8:
+                    lines.append(f"- {material_name} / {node_name}: invalid mask ID {mask_id!r}, skipped")
+                    continue
+                if mask_id and mask_node is None:
+                    lines.append(f"- {material_name} / {node_name}: material has no CamP_ID_mask node, skipped")
+                    continue
+                current = shader_mask.linked_mask_id(node)
+                if current != mask_id:
+                    changed += 1
+                    lines.append(f"- {material_name} / {node_name}: {'other' if current is None else current} -> {mask_id}")
+                if not dry_run:
+                    mask_id_output = f'ID_mask_{mask_id}' if mask_id else None
+                    shader_mask.apply_mask(node, mask_node, links, ColorPreset.PRESETS[mask_id], mask_id_output)
+        lines.insert(0, f"{'Would change' if dry_run else 'Changed'} {changed} CamP mask links")
+        return lines
+
+    def mask_map_template():
+        """The current mask IDs of every projection_layer node, as a starting mapping.
+
+        Nodes linked to something other than CamP_ID_mask get null, which batch_set_mask skips.
+        """
+        mapping = {}
+        for material in bpy.data.materials:
+            if not material.node_tree:
+                continue
+            layers = {node.name: shader_mask.linked_mask_id(node) for node in material.node_tree.nodes
+                      if node.name.startswith("projection_layer") and 'CamP_ID_mask_input' in node.inputs}
+            if layers:
+                mapping[material.name] = layers
+        return mapping
+
+    def batch_from_text(dry_run):
+        text = bpy.data.texts.get(shader_mask.MASK_MAP_TEXT)
+        if text is None:
+            text = bpy.data.texts.new(shader_mask.MASK_MAP_TEXT)
+            text.write(json.dumps(shader_mask.mask_map_template(), indent=4))
+            bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text=f"Edit the '{shader_mask.MASK_MAP_TEXT}' text block, then run again"), title="Info", icon='INFO')
+            return
+        try:
+            mapping = json.loads(text.as_string())
+        except ValueError as e:
+            bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text=f"Invalid JSON in '{text.name}': {e}"), title="Error", icon='ERROR')
+            return
+        lines = shader_mask.batch_set_mask(mapping, dry_run)
+        report = bpy.data.texts.get(shader_mask.MASK_REPORT_TEXT) or bpy.data.texts.new(shader_mask.MASK_REPORT_TEXT)
+        report.clear()
+        report.write("\n".join(lines) + "\n")
+        print("\n".join(lines))
+        bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text=f"{lines[0]}, see '{report.name}'"), title="Info", icon='INFO')
+
+    def batch_dry_run():
+        shader_mask.batch_from_text(dry_run=True)
+
+    def batch_apply():
+        bpy.ops.ed.undo_push()
+        shader_mask.batch_from_text(dry_run=False)
+
 
 
     def CamP_set__1():
@@ -534,7 +797,6 @@ class shader_mask:
         shader_mask.set_mask(custom_color, mask_id_output)
 
     def CamP_set__unlink():
-        Mask_ID_color = ColorPreset.Col_0
         result = shader_mask.__init__()
         if result is None:
             return
@@ -545,10 +807,7 @@ class shader_mask:
         for node in bpy.context.selected_nodes:
             if node.name.startswith("projection_layer"):
                 print(node.name)
-                node.use_custom_color = True
-                node.color = Mask_ID_color
-                for link in node.inputs['CamP_ID_mask_input'].links:
-                    links.remove(link)
+                shader_mask.apply_mask(node, None, links, ColorPreset.Col_0, None)
         return
 
     def CamP_opacity__100():
@@ -618,20 +877,10 @@ class shader_mask:
         return h
 
     def hue_match_rgb(hue):
-        hue_color_map = {
-            shader_mask.rgb_to_hue(ColorPreset.Col_0): ColorPreset.Col_0,
-            shader_mask.rgb_to_hue(ColorPreset.Col_1): ColorPreset.Col_1,
-            shader_mask.rgb_to_hue(ColorPreset.Col_2): ColorPreset.Col_2,
-            shader_mask.rgb_to_hue(ColorPreset.Col_3): ColorPreset.Col_3,
-            shader_mask.rgb_to_hue(ColorPreset.Col_4): ColorPreset.Col_4,
-            shader_mask.rgb_to_hue(ColorPreset.Col_5): ColorPreset.Col_5,
-            shader_mask.rgb_to_hue(ColorPreset.Col_6): ColorPreset.Col_6,
-            shader_mask.rgb_to_hue(ColorPreset.Col_7): ColorPreset.Col_7,
-            shader_mask.rgb_to_hue(ColorPreset.Col_8): ColorPreset.Col_8
-        }
-        closest_hue = min(hue_color_map.keys(), key=lambda x: abs(x - hue))
-        return hue_color_map[closest_hue]
-
+        # The preset hues are sorted once at load, so only the two neighbours are compared
+        i = bisect.bisect_left(PRESET_HUE_KEYS, hue)
+        j = min((j for j in (i - 1, i) if 0 <= j < len(PRESET_HUES)), key=lambda j: abs(PRESET_HUE_KEYS[j] - hue))
+        return PRESET_HUES[j][1]
 
     def calculate_brightness(color):
         r, g, b = color
@@ -653,7 +902,7 @@ class adij_mask:
         if not adij_mask_node_group:
             bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text="'.col_adij_mask' node group not found. Please run 'set scene' first."), title="Error", icon='ERROR')
             return None
-        shader_editor = next((space for area in bpy.context.screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
+        shader_editor = find_shader_editor()
         if shader_editor is None or shader_editor.node_tree is None:
             bpy.context.window_manager.popup_menu(lambda self, context: self.layout.label(text="No valid shader editor or material found"), title="Error", icon='ERROR')
             return None
@@ -771,6 +1020,7 @@ class adij_mask:
 
 class Shader_VisibilityKey:
     frame_range = (-24, 1)
+    socket_name = "show/hide 0/1"
 
     @staticmethod
     def show_popup(message="", title="Message", icon='INFO'):
@@ -779,13 +1029,51 @@ class Shader_VisibilityKey:
         bpy.context.window_manager.popup_menu(draw, title=title, icon=icon)
 
     @staticmethod
-    def insert_keyframe_on_node(node, value, frame_range, scene, current_frame):
+    def use_advance():
+        return bool(bpy.context.scene.get("mp_visibility_key_advance", True))
+
+    @staticmethod
+    def advance_toggle():
+        bpy.context.scene["mp_visibility_key_advance"] = not Shader_VisibilityKey.use_advance()
+
+    @staticmethod
+    def find_node():
+        """The active .CamP_ID_visibility group node of the shader editor, or None after a popup."""
+        shader_editor = find_shader_editor()
+        node_group = bpy.data.node_groups.get(".CamP_ID_visibility")
+        if shader_editor and node_group:
+            active = shader_editor.edit_tree.nodes.active
+            if active and active.type == "GROUP" and active.node_tree == node_group:
+                return active
+            Shader_VisibilityKey.show_popup(message="Please select the .CamP_ID_visibility node group.", title="Error", icon='ERROR')
+        elif not shader_editor:
+            Shader_VisibilityKey.show_popup(message="Could not find shader editor.", title="Error", icon='ERROR')
+        elif not node_group:
+            Shader_VisibilityKey.show_popup(message="Could not find .CamP_ID_visibility node group in shader editor.", title="Error", icon='ERROR')
+        return None
+
+    @staticmethod
+    def socket_path(node):
+        return node.inputs[Shader_VisibilityKey.socket_name].path_from_id("default_value")
+
+    @staticmethod
+    def write_keys(node, keys):
+        """Write {frame: value} straight into the node tree's action, without changing frames."""
+        fcurve = anim_keys.ensure_fcurve(node.id_data, Shader_VisibilityKey.socket_path(node))
+        anim_keys.write_keys(fcurve, keys)
+
+    @staticmethod
+    def insert_keyframe_on_node(node, value, frame_range, scene, current_frame, advance=None):
         if node:
             if frame_range[0] <= current_frame <= frame_range[1]:
-                node.inputs["show/hide 0/1"].default_value = value
-                node.inputs["show/hide 0/1"].keyframe_insert(data_path="default_value")
-                scene.frame_set(current_frame + 1)
-                current_frame += 1
+                node.inputs[Shader_VisibilityKey.socket_name].default_value = value
+                Shader_VisibilityKey.write_keys(node, {current_frame: value})
+                if advance is None:
+                    advance = Shader_VisibilityKey.use_advance()
+                if advance:
+                    # frame_current defers the evaluation to the next redraw, unlike frame_set
+                    current_frame += 1
+                    scene.frame_current = current_frame
             else:
                 Shader_VisibilityKey.show_popup(message=f"Current frame {current_frame} is outside the defined range.", title="Warning", icon='ERROR')
         else:
@@ -794,64 +1082,32 @@ class Shader_VisibilityKey:
 
     @staticmethod
     def update():
+        """Key the current show/hide value on every marker frame and on -24/-1."""
         scene = bpy.context.scene
-        original_frame = scene.frame_current
-        shader_editor = next((space for area in bpy.context.screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
-        node_group = bpy.data.node_groups.get(".CamP_ID_visibility")
-        node = None
-        if shader_editor and node_group:
-            if shader_editor.edit_tree.nodes.active and shader_editor.edit_tree.nodes.active.type == "GROUP" and shader_editor.edit_tree.nodes.active.node_tree == node_group:
-                node = shader_editor.edit_tree.nodes.active
-            else:
-                Shader_VisibilityKey.show_popup(message="Please select the .CamP_ID_visibility node group.", title="Error", icon='ERROR')
-        elif not shader_editor:
-            Shader_VisibilityKey.show_popup(message="Could not find shader editor.", title="Error", icon='ERROR')
-        elif not node_group:
-            Shader_VisibilityKey.show_popup(message="Could not find .CamP_ID_visibility node group in shader editor.", title="Error", icon='ERROR')
-        if node:
-            for i in range(Shader_VisibilityKey.frame_range[0], Shader_VisibilityKey.frame_range[1]):
-                scene.frame_set(i)
-                if i in [marker.frame for marker in scene.timeline_markers] or i in {-24, -1}:
-                    node.inputs["show/hide 0/1"].keyframe_insert(data_path="default_value")
-        scene.frame_set(original_frame)
+        node = Shader_VisibilityKey.find_node()
+        if not node:
+            return
+        first, last = Shader_VisibilityKey.frame_range
+        frames = {marker.frame for marker in scene.timeline_markers if first <= marker.frame < last} | {-24, -1}
+        fcurve = anim_keys.find_fcurve(node.id_data, Shader_VisibilityKey.socket_path(node))
+        if fcurve:
+            keys = {frame: fcurve.evaluate(frame) for frame in frames}
+        else:
+            value = node.inputs[Shader_VisibilityKey.socket_name].default_value
+            keys = dict.fromkeys(frames, value)
+        Shader_VisibilityKey.write_keys(node, keys)
 
     @staticmethod
     def hide1by1():
         scene = bpy.context.scene
-        current_frame = scene.frame_current
-        shader_editor = next((space for area in bpy.context.screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
-        node_group = bpy.data.node_groups.get(".CamP_ID_visibility")
-        node = None
-        if shader_editor and node_group:
-            if shader_editor.edit_tree.nodes.active and shader_editor.edit_tree.nodes.active.type == "GROUP" and shader_editor.edit_tree.nodes.active.node_tree == node_group:
-                node = shader_editor.edit_tree.nodes.active
-            else:
-                Shader_VisibilityKey.show_popup(message="Please select the .CamP_ID_visibility node group.", title="Error", icon='ERROR')
-        elif not shader_editor:
-            Shader_VisibilityKey.show_popup(message="Could not find shader editor.", title="Error", icon='ERROR')
-        elif not node_group:
-            Shader_VisibilityKey.show_popup(message="Could not find .CamP_ID_visibility node group in shader editor.", title="Error", icon='ERROR')
-        current_frame = Shader_VisibilityKey.insert_keyframe_on_node(node, value=1, frame_range=Shader_VisibilityKey.frame_range, scene=scene, current_frame=current_frame)
-        return current_frame
+        node = Shader_VisibilityKey.find_node()
+        return Shader_VisibilityKey.insert_keyframe_on_node(node, value=1, frame_range=Shader_VisibilityKey.frame_range, scene=scene, current_frame=scene.frame_current)
 
     @staticmethod
     def show1by1():
         scene = bpy.context.scene
-        current_frame = scene.frame_current
-        shader_editor = next((space for area in bpy.context.screen.areas if area.type == 'NODE_EDITOR' for space in area.spaces if space.type == 'NODE_EDITOR' and space.tree_type == 'ShaderNodeTree'), None)
-        node_group = bpy.data.node_groups.get(".CamP_ID_visibility")
-        node = None
-        if shader_editor and node_group:
-            if shader_editor.edit_tree.nodes.active and shader_editor.edit_tree.nodes.active.type == "GROUP" and shader_editor.edit_tree.nodes.active.node_tree == node_group:
-                node = shader_editor.edit_tree.nodes.active
-            else:
-                Shader_VisibilityKey.show_popup(message="Please select the .CamP_ID_visibility node group.", title="Error", icon='ERROR')
-        elif not shader_editor:
-            Shader_VisibilityKey.show_popup(message="Could not find shader editor.", title="Error", icon='ERROR')
-        elif not node_group:
-            Shader_VisibilityKey.show_popup(message="Could not find .CamP_ID_visibility node group in shader editor.", title="Error", icon='ERROR')
-        current_frame = Shader_VisibilityKey.insert_keyframe_on_node(node, value=0, frame_range=Shader_VisibilityKey.frame_range, scene=scene, current_frame=current_frame)
-        return current_frame
+        node = Shader_VisibilityKey.find_node()
+        return Shader_VisibilityKey.insert_keyframe_on_node(node, value=0, frame_range=Shader_VisibilityKey.frame_range, scene=scene, current_frame=scene.frame_current)
 
 
 
@@ -0,0 +1,6 @@
+"""Toolset scripts.
+
+The *_op___script modules are imported lazily by the add-on on the first click
+of one of their buttons. The other scripts act at top level and are executed by
+the add-on each time their button is pressed.
+"""
@@ -0,0 +1,128 @@
+import bpy
+import numpy as np
+
+
+# Keyframe properties carried over when keys are rewritten: (name, values per key, dtype)
+KEY_ATTRS = (
+    ("co", 2, np.float32),
+    ("handle_left", 2, np.float32),
+    ("handle_right", 2, np.float32),
+    ("interpolation", 1, np.int32),
+    ("handle_left_type", 1, np.int32),
+    ("handle_right_type", 1, np.int32),
+)
+
+def enum_value(prop, name):
+    """Integer value of a Keyframe enum item, as foreach_get/foreach_set use it."""
+    return bpy.types.Keyframe.bl_rna.properties[prop].enum_items[name].value
+
+def find_fcurve(id_data, data_path, index=0):
+    anim = id_data.animation_data
+    if anim is None or anim.action is None:
+        return None
+    return anim.action.fcurves.find(data_path, index=index)
+
+def ensure_fcurve(id_data, data_path, index=0, group=""):
+    """F-curve for data_path on the ID's action, creating the action and F-curve as needed."""
+    anim = id_data.animation_data or id_data.animation_data_create()
+    if anim.action is None:
+        anim.action = bpy.data.actions.new(f"{id_data.name}Action")
+    fcurve = anim.action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = anim.action.fcurves.new(data_path, index=index, action_group=group)
+    return fcurve
+
+def read_keys(fcurve):
+    """{attr: flat array} for every keyframe of the F-curve."""
+    points = fcurve.keyframe_points
+    data = {}
+    for attr, size, dtype in KEY_ATTRS:
+        data[attr] = np.empty(len(points) * size, dtype=dtype)
+        points.foreach_get(attr, data[attr])
+    return data
+
+def write_keys(fcurve, keys, interpolation=None, handle_type=None):
+    """Merge {frame: value} into the F-curve with one bulk write. Returns the key count.
+
+    Keys on other frames keep their value, interpolation and handles; an existing key
+    on one of the frames is replaced. New keys use the user preference interpolation
+    and handle type unless given.
+    """
+    points = fcurve.keyframe_points
+    if not keys:
+        return len(points)
+    prefs = bpy.context.preferences.edit
+    interpolation = enum_value("interpolation", interpolation or prefs.keyframe_new_interpolation_type)
+    handle_type = enum_value("handle_left_type", handle_type or prefs.keyframe_new_handle_type)
+
+    count = len(points)
+    old = read_keys(fcurve)
+    keep = ~np.isin(old["co"][0::2], np.array(list(keys), dtype=np.float32))
+
+    frames = sorted(keys)
+    co = np.array([(frame, keys[frame]) for frame in frames], dtype=np.float32).ravel()
+    new = {
+        "co": co,
+        "handle_left": co,
+        "handle_right": co,
+        "interpolation": np.full(len(frames), interpolation, dtype=np.int32),
+        "handle_left_type": np.full(len(frames), handle_type, dtype=np.int32),
+        "handle_right_type": np.full(len(frames), handle_type, dtype=np.int32),
+    }
+    merged = {}
+    for attr, size, dtype in KEY_ATTRS:
+        merged[attr] = np.concatenate((old[attr].reshape(count, size)[keep], new[attr].reshape(-1, size)))
+    order = np.argsort(merged["co"][:, 0], kind="stable")
+
+    return replace_keys(fcurve, {attr: merged[attr][order] for attr in merged})
+
+def replace_keys(fcurve, data):
+    """Replace every key of the F-curve with data ({attr: array} as from read_keys). Returns the key count."""
+    points = fcurve.keyframe_points
+    count = len(points)
+    total = data["co"].size // 2
+    if total > count:
+        points.add(total - count)
+    else:
+        for _ in range(count - total):
+            points.remove(points[-1], fast=True)
+    for attr, size, dtype in KEY_ATTRS:
+        points.foreach_set(attr, np.ascontiguousarray(data[attr], dtype=dtype).ravel())
+    fcurve.update()
+    # Direct F-curve edits don't tag the animated data for re-evaluation
+    fcurve.id_data.update_tag()
+    return total
+
+def splice_keys(base, data, start, end):
+    """Keys of base outside [start, end] together with all keys of data, sorted by frame.
+
+    Both are {attr: array} as from read_keys; base may be None.
+    """
+    if base is None:
+        return data
+    base_frames = base["co"][0::2]
+    keep = (base_frames < start) | (base_frames > end)
+    spliced = {}
+    for attr, size, dtype in KEY_ATTRS:
+        spliced[attr] = np.concatenate((base[attr].reshape(-1, size)[keep], data[attr].reshape(-1, size)))
+    order = np.argsort(spliced["co"][:, 0], kind="stable")
+    return {attr: spliced[attr][order].ravel() for attr in spliced}
+
+def reduce_linear(frames, values, tolerance):
+    """Mask of the keys to keep so that linear interpolation between the kept keys
+    stays within tolerance of every dropped key. The first and last keys are kept."""
+    frames = np.asarray(frames, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = np.ones(len(frames), dtype=bool)
+    if len(frames) <= 2:
+        return keep
+    keep[1:-1] = False
+    start = 0
+    for end in range(2, len(frames)):
+        # Can every key between start and end be dropped?
+        t = (frames[start + 1:end] - frames[start]) / (frames[end] - frames[start])
+        line = values[start] + t * (values[end] - values[start])
+        if np.abs(line - values[start + 1:end]).max() > tolerance:
+            keep[end - 1] = True
+            start = end - 1
+    return keep
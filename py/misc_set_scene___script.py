@@ -1,5 +1,6 @@
 import bpy
 import os
+from . import Cam_CamP_registry___script as camp_registry
 
 # Get the scene and view layer name
 scene = bpy.context.scene
@@ -121,56 +122,39 @@ for obj in scene.objects:
                 first_frame.frame_number = -24
 
 
-def bind_CamPs_to_timeline(prefix="CamP_sub", start_number=1, end_number=24):
+def bind_CamPs_to_timeline():
     """
-    Bind CamP cameras to the timeline with specified naming convention and frame range.
+    Bind the enabled CamPs of the CamP registry to the timeline, each on frame -slot.
     """
-    # Remove markers related to CamPs that are not in the range of -1 to -24 frames
-    markers_to_remove = []
-    for marker in bpy.context.scene.timeline_markers:
-        for i in range(start_number, end_number + 1):
-            camera_name = f"{prefix}{i:02d}"
-            if marker.name == camera_name and marker.frame not in range(-1, -end_number - 1, -1):
-                markers_to_remove.append(marker)
+    timeline_markers = bpy.context.scene.timeline_markers
+    CamP_entries = camp_registry.entries(bpy.context.scene)
+    camera_frames = {entry.camera.name: -entry.slot for entry in CamP_entries}
 
+    # Remove CamP markers that are not on the frame of their CamP
+    markers_to_remove = [marker for marker in timeline_markers if marker.name in camera_frames and marker.frame != camera_frames[marker.name]]
     for marker in markers_to_remove:
-        bpy.context.scene.timeline_markers.remove(marker)
-
-    # Traverse each CamP name and bind it to the corresponding frame
-    for i in range(start_number, end_number + 1):
-        camera_name = f"{prefix}{i:02d}"
-        frame_number = -i
-
-        # Check if CamPs exists
-        if camera_name in bpy.data.objects:
-            camera = bpy.data.objects[camera_name]
-
-            # Check if the CamP is already bound
-            is_bound = False
-            for marker in bpy.context.scene.timeline_markers:
-                if marker.frame == frame_number and marker.camera == camera:
-                    is_bound = True
-                    break
-
-            # If the CamP is not bound, perform the binding operation
-            if not is_bound:
-                # Check if there are other markers on the frame and delete them
-                markers_to_remove = []
-                for marker in bpy.context.scene.timeline_markers:
-                    if marker.frame == frame_number:
-                        markers_to_remove.append(marker)
-
-                for marker in markers_to_remove:
-                    bpy.context.scene.timeline_markers.remove(marker)
-
-                # Create a new marker
-                marker = bpy.context.scene.timeline_markers.new(name=camera_name, frame=frame_number)
-                # Set the CamP as the marker's data
-                marker.camera = camera
-        else:
-            print(f"Camera {camera_name} does not exist")
-
-    print("All cameras have been successfully bound to the timeline.")
+        timeline_markers.remove(marker)
+
+    markers_by_frame = {}
+    for marker in timeline_markers:
+        markers_by_frame.setdefault(marker.frame, []).append(marker)
+
+    for entry in CamP_entries:
+        frame_number = -entry.slot
+        frame_markers = markers_by_frame.get(frame_number, [])
+
+        # Skip CamPs that are already bound
+        if any(marker.camera == entry.camera for marker in frame_markers):
+            continue
+
+        # Other markers on the frame are replaced
+        for marker in frame_markers:
+            timeline_markers.remove(marker)
+
+        marker = timeline_markers.new(name=entry.camera.name, frame=frame_number)
+        marker.camera = entry.camera
+
+    print(f"{len(CamP_entries)} cameras have been successfully bound to the timeline.")
 
 # Bind CamPs to the timeline
 bind_CamPs_to_timeline()
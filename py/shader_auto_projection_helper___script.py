@@ -2,6 +2,7 @@
 
 import bpy
 import os
+from . import Cam_CamP_registry___script as camp_registry
 os.chdir(os.path.dirname(bpy.data.filepath))
 
 def manage_material_and_node_group():
@@ -24,7 +25,7 @@ def manage_material_and_node_group():
             return None
 
         nodes = node_tree.nodes
-        base_tex_image_node = f"CamP_sub{index:02d}_render"
+        base_tex_image_node = f"{camp_registry.camera_name(index)}_render"
 
         # Find all tex_image_node that match the naming pattern
         potential_tex_image_nodes = [node.name for node in nodes if node.name.startswith(base_tex_image_node) and ("_render" in node.name)]
@@ -45,14 +46,9 @@ def manage_material_and_node_group():
         out_c = 'Color_output'
         out_a = 'Alpha_output'
 
-        try:
-            base_path = bpy.data.scenes[bpy.context.scene.name].node_tree.nodes["Output_path_MP"].base_path
-            base_path = os.path.join(base_path, f"CamP_sub{index:02d}")
-            psd_path = os.path.join(os.path.dirname(bpy.data.filepath), base_path, psd_image)
-            webm_path = os.path.join(os.path.dirname(bpy.data.filepath), base_path, webm_image)
-        except Exception:
-            psd_path = os.path.join(os.path.dirname(bpy.data.filepath), f"multires_projecting/CamP_sub{index:02d}/{psd_image}")
-            webm_path = os.path.join(os.path.dirname(bpy.data.filepath), f"multires_projecting/CamP_sub{index:02d}/{webm_image}")
+        base_path = camp_registry.output_dir(bpy.context.scene, index)
+        psd_path = os.path.join(os.path.dirname(bpy.data.filepath), base_path, psd_image)
+        webm_path = os.path.join(os.path.dirname(bpy.data.filepath), base_path, webm_image)
 
         if not all([check_node_exists(nodes, node) for node in [tex_image_node.name, img_conv_node, layer_mixer]]):
             popup_message("One or more nodes do not exist in the current node tree.")
@@ -117,7 +113,7 @@ def manage_material_and_node_group():
             return
 
         cam_projection = f'cam_projection_{str(index).zfill(2)}'
-        cam_object = f'CamP_sub{index:02d}'
+        cam_object = camp_registry.get_camera(index)
 
         if not check_node_exists(node_group.nodes, cam_projection):
             popup_message("The cam_projection node does not exist in the node group.")
@@ -132,22 +128,22 @@ def manage_material_and_node_group():
 
         node_group.nodes[cam_projection].inputs['Width'].default_value = width
         node_group.nodes[cam_projection].inputs['Height'].default_value = height
-        node_group.nodes[cam_projection].inputs['camera_angle'].default_value = bpy.data.cameras[cam_object].angle
-        node_group.nodes[cam_projection].inputs['sensor_width'].default_value = bpy.data.cameras[cam_object].sensor_width
-        node_group.nodes[cam_projection].inputs['shift_x'].default_value = bpy.data.cameras[cam_object].shift_x
-        node_group.nodes[cam_projection].inputs['shift_y'].default_value = bpy.data.cameras[cam_object].shift_y
-        node_group.nodes[cam_projection].inputs['loc_x'].default_value = bpy.data.objects[cam_object].location[0]
-        node_group.nodes[cam_projection].inputs['loc_y'].default_value = bpy.data.objects[cam_object].location[1]
-        node_group.nodes[cam_projection].inputs['loc_z'].default_value = bpy.data.objects[cam_object].location[2]
-        node_group.nodes[cam_projection].inputs['rot_x'].default_value = bpy.data.objects[cam_object].rotation_euler[0]
-        node_group.nodes[cam_projection].inputs['rot_y'].default_value = bpy.data.objects[cam_object].rotation_euler[1]
-        node_group.nodes[cam_projection].inputs['rot_z'].default_value = bpy.data.objects[cam_object].rotation_euler[2]
+        node_group.nodes[cam_projection].inputs['camera_angle'].default_value = cam_object.data.angle
+        node_group.nodes[cam_projection].inputs['sensor_width'].default_value = cam_object.data.sensor_width
+        node_group.nodes[cam_projection].inputs['shift_x'].default_value = cam_object.data.shift_x
+        node_group.nodes[cam_projection].inputs['shift_y'].default_value = cam_object.data.shift_y
+        node_group.nodes[cam_projection].inputs['loc_x'].default_value = cam_object.location[0]
+        node_group.nodes[cam_projection].inputs['loc_y'].default_value = cam_object.location[1]
+        node_group.nodes[cam_projection].inputs['loc_z'].default_value = cam_object.location[2]
+        node_group.nodes[cam_projection].inputs['rot_x'].default_value = cam_object.rotation_euler[0]
+        node_group.nodes[cam_projection].inputs['rot_y'].default_value = cam_object.rotation_euler[1]
+        node_group.nodes[cam_projection].inputs['rot_z'].default_value = cam_object.rotation_euler[2]
 
     shader_editor = get_shader_editor()
     if shader_editor is None or shader_editor.edit_tree is None:
         popup_message("No Shader Editor is currently open or no node tree is currently active.")
     else:
-        for i in range(1, 25):
+        for i in camp_registry.slots():
             psd_image = update_material(shader_editor.edit_tree, i)
             if psd_image is not None:
                 update_node_group(i, psd_image)
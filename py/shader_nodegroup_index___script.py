@@ -0,0 +1,179 @@
+import bpy
+from bpy.app.handlers import persistent
+
+
+class NodeGroupIndex:
+    """Which materials use which node groups, and which objects use which materials.
+
+    Built on the first query and kept current by handlers: a depsgraph update only
+    marks the changed materials dirty, and they are rescanned on the next query.
+    Entries are keyed by session_uid, so renaming a material or a node group doesn't
+    break them; group names are resolved at query time. An update of a node group
+    marks the materials using it dirty.
+    """
+
+    def __init__(self):
+        self.groups = {}            # group uid -> {material uid: (node name, ...)}
+        self.material_groups = {}   # material uid -> group uids used by it
+        self.material_names = {}    # material uid -> material name
+        self.dirty = set()          # material uids to rescan
+        self.built = False
+        self.users = None           # material uid (None: no material) -> object names, rebuilt when None
+
+    def clear(self):
+        self.__init__()
+
+    def mark_dirty(self, material):
+        self.dirty.add(material.session_uid)
+        self.users = None
+
+    def index_material(self, material):
+        uid = material.session_uid
+        self.drop_material(uid)
+        self.material_names[uid] = material.name
+        if not material.node_tree:
+            return
+        found = {}
+        for node in material.node_tree.nodes:
+            if node.type == 'GROUP' and node.node_tree:
+                found.setdefault(node.node_tree.session_uid, []).append(node.name)
+        for group_uid, node_names in found.items():
+            self.groups.setdefault(group_uid, {})[uid] = tuple(node_names)
+        self.material_groups[uid] = set(found)
+
+    def drop_material(self, uid):
+        for group_uid in self.material_groups.pop(uid, ()):
+            materials = self.groups.get(group_uid)
+            if materials is not None:
+                materials.pop(uid, None)
+                if not materials:
+                    del self.groups[group_uid]
+        self.material_names.pop(uid, None)
+
+    def sync(self):
+        """Bring the index up to date, rescanning only new and dirty materials."""
+        if not self.built:
+            self.clear()
+            for material in bpy.data.materials:
+                self.index_material(material)
+            self.built = True
+            return
+        # Unused materials never show up in depsgraph updates, so additions, removals and
+        # renames are found by comparing uids and names; no nodes are scanned for that
+        materials = {material.session_uid: material for material in bpy.data.materials}
+        for uid in set(self.material_names) - materials.keys():
+            self.drop_material(uid)
+        for uid, material in materials.items():
+            if uid in self.dirty or uid not in self.material_names:
+                self.index_material(material)
+            elif self.material_names[uid] != material.name:
+                self.material_names[uid] = material.name
+        self.dirty.clear()
+
+    def get_material(self, uid):
+        material = bpy.data.materials.get(self.material_names.get(uid, ""))
+        return material if material is not None and material.session_uid == uid else None
+
+    def mark_group_users_dirty(self, group):
+        for uid in self.groups.get(group.session_uid, ()):
+            self.dirty.add(uid)
+
+    @staticmethod
+    def group_uids(group_name, exact=True):
+        """Session uids of the node groups named group_name, or containing it with exact=False."""
+        if exact:
+            group = bpy.data.node_groups.get(group_name)
+            return [group.session_uid] if group is not None else []
+        return [group.session_uid for group in bpy.data.node_groups if group_name in group.name]
+
+    def find(self, group_name, exact=True):
+        """[(material, [node, ...]), ...] for every material using the node group.
+
+        With exact=False every group whose name contains group_name matches.
+        """
+        self.sync()
+        result = []
+        stale = False
+        for group_uid in self.group_uids(group_name, exact):
+            for uid, node_names in self.groups.get(group_uid, {}).items():
+                material = self.get_material(uid)
+                if material is None or not material.node_tree:
+                    continue
+                nodes = [material.node_tree.nodes[name] for name in node_names if name in material.node_tree.nodes]
+                # A node may have been given another group without the material being updated
+                valid = [node for node in nodes if node.node_tree and node.node_tree.session_uid == group_uid]
+                if len(valid) != len(node_names):
+                    self.dirty.add(uid)
+                    stale = True
+                if valid:
+                    result.append((material, valid))
+        if stale:
+            # Rescan the materials whose entries were out of date and query again
+            return self.find(group_name, exact)
+        # Same order as bpy.data.materials
+        result.sort(key=lambda entry: entry[0].name)
+        return result
+
+    def materials_using(self, group_name):
+        """Session uids of the materials using the node group."""
+        self.sync()
+        uids = set()
+        for group_uid in self.group_uids(group_name):
+            uids.update(self.groups.get(group_uid, {}))
+        return uids
+
+    def material_users(self, material):
+        """Mesh objects whose mesh uses the material; None gives meshes without any material."""
+        if self.users is None:
+            self.users = {}
+            for obj in bpy.data.objects:
+                if obj.type != 'MESH':
+                    continue
+                materials = [m for m in obj.data.materials if m is not None]
+                for m in materials:
+                    self.users.setdefault(m.session_uid, []).append(obj.name)
+                if not materials:
+                    self.users.setdefault(None, []).append(obj.name)
+        uid = None if material is None else material.session_uid
+        return [bpy.data.objects[name] for name in self.users.get(uid, ()) if name in bpy.data.objects]
+
+
+nodegroup_index = NodeGroupIndex()
+
+
+@persistent
+def mp_nodegroup_index_depsgraph_update(scene, depsgraph):
+    for update in depsgraph.updates:
+        data = update.id.original
+        if isinstance(data, bpy.types.Material):
+            nodegroup_index.dirty.add(data.session_uid)
+        elif isinstance(data, bpy.types.NodeTree):
+            nodegroup_index.mark_group_users_dirty(data)
+        elif isinstance(data, (bpy.types.Object, bpy.types.Mesh)):
+            nodegroup_index.users = None
+
+@persistent
+def mp_nodegroup_index_reset(*args):
+    nodegroup_index.clear()
+
+HANDLERS = (
+    (bpy.app.handlers.depsgraph_update_post, mp_nodegroup_index_depsgraph_update),
+    (bpy.app.handlers.load_post, mp_nodegroup_index_reset),
+    (bpy.app.handlers.undo_post, mp_nodegroup_index_reset),
+    (bpy.app.handlers.redo_post, mp_nodegroup_index_reset),
+)
+
+def unregister_handlers():
+    # Match by name so handlers of a reloaded copy of this module are replaced too
+    for handlers, handler in HANDLERS:
+        for registered in [h for h in handlers if h.__name__ == handler.__name__]:
+            handlers.remove(registered)
+
+def register_handlers():
+    unregister_handlers()
+    for handlers, handler in HANDLERS:
+        handlers.append(handler)
+
+# A reload (mp.reload_scripts) swaps in this copy's index if the handlers were running
+if any(h.__name__ == mp_nodegroup_index_depsgraph_update.__name__ for h in bpy.app.handlers.depsgraph_update_post):
+    register_handlers()
@@ -1,4 +1,7 @@
 import bpy
+import time
+from . import shader_nodegroup_index___script as nodegroup_index
+from . import Cam_CamP_registry___script as camp_registry
 
 def shader_reset_CURVE_RGB_curves():
     def show_popup(message):
@@ -250,26 +253,28 @@ class AOV_Manager:
         if node_group is None:
             self.display_error("AOV nodegroup does not exist, run set scene to get it.")
         else:
+            index = nodegroup_index.nodegroup_index
+            has_aov = index.materials_using(self.node_group_name)
             for material in bpy.data.materials:
                 if not material.use_nodes:
                     material.use_nodes = True
                 if material.name == "NPR_Shader_Library":
                     continue
-                if material.node_tree and any(node.node_tree is not None and node.node_tree.name == self.node_group_name for node in material.node_tree.nodes if hasattr(node, 'node_tree')):
+                if material.session_uid in has_aov:
                     continue
                 if material.node_tree:
                     new_node = material.node_tree.nodes.new('ShaderNodeGroup')
                     new_node.node_tree = node_group
+                    index.mark_dirty(material)
 
     def execute_script_off(self):
-        for material in bpy.data.materials:
-            if not material.node_tree:
-                continue
+        index = nodegroup_index.nodegroup_index
+        for material, nodes_to_remove in index.find(self.node_group_name):
             if material.name == "NPR_Shader_Library":
                 continue
-            nodes_to_remove = [node for node in material.node_tree.nodes if getattr(node, 'node_tree', None) and node.node_tree.name == self.node_group_name]
             for node in nodes_to_remove:
                 material.node_tree.nodes.remove(node)
+            index.mark_dirty(material)
 
     def toggle_script(self):
         if self.script_state:
@@ -316,14 +321,16 @@ class NprClayDebug:
         self.mat.node_tree.links.new(group_node.outputs[0], self.mat.node_tree.nodes["Material Output"].inputs[0])
 
     def assign_material(self):
-        for obj in bpy.data.objects:
+        index = nodegroup_index.nodegroup_index
+        for obj in index.material_users(None):
             if obj.type == 'MESH' and (not obj.modifiers or all(mod.type != 'NODES' for mod in obj.modifiers)) and (not obj.data.materials or len(obj.data.materials) == 1 and obj.data.materials[0] is None):
                 obj.data.materials.append(self.mat)
                 if len(obj.data.materials) > 1:
                     obj.data.materials.pop(index=0)
+        index.users = None
 
     def remove_material(self):
-        for obj in bpy.data.objects:
+        for obj in nodegroup_index.nodegroup_index.material_users(self.mat):
             if obj.type == 'MESH':
                 if self.mat.name in obj.data.materials:
                     index = obj.data.materials.find(self.mat.name)
@@ -331,6 +338,7 @@ class NprClayDebug:
                     if not obj.data.materials:
                         obj.data.materials.append(None)
                     obj.data.materials.pop(index=index)
+        nodegroup_index.nodegroup_index.users = None
 
     def toggle_script(self):
         if self.script_state:
@@ -370,59 +378,62 @@ class NPR_bake_helper:
             self.script_state = False
             bpy.context.window_manager['script_state'] = self.script_state
 
+    @staticmethod
+    def link_index(links, node):
+        """Links into the node, keyed by destination socket name; built once per material."""
+        return {link.to_socket.name: link for link in links if link.to_node == node}
+
+    def report_timing(self, action, count, seconds):
+        rate = count / seconds if seconds > 0 else float('inf')
+        print(f"NPR bake helper {action}: {count} materials in {seconds:.3f}s ({rate:.0f} materials/s)")
+
     def execute_script_on(self):
         problematic_materials = []
+        start = time.perf_counter()
+        materials = nodegroup_index.nodegroup_index.find(self.shader_name)
 
-        for mat in bpy.data.materials:
+        for mat, shader_nodes in materials:
             if mat.node_tree:
                 nodes = mat.node_tree.nodes
                 links = mat.node_tree.links
 
-                NPR_shader_node = next((n for n in nodes if n.type == 'GROUP' and n.node_tree and n.node_tree.name == self.shader_name), None)
-                if NPR_shader_node is None:
-                    print(f"NPR shader node not found in material '{mat.name}'. Skipping...")
-                    continue
+                NPR_shader_node = shader_nodes[0]
 
                 NPR_shader_node.use_custom_color = True
                 NPR_shader_node.color = (0.25, 0.5, 0.0)
                 NPR_shader_node.select = True
                 nodes.active = NPR_shader_node
 
-                links_to_modify = []
+                incoming = self.link_index(links, NPR_shader_node)
+                inputs = NPR_shader_node.inputs
+                links_to_add = []
                 links_to_remove = []
 
                 try:
+                    # Resolve every socket first, so a material missing one is left untouched
                     for i, socket in enumerate(self.INPUT_SOCKETS):
-                        for link in list(links):
-                            if link.to_node.name == NPR_shader_node.name and link.to_socket.name == socket:
-                                self.NPR_NODES[i] = link.from_node.name
-
-                                from_socket = nodes[self.NPR_NODES[i]].outputs['Color']
-                                to_socket = nodes[NPR_shader_node.name].inputs[self.INPUT_FOR_BAKE_SOCKETS_COL[i]]
-                                links.new(from_socket, to_socket)
-
-                                from_socket = nodes[self.NPR_NODES[i]].outputs['Mask']
-                                to_socket = nodes[NPR_shader_node.name].inputs[self.INPUT_FOR_BAKE_SOCKETS_A[i]]
-                                links.new(from_socket, to_socket)
-
-                            elif nodes[NPR_shader_node.name].inputs[socket].is_linked == False:
-                                for l in list(nodes[NPR_shader_node.name].inputs[self.INPUT_FOR_BAKE_SOCKETS_A[i]].links):
-                                    links_to_remove.append(l)
-                                for l in list(nodes[NPR_shader_node.name].inputs[self.INPUT_FOR_BAKE_SOCKETS_COL[i]].links):
-                                    links_to_remove.append(l)
-
-                    for link in links_to_remove:
-                        try:
-                            links.remove(link)
-                        except:
-                            pass
-
-                    nodes[NPR_shader_node.name].inputs['realtime/baked'].default_value = 1
-
+                        link = incoming.get(socket)
+                        if link is not None:
+                            self.NPR_NODES[i] = link.from_node.name
+                            links_to_add.append((link.from_node.outputs['Color'], inputs[self.INPUT_FOR_BAKE_SOCKETS_COL[i]]))
+                            links_to_add.append((link.from_node.outputs['Mask'], inputs[self.INPUT_FOR_BAKE_SOCKETS_A[i]]))
+                        else:
+                            for bake_socket in (self.INPUT_FOR_BAKE_SOCKETS_A[i], self.INPUT_FOR_BAKE_SOCKETS_COL[i]):
+                                if bake_socket in incoming:
+                                    links_to_remove.append(incoming[bake_socket])
+                    baked_input = inputs['realtime/baked']
                 except KeyError as e:
                     problematic_materials.append(mat.name)
                     print(f"KeyError in material '{mat.name}': {e}")
+                    continue
+
+                for link in links_to_remove:
+                    links.remove(link)
+                for from_socket, to_socket in links_to_add:
+                    links.new(from_socket, to_socket)
+                baked_input.default_value = 1
 
+        self.report_timing("on", len(materials), time.perf_counter() - start)
         if problematic_materials:
             self.show_popup_menu(problematic_materials)
 
@@ -440,33 +451,27 @@ class NPR_bake_helper:
 
 
     def execute_script_off(self):
-        for mat in bpy.data.materials:
+        start = time.perf_counter()
+        materials = nodegroup_index.nodegroup_index.find(self.shader_name)
+        bake_sockets = self.INPUT_FOR_BAKE_SOCKETS_COL + self.INPUT_FOR_BAKE_SOCKETS_A
+
+        for mat, shader_nodes in materials:
             if mat.node_tree:
-                nodes = mat.node_tree.nodes
                 links = mat.node_tree.links
 
-                NPR_shader_node = next((n for n in nodes if n.type == 'GROUP' and n.node_tree and n.node_tree.name == self.shader_name), None)
-                if NPR_shader_node is None:
-                    print(f"NPR shader node not found in material '{mat.name}'. Skipping...")
-                    continue
+                NPR_shader_node = shader_nodes[0]
 
                 NPR_shader_node.use_custom_color = True
                 NPR_shader_node.color = (0.25, 0.5, 0.5)
 
-                links_to_remove = []
-
-                for socket in self.INPUT_FOR_BAKE_SOCKETS_COL + self.INPUT_FOR_BAKE_SOCKETS_A:
-                    for link in list(links):
-                        if link.to_node.name == NPR_shader_node.name and link.to_socket.name == socket:
-                            links_to_remove.append(link)
+                incoming = self.link_index(links, NPR_shader_node)
+                for socket in bake_sockets:
+                    if socket in incoming:
+                        links.remove(incoming[socket])
 
-                for link in links_to_remove:
-                    try:
-                        links.remove(link)
-                    except:
-                        pass
+                NPR_shader_node.inputs['realtime/baked'].default_value = 0
 
-                nodes[NPR_shader_node.name].inputs['realtime/baked'].default_value = 0
+        self.report_timing("off", len(materials), time.perf_counter() - start)
 
     def toggle_script(self):
         if self.script_state:
@@ -489,19 +494,19 @@ def shader_NPR_bake_helper_toggle():
 class Cam_Tex_Linker:
     def __init__(self):
         self.vm_output = "cam_projection_vector_and_mask"
-        self.input_nodegroup = [item for sublist in [
-            [f"projection_layer{str(i).zfill(2)}",
-             f"CamP_sub{str(i).zfill(2)}_render"] for i in range(1, 25)
-            ] for item in sublist]
-        self.input_socket = ["alpha_camera", "Vector"] * 24
         self.script_state = bpy.context.window_manager.get('script_state', False)
 
+    @staticmethod
+    def slot_links(slot):
+        """(node name, input socket, vm_output output index) of the two links of a CamP slot."""
+        ind = 2 * (slot - 1)
+        return ((f"projection_layer{slot:02d}", "alpha_camera", -ind - 1),
+                (f"{camp_registry.camera_name(slot)}_render", "Vector", -ind - 2))
+
     def find_material_with_node_group(self, node_group_name):
-        for material in bpy.data.materials:
+        for material, nodes in nodegroup_index.nodegroup_index.find(node_group_name, exact=False):
             if material.use_nodes:
-                for node in material.node_tree.nodes:
-                    if node.type == 'GROUP' and node_group_name in node.node_tree.name:
-                        return material
+                return material
         return None
 
     def execute_script_on(self):
@@ -516,36 +521,25 @@ class Cam_Tex_Linker:
             if self.vm_output not in node:
                 self.display_error(f"The material does not contain the required '{self.vm_output}' node. Please add the node and try again.")
             else:
-                ind = -1
-                ind_step = 1
-
-                for n in range(48):
-                    ind = ind + ind_step
-                    if self.input_nodegroup[ind] not in node:
-                        self.display_error(f"The material does not contain the required '{self.input_nodegroup[ind]}' node. Please add the node and try again.")
-                        break
-                    else:
-                        links_new(
-                            node[self.vm_output].outputs[-ind-1],
-                            node[self.input_nodegroup[ind]].inputs[self.input_socket[ind]]
-                        )
+                outputs = node[self.vm_output].outputs
+                for slot in camp_registry.slots():
+                    for node_name, socket_name, output_index in self.slot_links(slot):
+                        if node_name not in node:
+                            self.display_error(f"The material does not contain the required '{node_name}' node. Please add the node and try again.")
+                            return
+                        if -output_index > len(outputs):
+                            self.display_error(f"'{self.vm_output}' has no output for {camp_registry.camera_name(slot)}.")
+                            return
+                        links_new(outputs[output_index], node[node_name].inputs[socket_name])
 
     def execute_script_off(self):
         material_tree = self.find_material_with_node_group(".cam_projection_all")
 
-        if material_tree and material_tree.node_tree:
-            node = material_tree.node_tree.nodes
+        if material_tree and material_tree.node_tree and self.vm_output in material_tree.node_tree.nodes:
             links_remove = material_tree.node_tree.links.remove
-
-            ind = -1
-            ind_step = 1
-
-            for n in range(48):
-                ind = ind + ind_step
-                try:
-                    links_remove(node[self.vm_output].outputs[-ind].links[0])
-                except IndexError:
-                    pass
+            for output in material_tree.node_tree.nodes[self.vm_output].outputs:
+                for link in list(output.links):
+                    links_remove(link)
 
     def toggle_script(self):
         if self.script_state:
@@ -1,139 +1,195 @@
 import bpy
 import os
+from . import Cam_CamP_registry___script as camp_registry
+
+
+def popup_message(message):
+    def draw(self, context):
+        self.layout.label(text=message)
+    bpy.context.window_manager.popup_menu(draw, title="Information", icon='INFO')
+
+def print_report(level, message):
+    print(f"{'/'.join(sorted(level))}: {message}")
+
+def find_CamP_images(scene):
+    """Load (or reload) the overpaints of the enabled CamPs. Returns ({slot: psd path}, available slots)."""
+    psd_op_paths = {}
+    available_camera_indexes = []
+    for slot in camp_registry.slots(scene):
+        psd_path = camp_registry.image_path(scene, slot)
+        psd_image = os.path.basename(psd_path)
+        psd_op_paths[slot] = psd_path
+        if os.path.exists(bpy.path.abspath(psd_path)):
+            available_camera_indexes.append(slot)
+            if psd_image not in bpy.data.images:
+                bpy.data.images.load(bpy.path.abspath(psd_path))
+            else:
+                bpy.data.images[psd_image].reload()
+    return psd_op_paths, available_camera_indexes
+
+def activate_overpaint_node(obj):
+    """Make the overpaint image node of the object's active material the paint target."""
+    nodes = obj.active_material.node_tree.nodes
+    # Define a list of acceptable names
+    acceptable_names = ["overpaint", "ov", "op", "project", "projecting", "billboard", "BR"]  # Add or modify as needed
+    for node in nodes:
+        # Check if the node's image name or label is in the acceptable names list
+        if node.bl_idname == 'ShaderNodeTexImage' and node.image and any(name.lower() in node.image.name.lower() or name.lower() in node.label.lower() for name in acceptable_names):
+            nodes.active = None
+            node.select = True
+            nodes.active = node
+            return True
+
+        # Check if the node in a group tree has an image with an acceptable name
+        if node.bl_idname == 'ShaderNodeGroup':
+            group_nodes = node.node_tree.nodes
+            group_nodes.active = None
+            for group_node in group_nodes:
+                if group_node.bl_idname == 'ShaderNodeTexImage' and group_node.image and any(name.lower() in group_node.image.name.lower() or name.lower() in group_node.label.lower() for name in acceptable_names):
+                    group_nodes.active = None
+                    group_node.select = True
+                    group_nodes.active = group_node
+                    # Activate the group node in the shader node tree
+                    node.select = True
+                    nodes.active = node
+                    return True
+    return False
+
+def duplicate_object(obj):
+    new_obj = obj.copy()
+    new_obj.data = obj.data.copy()
+    bpy.context.collection.objects.link(new_obj)
+    return new_obj
+
+def project_CamP_images(camera_indexes, psd_op_paths, merged_obj=None, report=print_report):
+    bpy.ops.object.mode_set(mode='OBJECT')
+    if merged_obj is None:
+        active_obj = bpy.context.active_object
+        selected_objs = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH' and obj != active_obj]
+        active_obj_copy = duplicate_object(active_obj)
+        selected_objs_copy = [duplicate_object(obj) for obj in selected_objs]
+
+        for modifier in active_obj_copy.modifiers:
+            bpy.context.view_layer.objects.active = active_obj_copy
+            bpy.ops.object.modifier_apply(modifier=modifier.name)
+
+        for obj in selected_objs_copy:
+            if obj.material_slots:
+                for i in range(len(obj.material_slots)):
+                    obj.material_slots[i].material = None
+            for modifier in obj.modifiers:
+                bpy.context.view_layer.objects.active = obj
+                bpy.ops.object.modifier_apply(modifier=modifier.name)
+            while obj.data.uv_layers:
+                obj.data.uv_layers.remove(obj.data.uv_layers[0])
+            bpy.ops.object.select_all(action='DESELECT')
+            obj.select_set(True)
+            active_obj_copy.select_set(True)
+            bpy.context.view_layer.objects.active = active_obj_copy
+            bpy.ops.object.join()
+        for i in reversed(range(len(active_obj_copy.material_slots))):
+            if active_obj_copy.material_slots[i].material is None:
+                active_obj_copy.active_material_index = i
+                bpy.ops.object.material_slot_remove()
+    else:
+        active_obj_copy = merged_obj
+
+    # Select all faces of active_obj_copy
+    bpy.ops.object.mode_set(mode='EDIT')
+    bpy.ops.mesh.select_all(action='SELECT')
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    for i in camera_indexes:
+        camera = camp_registry.get_camera(i)
+        if camera is None or i not in psd_op_paths:
+            report({'ERROR'}, f"Camera {camp_registry.camera_name(i)} is not registered.")
+            continue
+        try:
+            bpy.data.images.load(psd_op_paths[i], check_existing=True)
+            psd_op_in_data = os.path.basename(psd_op_paths[i])
+            bpy.context.scene.camera = camera
+            bpy.ops.paint.texture_paint_toggle()
+            bpy.context.scene.tool_settings.image_paint.seam_bleed = 3
+            bpy.context.scene.tool_settings.image_paint.use_occlude = True
+            bpy.context.scene.tool_settings.image_paint.use_backface_culling = True
+            bpy.ops.paint.project_image(image=psd_op_in_data)
+            report({'INFO'}, 'Image projected successfully.')
+        except Exception as e:
+            report({'ERROR'}, f"Error occurred: {e}")
+    bpy.ops.object.mode_set(mode='OBJECT')
+    if merged_obj is None:
+        bpy.data.objects.remove(active_obj_copy, do_unlink=True)
+    return {'FINISHED'}
+
+def overpaint_camera_projection(active_obj, selected_objs, camera_indexes, psd_op_paths, merge_mesh=False, report=print_report):
+    """Project the CamP overpaints onto active_obj, optionally merged with selected_objs. Needs no window."""
+    original_global_undo = bpy.context.preferences.edit.use_global_undo
+    bpy.context.preferences.edit.use_global_undo = False
+    active_camera = bpy.context.scene.camera
+
+    # Selection drives the projection below
+    bpy.ops.object.select_all(action='DESELECT')
+    for obj in selected_objs:
+        obj.select_set(True)
+    active_obj.select_set(True)
+    bpy.context.view_layer.objects.active = active_obj
+
+    if merge_mesh and selected_objs:
+        # Create a merged copy of active and selected objects
+        bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked":False, "mode":'TRANSLATION'})
+        bpy.ops.object.join()
+        merged_obj = bpy.context.active_object
+    else:
+        merged_obj = None
+
+    try:
+        result = project_CamP_images(camera_indexes, psd_op_paths, merged_obj, report)
+    finally:
+        bpy.context.scene.camera = active_camera
+        if merged_obj:
+            bpy.data.objects.remove(merged_obj, do_unlink=True)
+        # Restore original selection and active object
+        bpy.ops.object.select_all(action='DESELECT')
+        for obj in selected_objs:
+            obj.select_set(True)
+        active_obj.select_set(True)
+        bpy.context.view_layer.objects.active = active_obj
+        bpy.context.preferences.edit.use_global_undo = original_global_undo
+    return result
 
-os.chdir(os.path.dirname(bpy.data.filepath))
 
 class OverpaintCameraProjection(bpy.types.Operator):
     bl_idname = "object.overpaint_camera_projection"
     bl_label = "Overpaint Camera Projection"
     bl_options = {'REGISTER', 'UNDO'}
-    camera_indexes: bpy.props.BoolVectorProperty(name="Camera Indexes", size=24)
+    camera_slots: bpy.props.CollectionProperty(name="Camera Indexes", type=camp_registry.CamPSlotToggle)
     specified_camera: bpy.props.BoolProperty(name="Specify Camera Projection", default=False)
     merge_mesh: bpy.props.BoolProperty(name="Merge Mesh", default=False)
 
     def setup(self, context):
-        self.CamP_objects = [f"CamP_sub{str(i).zfill(2)}" for i in range(1, 25)]
-        self.psd_op_paths = []
-        self.available_camera_indexes = []
-        self.image_modification_times = {}
-        for i in range(1, 25):
-            psd_image = f"CamP_sub{i:02d}_render.psd"
-            if "Output_path_MP" in bpy.context.scene.node_tree.nodes:
-                base_path = bpy.data.scenes[bpy.context.scene.name].node_tree.nodes["Output_path_MP"].base_path.replace("//", "")
-                base_path = os.path.join(base_path, f"CamP_sub{i:02d}")
-                psd_path = os.path.relpath(os.path.join(os.path.dirname(bpy.data.filepath), base_path, psd_image), bpy.path.abspath("//"))
-                psd_path = "//" + psd_path.replace("\\", "/")
-            else:
-                psd_path = os.path.join(os.path.dirname(bpy.data.filepath), f"multires_projecting/CamP_sub{str(i).zfill(2)}/{psd_image}")
-            self.psd_op_paths.append(psd_path)
-            if os.path.exists(bpy.path.abspath(psd_path)):
-                self.available_camera_indexes.append(i)
-                modification_time = os.path.getmtime(bpy.path.abspath(psd_path))
-                if psd_image not in self.image_modification_times or self.image_modification_times[psd_image] != modification_time:
-                    if psd_image not in bpy.data.images:
-                        bpy.data.images.load(bpy.path.abspath(psd_path))
-                    else:
-                        bpy.data.images[psd_image].reload()
-                    self.image_modification_times[psd_image] = modification_time
+        self.psd_op_paths, self.available_camera_indexes = find_CamP_images(context.scene)
+        self.camera_slots.clear()
+        for slot in self.available_camera_indexes:
+            self.camera_slots.add().slot = slot
         return True
 
     def popup_message(self, message):
-        def draw(self, context):
-            self.layout.label(text=message)
-        bpy.context.window_manager.popup_menu(draw, title="Information", icon='INFO')
-
-    def duplicate_object(self, obj):
-        new_obj = obj.copy()
-        new_obj.data = obj.data.copy()
-        bpy.context.collection.objects.link(new_obj)
-        return new_obj
-
-    def execute_projection(self, camera_indexes=None, merged_obj=None):
-        bpy.ops.object.mode_set(mode='OBJECT')
-        if merged_obj is None:
-            active_obj = bpy.context.active_object
-            selected_objs = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH' and obj != active_obj]
-            active_obj_copy = self.duplicate_object(active_obj)
-            selected_objs_copy = [self.duplicate_object(obj) for obj in selected_objs]
-
-            for modifier in active_obj_copy.modifiers:
-                bpy.context.view_layer.objects.active = active_obj_copy
-                bpy.ops.object.modifier_apply(modifier=modifier.name)
+        popup_message(message)
 
-            for obj in selected_objs_copy:
-                if obj.material_slots:
-                    for i in range(len(obj.material_slots)):
-                        obj.material_slots[i].material = None
-                for modifier in obj.modifiers:
-                    bpy.context.view_layer.objects.active = obj
-                    bpy.ops.object.modifier_apply(modifier=modifier.name)
-                while obj.data.uv_layers:
-                    obj.data.uv_layers.remove(obj.data.uv_layers[0])
-                bpy.ops.object.select_all(action='DESELECT')
-                obj.select_set(True)
-                active_obj_copy.select_set(True)
-                bpy.context.view_layer.objects.active = active_obj_copy
-                bpy.ops.object.join()
-            for i in reversed(range(len(active_obj_copy.material_slots))):
-                if active_obj_copy.material_slots[i].material is None:
-                    active_obj_copy.active_material_index = i
-                    bpy.ops.object.material_slot_remove()
+    def report_projection(self, level, message):
+        if 'ERROR' in level:
+            self.popup_message(message)
         else:
-            active_obj_copy = merged_obj
-
-        # Select all faces of active_obj_copy
-        bpy.ops.object.mode_set(mode='EDIT')
-        bpy.ops.mesh.select_all(action='SELECT')
-        bpy.ops.object.mode_set(mode='OBJECT')
-
-        if camera_indexes is None:
-            for i in self.available_camera_indexes:
-                if self.CamP_objects[i-1] in bpy.data.objects:
-                    try:
-                        bpy.data.images.load(self.psd_op_paths[i-1], check_existing=True)
-                        psd_op_in_data = self.psd_op_paths[i-1].split('/')[-1]
-                        bpy.context.scene.camera = bpy.data.objects[self.CamP_objects[i-1]]
-                        bpy.ops.paint.texture_paint_toggle()
-                        bpy.context.scene.tool_settings.image_paint.seam_bleed = 3
-                        bpy.context.scene.tool_settings.image_paint.use_occlude = True
-                        bpy.context.scene.tool_settings.image_paint.use_backface_culling = True
-                        bpy.ops.paint.project_image(image=psd_op_in_data)
-                        self.report({'INFO'}, 'Image projected successfully.')
-                    except Exception as e:
-                        self.popup_message(f"Error occurred: {e}")
-        else:
-            for i in camera_indexes:
-                if self.CamP_objects[i-1] in bpy.data.objects:
-                    try:
-                        bpy.data.images.load(self.psd_op_paths[i-1], check_existing=True)
-                        psd_op_in_data = self.psd_op_paths[i-1].split('/')[-1]
-                        bpy.context.scene.camera = bpy.data.objects[self.CamP_objects[i-1]]
-                        bpy.ops.paint.texture_paint_toggle()
-                        bpy.context.scene.tool_settings.image_paint.seam_bleed = 3
-                        bpy.context.scene.tool_settings.image_paint.use_occlude = True
-                        bpy.context.scene.tool_settings.image_paint.use_backface_culling = True
-                        bpy.ops.paint.project_image(image=psd_op_in_data)
-                        self.report({'INFO'}, 'Image projected successfully.')
-                    except Exception as e:
-                        self.popup_message(f"Camera {self.CamP_objects[i-1]} does not exist.")
-        bpy.ops.object.mode_set(mode='OBJECT')
-        if merged_obj is None:
-            bpy.data.objects.remove(active_obj_copy, do_unlink=True)
-        return {'FINISHED'}
+            self.report(level, message)
 
     def execute(self, context):
-        original_global_undo = bpy.context.preferences.edit.use_global_undo
-        bpy.context.preferences.edit.use_global_undo = False
-
         if not hasattr(self, 'psd_op_paths'):
             self.setup(context)
 
-        active_camera = bpy.context.scene.camera
-        selected_camera_indexes = [i + 1 for i in range(24) if self.camera_indexes[i]]
+        selected_camera_indexes = [item.slot for item in self.camera_slots if item.use]
         if self.specified_camera:
             if not selected_camera_indexes:
                 self.popup_message("No camera selected. Please select a camera to proceed.")
-                bpy.context.preferences.edit.use_global_undo = original_global_undo
                 return {'CANCELLED'}
             camera_indexes = selected_camera_indexes
         else:
@@ -141,33 +197,8 @@ class OverpaintCameraProjection(bpy.types.Operator):
 
         active_obj = bpy.context.active_object
         selected_objs = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH' and obj != active_obj]
-
-        if self.merge_mesh and selected_objs:
-            # Create a merged copy of active and selected objects
-            bpy.ops.object.select_all(action='DESELECT')
-            for obj in selected_objs:
-                obj.select_set(True)
-            active_obj.select_set(True)
-            bpy.context.view_layer.objects.active = active_obj
-            bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked":False, "mode":'TRANSLATION'})
-            bpy.ops.object.join()
-            merged_obj = bpy.context.active_object
-        else:
-            merged_obj = None
-
-        result = self.execute_projection(camera_indexes, merged_obj)
-        bpy.context.scene.camera = active_camera
-        if merged_obj:
-            bpy.data.objects.remove(merged_obj, do_unlink=True)
-        # Restore original selection and active object
-        bpy.ops.object.select_all(action='DESELECT')
-        for obj in selected_objs:
-            obj.select_set(True)
-        active_obj.select_set(True)
-        bpy.context.view_layer.objects.active = active_obj
-
-        bpy.context.preferences.edit.use_global_undo = original_global_undo
-        return result
+        return overpaint_camera_projection(active_obj, selected_objs, camera_indexes, self.psd_op_paths,
+                                           merge_mesh=self.merge_mesh, report=self.report_projection)
 
     def draw(self, context):
         layout = self.layout
@@ -178,12 +209,10 @@ class OverpaintCameraProjection(bpy.types.Operator):
         if not self.specified_camera:
             layout.label(text="Camera Indexes: All available")
         else:
-            for i in range(0, 24, 8):
+            for i in range(0, len(self.camera_slots), 8):
                 row = layout.row()
-                for j in range(i, min(i + 8, 24)):
-                    index = j + 1
-                    if index in self.available_camera_indexes:
-                        row.prop(self, "camera_indexes", index=j, text=str(index))
+                for item in self.camera_slots[i:i + 8]:
+                    row.prop(item, "use", text=str(item.slot))
 
     def invoke(self, context, event):
         active_obj = bpy.context.active_object
@@ -196,40 +225,7 @@ class OverpaintCameraProjection(bpy.types.Operator):
         if not active_obj.active_material:
             self.popup_message("The active object does not have an active material. Please select an object with a suitable material for overpainting.")
             return {'CANCELLED'}
-        active_mat = active_obj.active_material
-        nodes = active_mat.node_tree.nodes
-        node_found = False
-        for node in nodes:
-            # Define a list of acceptable names
-            acceptable_names = ["overpaint", "ov", "op", "project", "projecting", "billboard", "BR"]  # Add or modify as needed
-            # Check if the node's image name or label is in the acceptable names list
-            if node.bl_idname == 'ShaderNodeTexImage' and node.image and any(name.lower() in node.image.name.lower() or name.lower() in node.label.lower() for name in acceptable_names):
-                nodes.active = None
-                node.select = True
-                nodes.active = node
-                node_found = True
-                break
-
-            # Check if the node in a group tree has an image with an acceptable name
-            if node.bl_idname == 'ShaderNodeGroup':
-                group_nodes = node.node_tree.nodes
-                group_nodes.active = None
-                for group_node in group_nodes:
-                    if group_node.bl_idname == 'ShaderNodeTexImage' and group_node.image and any(name.lower() in group_node.image.name.lower() or name.lower() in group_node.label.lower() for name in acceptable_names):
-                        group_nodes.active = None
-                        group_node.select = True
-                        group_nodes.active = group_node
-                        node_found = True
-                        break
-                if node_found:
-                    # Activate the group node in the shader node tree
-                    node.select = True
-                    nodes.active = node
-                    break
-
-            if node_found:
-                break
-        if not node_found:
+        if not activate_overpaint_node(active_obj):
             self.popup_message("The active material does not use an image containing 'overpaint' in the name or label. Please select an object with a suitable material for overpainting.")
             return {'CANCELLED'}
 
@@ -241,8 +237,14 @@ class OverpaintCameraProjection(bpy.types.Operator):
             return {'CANCELLED'}
         return context.window_manager.invoke_props_dialog(self)
 
-# Register the operator if it hasn't been registered yet
-if OverpaintCameraProjection.bl_idname not in bpy.types.Operator.__subclasses__():
-    bpy.utils.register_class(OverpaintCameraProjection)
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(bpy.data.filepath))
+
+    # The dialog's CamP checkboxes need the registry types
+    camp_registry.get_registry()
+
+    # Register the operator if it hasn't been registered yet
+    if OverpaintCameraProjection.bl_idname not in bpy.types.Operator.__subclasses__():
+        bpy.utils.register_class(OverpaintCameraProjection)
 
-bpy.ops.object.overpaint_camera_projection('INVOKE_DEFAULT')
+    bpy.ops.object.overpaint_camera_projection('INVOKE_DEFAULT')